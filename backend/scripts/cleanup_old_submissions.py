@@ -6,7 +6,9 @@ This script deletes lab submission files from Supabase Storage that are older th
 It should be run daily via a cron job or scheduled task.
 
 Usage:
-    python cleanup_old_submissions.py [--dry-run] [--days 30]
+    python cleanup_old_submissions.py [--dry-run] [--days 30] [--page-size 500] [--batch-size 100]
+                                      [--async] [--concurrency 8] [--resume] [--status]
+                                      [--journal FILE] [--time-limit MINUTES]
 
 Environment Variables Required:
     SUPABASE_URL - Supabase project URL
@@ -15,6 +17,9 @@ Environment Variables Required:
 
 import os
 import sys
+import time
+import asyncio
+import sqlite3
 import argparse
 from datetime import datetime, timedelta
 from pathlib import Path
@@ -29,6 +34,53 @@ except ImportError:
     sys.exit(1)
 
 
+BUCKET_NAME = 'lab-submissions'
+
+# Rows fetched per request; PostgREST caps every response at its max-rows
+# setting (1000 by default), so pages stay below it
+DEFAULT_PAGE_SIZE = 500
+
+# Files and records deleted per request. Record ids go into the request
+# URL as an in.(...) filter, so batches stay well under URL length limits
+DEFAULT_BATCH_SIZE = 100
+
+# Most requests in flight at once in --async mode
+DEFAULT_CONCURRENCY = 8
+
+# Attempts per request throttled or failed by the server, backing off
+# RETRY_BACKOFF seconds, doubled after each attempt
+RETRY_ATTEMPTS = 4
+RETRY_BACKOFF = 0.5
+
+# Local record of the current run's submissions, for --resume and --status
+DEFAULT_JOURNAL = Path(__file__).parent / 'cleanup_journal.sqlite3'
+
+# Errors for a file remove() did not report, once a list() of its folder
+# shows it is absent or still there, and for a record that is already gone
+FILE_NOT_REMOVED = "not removed by storage"
+FILE_NOT_FOUND = "not found in storage"
+FILE_STILL_LISTED = "still listed in storage after remove"
+RECORD_NOT_DELETED = "not deleted"
+
+# Entries a list() returns when checking that a file is absent; the search
+# is by name prefix and sorted by name, so the exact name comes first
+SEARCH_LIMIT = 100
+
+JOURNAL_SCHEMA = """
+CREATE TABLE IF NOT EXISTS run (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS items (
+    id TEXT PRIMARY KEY,
+    file_url TEXT,
+    file_name TEXT,
+    submitted_at TEXT,
+    state TEXT NOT NULL,
+    error TEXT,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS items_state ON items (state, submitted_at, id);
+"""
+
+
 def get_supabase_client():
     """Create Supabase client with service role key"""
     supabase_url = os.getenv('SUPABASE_URL')
@@ -42,115 +94,832 @@ def get_supabase_client():
     return create_client(supabase_url, supabase_key)
 
 
-def get_old_submissions(client, days=30):
-    """Get submissions older than specified days"""
-    cutoff_date = datetime.utcnow() - timedelta(days=days)
-    cutoff_iso = cutoff_date.isoformat()
+def old_submissions_query(client, cutoff_iso, last=None, page_size=DEFAULT_PAGE_SIZE):
+    """Query for the next page of submissions older than cutoff_iso, after row last
     
+    Works with both the sync and the async client, which share the query
+    builder interface; the caller executes it.
+    """
     # Query submissions with file_url that are older than cutoff
-    response = client.table('lab_submissions')\
+    query = client.table('lab_submissions')\
         .select('id, file_url, file_name, submitted_at, user_id, course_id, lab_id')\
         .not_.is_('file_url', 'null')\
-        .lt('submitted_at', cutoff_iso)\
-        .execute()
+        .lt('submitted_at', cutoff_iso)
+    
+    if last is not None:
+        # Quoted, as timestamps hold PostgREST's reserved ':' and ','
+        submitted_at = last['submitted_at']
+        query = query.or_(
+            f'submitted_at.gt."{submitted_at}",'
+            f'and(submitted_at.eq."{submitted_at}",id.gt."{last["id"]}")'
+        )
     
-    return response.data if response.data else []
+    return query.order('submitted_at').order('id').limit(page_size)
 
 
-def delete_file_from_storage(client, file_path):
-    """Delete file from Supabase Storage"""
-    try:
-        # Extract bucket and file path
-        # Format: lab-submissions/{userId}/{courseId}/{labId}/{timestamp}_{filename}.docx
-        if not file_path.startswith('lab-submissions/'):
-            return False
-        
-        bucket_name = 'lab-submissions'
-        file_key = file_path
+def cutoff_timestamp(days):
+    """ISO timestamp before which submissions are expired"""
+    cutoff_date = datetime.utcnow() - timedelta(days=days)
+    return cutoff_date.isoformat()
+
+
+def iter_old_submission_pages(client, days=30, page_size=DEFAULT_PAGE_SIZE, cutoff_iso=None, last=None):
+    """Yield pages of submissions older than specified days, oldest first
+    
+    Pages are fetched with keyset pagination on (submitted_at, id): each
+    request asks for up to page_size rows after the last row seen. A
+    response truncated by PostgREST's row cap only means another page,
+    rows deleted in between do not shift later pages, and only one page
+    is held in memory. Iteration stops at the first empty page.
+    
+    cutoff_iso and last continue an earlier scan from its checkpoint.
+    """
+    if cutoff_iso is None:
+        cutoff_iso = cutoff_timestamp(days)
+    
+    while True:
+        response = old_submissions_query(client, cutoff_iso, last, page_size).execute()
+        page = response.data or []
+        if not page:
+            return
         
-        # Remove file from storage
-        result = client.storage.from_(bucket_name).remove([file_key])
-        return True
+        yield page
+        last = page[-1]
+
+
+def storage_key(file_url):
+    """Key of a file_url's object in the bucket, or None if it is not a bucket path
+    
+    Keys are {userId}/{courseId}/{labId}/{timestamp}_{filename}.docx, as the
+    LMS uploads them. Older rows have the bucket name in front (see
+    fix-lab-submissions-file-paths.sql), which is not part of the key.
+    """
+    if not file_url or '://' in file_url:
+        return None
+    if file_url.startswith(f'{BUCKET_NAME}/'):
+        file_url = file_url[len(BUCKET_NAME) + 1:]
+    return file_url.strip('/') or None
+
+
+def split_file_keys(file_paths):
+    """({path: storage key} to remove, {path: error} for paths outside the bucket)"""
+    file_keys = {}
+    errors = {}
+    for file_path in file_paths:
+        key = storage_key(file_path)
+        if key is not None:
+            file_keys[file_path] = key
+        else:
+            errors[file_path] = f"not in the {BUCKET_NAME} bucket"
+    return file_keys, errors
+
+
+def storage_results(file_keys, removed):
+    """{path: error or None} for {path: storage key} from the objects a Storage remove() reported"""
+    removed_names = {obj.get('name') for obj in removed or []}
+    return {file_path: None if key in removed_names else FILE_NOT_REMOVED
+            for file_path, key in file_keys.items()}
+
+
+def unremoved_files(file_keys, results):
+    """(path, folder, name) of each file remove() did not report, to look for in its folder"""
+    for file_path, key in file_keys.items():
+        if results[file_path] == FILE_NOT_REMOVED:
+            folder, _, name = key.rpartition('/')
+            yield file_path, folder, name
+
+
+def search_options(name):
+    """list() options finding name in its folder"""
+    return {'search': name, 'limit': SEARCH_LIMIT, 'sortBy': {'column': 'name', 'order': 'asc'}}
+
+
+def absence_result(name, entries):
+    """FILE_NOT_FOUND unless the entries of a list() searching for name include the file"""
+    listed = {entry.get('name') for entry in entries or [] if entry.get('id') is not None}
+    return FILE_STILL_LISTED if name in listed else FILE_NOT_FOUND
+
+
+def record_results(submission_ids, deleted_rows):
+    """{submission_id: error or None} from the rows a delete returned"""
+    deleted_ids = {row['id'] for row in deleted_rows or []}
+    return {submission_id: None if submission_id in deleted_ids else RECORD_NOT_DELETED
+            for submission_id in submission_ids}
+
+
+def delete_files_from_storage(client, file_paths):
+    """Delete a batch of files from Supabase Storage with one request
+    
+    Returns {file_path: error message, or None if deleted}. Storage answers
+    with the objects it removed. A path missing from its answer is only
+    FILE_NOT_FOUND once a list() of its folder confirms the object is
+    absent: a wrong key or a stale read can hide a file that still exists.
+    """
+    file_keys, results = split_file_keys(file_paths)
+    if not file_keys:
+        return results
+    
+    bucket = client.storage.from_(BUCKET_NAME)
+    try:
+        removed = bucket.remove(list(file_keys.values()))
     except Exception as e:
-        print(f"  Error deleting file {file_path}: {e}")
-        return False
+        results.update(dict.fromkeys(file_keys, str(e)))
+        return results
+    
+    results.update(storage_results(file_keys, removed))
+    for file_path, folder, name in unremoved_files(file_keys, results):
+        try:
+            results[file_path] = absence_result(name, bucket.list(folder, search_options(name)))
+        except Exception as e:
+            results[file_path] = f"{FILE_NOT_REMOVED}, and listing it failed: {e}"
+    return results
 
 
-def delete_submission_record(client, submission_id):
-    """Delete submission record from database"""
+def delete_submission_records(client, submission_ids):
+    """Delete a batch of submission records from the database with one request
+    
+    Returns {submission_id: error message, or None if deleted}. The delete
+    returns the rows it removed, so an id missing from them was not deleted.
+    """
+    if not submission_ids:
+        return {}
+    
     try:
-        client.table('lab_submissions')\
+        response = client.table('lab_submissions')\
             .delete()\
-            .eq('id', submission_id)\
+            .in_('id', submission_ids)\
             .execute()
-        return True
     except Exception as e:
-        print(f"  Error deleting record {submission_id}: {e}")
-        return False
+        return dict.fromkeys(submission_ids, str(e))
+    
+    return record_results(submission_ids, response.data)
 
 
-def cleanup_old_submissions(days=30, dry_run=False):
-    """Main cleanup function"""
-    print(f"Starting cleanup of submissions older than {days} days...")
-    if dry_run:
-        print("DRY RUN MODE - No files will be deleted")
-    print()
+def iter_batches(pages, batch_size):
+    """Regroup pages of submissions into lists of batch_size (the last may be shorter)"""
+    batch = []
+    for page in pages:
+        for submission in page:
+            batch.append(submission)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+
+class CleanupJournal:
+    """SQLite journal of a cleanup run's submissions and how far each got
     
-    client = get_supabase_client()
-    old_submissions = get_old_submissions(client, days)
+    Every listed submission is recorded before anything is deleted, then
+    moves from LISTED to FILE_DELETED to ROW_DELETED, or to FAILED with
+    its error. The run's cutoff and the last row listed are kept as a
+    checkpoint to continue the scan from. Each step is committed before
+    the next request, so an interrupted run loses nothing.
+    """
     
-    if not old_submissions:
-        print("No old submissions found.")
+    LISTED = 'listed'
+    FILE_DELETED = 'file-deleted'
+    ROW_DELETED = 'row-deleted'
+    FAILED = 'failed'
+    STATES = (LISTED, FILE_DELETED, ROW_DELETED, FAILED)
+    
+    def __init__(self, path=DEFAULT_JOURNAL):
+        self.path = Path(path)
+        self.db = sqlite3.connect(self.path)
+        with self.db:
+            self.db.executescript(JOURNAL_SCHEMA)
+    
+    def close(self):
+        self.db.close()
+    
+    def get(self, key):
+        """A value of the current run: cutoff, started_at, finished_at..., or None"""
+        row = self.db.execute("SELECT value FROM run WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+    
+    def _set(self, **values):
+        self.db.executemany("INSERT OR REPLACE INTO run (key, value) VALUES (?, ?)", values.items())
+    
+    @property
+    def checkpoint(self):
+        """The last submission listed by the run, to continue the scan after, or None"""
+        last_id = self.get('last_id')
+        if last_id is None:
+            return None
+        return {'submitted_at': self.get('last_submitted_at'), 'id': last_id}
+    
+    def start(self, cutoff_iso):
+        """Begin a new run, forgetting finished submissions but not half-done ones"""
+        with self.db:
+            self.db.execute("DELETE FROM items WHERE state IN (?, ?)", (self.ROW_DELETED, self.FAILED))
+            self.db.execute("DELETE FROM run")
+            self._set(cutoff=cutoff_iso, started_at=_now())
+    
+    def finish(self):
+        """Record that the run's scan reached the end"""
+        with self.db:
+            self._set(finished_at=_now())
+    
+    def add_page(self, page):
+        """Record a page of listed submissions and move the checkpoint past it
+        
+        Returns the submissions not in the journal yet; the others are
+        already being finished, or failed, in this run.
+        """
+        new = [submission for submission in page
+               if self.db.execute("SELECT 1 FROM items WHERE id = ?", (submission['id'],)).fetchone() is None]
+        now = _now()
+        with self.db:
+            self.db.executemany(
+                "INSERT INTO items (id, file_url, file_name, submitted_at, state, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(submission['id'], submission['file_url'], submission.get('file_name'),
+                  submission['submitted_at'], self.LISTED, now) for submission in new])
+            self._set(last_submitted_at=page[-1]['submitted_at'], last_id=page[-1]['id'])
+        return new
+    
+    def _update(self, results, done_state):
+        """Move each {id: error or None} to done_state, or to FAILED with the error"""
+        now = _now()
+        with self.db:
+            self.db.executemany(
+                "UPDATE items SET state = ?, error = ?, updated_at = ? WHERE id = ?",
+                [(self.FAILED if error else done_state, error, now, submission_id)
+                 for submission_id, error in results.items()])
+    
+    def record_files(self, batch, file_results):
+        """Record the outcome of deleting a batch's files; a file confirmed missing counts as deleted"""
+        errors = (file_results[submission['file_url']] for submission in batch)
+        self._update({submission['id']: None if file_gone(error) else error
+                      for submission, error in zip(batch, errors)}, self.FILE_DELETED)
+    
+    def record_rows(self, records):
+        """Record the outcome of deleting records, {id: error or None}"""
+        self._update(records, self.ROW_DELETED)
+    
+    def pending(self, state):
+        """Submissions left in state (LISTED or FILE_DELETED), oldest first"""
+        rows = self.db.execute(
+            "SELECT id, file_url, file_name, submitted_at FROM items WHERE state = ? ORDER BY submitted_at, id",
+            (state,))
+        return [dict(zip(('id', 'file_url', 'file_name', 'submitted_at'), row)) for row in rows]
+    
+    def counts(self):
+        """{state: number of submissions}"""
+        counts = dict.fromkeys(self.STATES, 0)
+        counts.update(self.db.execute("SELECT state, COUNT(*) FROM items GROUP BY state"))
+        return counts
+    
+    def failures(self, limit=10):
+        """The most recent (id, file_url, error) failures"""
+        return self.db.execute(
+            "SELECT id, file_url, error FROM items WHERE state = ? ORDER BY updated_at DESC, id LIMIT ?",
+            (self.FAILED, limit)).fetchall()
+
+
+def _now():
+    """Current UTC time for the journal"""
+    return datetime.utcnow().isoformat(timespec='seconds')
+
+
+def start_run(journal, days, resume=False):
+    """(cutoff, checkpoint) to scan from
+    
+    On resume, these are the journal's unfinished run's; otherwise a new
+    run starts from the beginning with a fresh cutoff.
+    """
+    if journal is None:
+        return cutoff_timestamp(days), None
+    
+    cutoff_iso = journal.get('cutoff')
+    if resume and cutoff_iso and not journal.get('finished_at'):
+        print(f"Resuming the run started {journal.get('started_at')} (cutoff: {cutoff_iso})")
+        return cutoff_iso, journal.checkpoint
+    
+    if resume:
+        print("No unfinished run to resume, starting a new one")
+    cutoff_iso = cutoff_timestamp(days)
+    journal.start(cutoff_iso)
+    return cutoff_iso, None
+
+
+def iter_pending(journal, batch_size):
+    """Yield (batch, state) for submissions an earlier run left half-done
+    
+    Submissions whose file was deleted come first, as their records are
+    the ones that no new scan would clean up.
+    """
+    if journal is None:
         return
+    for state in (CleanupJournal.FILE_DELETED, CleanupJournal.LISTED):
+        pending = journal.pending(state)
+        if pending:
+            print(f"Finishing {len(pending)} submissions left {state} by an earlier run")
+            print()
+        for batch in iter_batches([pending], batch_size):
+            yield batch, state
+
+
+def settle_resumed(results, gone_error):
+    """results of a half-done submission's step, with gone_error counted as done
     
-    print(f"Found {len(old_submissions)} old submissions to process")
-    print()
+    The interrupted run may have deleted the record just before it
+    stopped, so finding it gone means the step is complete.
+    """
+    return {key: None if error == gone_error else error for key, error in results.items()}
+
+
+def out_of_time(deadline):
+    """Whether the run's time limit has passed"""
+    return deadline is not None and time.monotonic() >= deadline
+
+
+def file_gone(error):
+    """Whether a file's removal left it gone: deleted now, or confirmed missing from storage"""
+    return error is None or error == FILE_NOT_FOUND
+
+
+def confirmed_ids(batch, file_results):
+    """Ids of the batch's submissions whose file is gone"""
+    return [submission['id'] for submission in batch if file_gone(file_results[submission['file_url']])]
+
+
+def report_batch(batch, file_results, records, dry_run, totals, verbose=True):
+    """Count a processed batch into totals and print each submission's outcome
     
-    deleted_files = 0
-    deleted_records = 0
-    errors = 0
+    A file confirmed missing from storage is not counted as deleted nor as
+    an error, and its record is deleted. Records of submissions whose file
+    could not be deleted are missing from records: they are kept, so the
+    file is retried on the next run. With
+    verbose False, only failures and a line for the batch are printed.
+    """
+    batch_totals = {'files': 0, 'records': 0, 'errors': 0}
     
-    for submission in old_submissions:
+    for submission in batch:
         submission_id = submission['id']
         file_url = submission['file_url']
         file_name = submission.get('file_name', 'unknown')
         submitted_at = submission['submitted_at']
-        
-        print(f"Processing: {file_name} (submitted: {submitted_at})")
+        lines = []
         
         if dry_run:
-            print(f"  [DRY RUN] Would delete file: {file_url}")
-            print(f"  [DRY RUN] Would delete record: {submission_id}")
-            deleted_files += 1
-            deleted_records += 1
+            lines.append(f"  [DRY RUN] Would delete file: {file_url}")
+            lines.append(f"  [DRY RUN] Would delete record: {submission_id}")
+            batch_totals['files'] += 1
+            batch_totals['records'] += 1
         else:
-            # Delete file from storage
-            if delete_file_from_storage(client, file_url):
-                deleted_files += 1
-                print(f"  ✓ Deleted file: {file_url}")
+            error = file_results[file_url]
+            if error is None:
+                batch_totals['files'] += 1
+                if verbose:
+                    lines.append(f"  ✓ Deleted file: {file_url}")
+            elif error == FILE_NOT_FOUND:
+                if verbose:
+                    lines.append(f"  - File already gone: {file_url}")
             else:
-                errors += 1
-                print(f"  ✗ Failed to delete file: {file_url}")
+                batch_totals['errors'] += 1
+                lines.append(f"  ✗ Failed to delete file: {file_url} ({error})")
             
-            # Delete record from database
-            if delete_submission_record(client, submission_id):
-                deleted_records += 1
-                print(f"  ✓ Deleted record: {submission_id}")
+            if submission_id not in records:
+                lines.append(f"  - Kept record: {submission_id} (file not deleted)")
+            elif records[submission_id] is None:
+                batch_totals['records'] += 1
+                if verbose:
+                    lines.append(f"  ✓ Deleted record: {submission_id}")
             else:
-                errors += 1
-                print(f"  ✗ Failed to delete record: {submission_id}")
+                batch_totals['errors'] += 1
+                lines.append(f"  ✗ Failed to delete record: {submission_id} ({records[submission_id]})")
         
-        print()
+        if verbose or lines:
+            print(f"Processing: {file_name} (submitted: {submitted_at})")
+            for line in lines:
+                print(line)
+            print()
     
+    for key, count in batch_totals.items():
+        totals[key] += count
+    if not verbose:
+        print(f"Batch of {len(batch)}: {batch_totals['files']} files deleted, "
+              f"{batch_totals['records']} records deleted, {batch_totals['errors']} errors")
+
+
+def process_batch(client, batch, dry_run, totals, journal=None, resumed=None):
+    """Delete a batch's files, then the records of those deleted, reporting every item
+    
+    resumed is the journal state an earlier run left the batch in, if any;
+    a batch left FILE_DELETED only needs its records deleted.
+    """
+    if dry_run:
+        report_batch(batch, {}, {}, dry_run, totals)
+        return
+    
+    if resumed == CleanupJournal.FILE_DELETED:
+        file_results = dict.fromkeys((submission['file_url'] for submission in batch), None)
+    else:
+        file_results = delete_files_from_storage(client, [submission['file_url'] for submission in batch])
+        if journal is not None:
+            journal.record_files(batch, file_results)
+    
+    records = delete_submission_records(client, confirmed_ids(batch, file_results))
+    if resumed:
+        records = settle_resumed(records, RECORD_NOT_DELETED)
+    if journal is not None:
+        journal.record_rows(records)
+    report_batch(batch, file_results, records, dry_run, totals)
+
+
+def print_summary(found, totals, dry_run):
+    """Print the summary shared by the sequential and async runs"""
     print("=" * 60)
     print(f"Cleanup Summary:")
-    print(f"  Files deleted: {deleted_files}")
-    print(f"  Records deleted: {deleted_records}")
-    print(f"  Errors: {errors}")
+    print(f"  Submissions found: {found}")
+    print(f"  Files deleted: {totals['files']}")
+    print(f"  Records deleted: {totals['records']}")
+    print(f"  Errors: {totals['errors']}")
     if dry_run:
         print(f"  (DRY RUN - No actual deletions performed)")
 
 
+def cleanup_old_submissions(days=30, dry_run=False, page_size=DEFAULT_PAGE_SIZE, batch_size=DEFAULT_BATCH_SIZE,
+                            journal=None, resume=False, time_limit=None):
+    """Main cleanup function
+    
+    Old submissions are processed as they are fetched, page by page, so a
+    backlog of any size is drained with flat memory. Files and records
+    are deleted batch_size at a time, with one Storage and one database
+    request per batch; a record is only deleted once its file is.
+    
+    With a CleanupJournal, submissions an earlier run left half-done are
+    finished first, and resume continues that run's scan from its
+    checkpoint. time_limit (seconds) stops the run between batches; the
+    next run with resume picks up from there.
+    """
+    print(f"Starting cleanup of submissions older than {days} days...")
+    if dry_run:
+        print("DRY RUN MODE - No files will be deleted")
+    print()
+    
+    client = get_supabase_client()
+    deadline = time.monotonic() + time_limit if time_limit else None
+    cutoff_iso, last = start_run(journal, days, resume)
+    
+    found = 0
+    totals = {'files': 0, 'records': 0, 'errors': 0}
+    
+    def work():
+        nonlocal found
+        for batch, state in iter_pending(journal, batch_size):
+            found += len(batch)
+            yield batch, state
+        
+        def pages():
+            nonlocal found
+            for page in iter_old_submission_pages(client, days, page_size, cutoff_iso, last):
+                if journal is not None:
+                    page = journal.add_page(page)
+                found += len(page)
+                print(f"Fetched {len(page)} old submissions to process ({found} so far)")
+                print()
+                yield page
+            if journal is not None:
+                journal.finish()
+        
+        for batch in iter_batches(pages(), batch_size):
+            yield batch, None
+    
+    for batch, resumed in work():
+        if out_of_time(deadline):
+            print("Time limit reached, run again with --resume to continue")
+            print()
+            break
+        process_batch(client, batch, dry_run, totals, journal, resumed)
+    
+    if not found:
+        print("No old submissions found.")
+        return
+    
+    print_summary(found, totals, dry_run)
+
+
+def http_status(error):
+    """HTTP status code carried by a failed Supabase request's exception, or None"""
+    candidates = [getattr(error, name, None) for name in ('status_code', 'status', 'code')]
+    candidates.append(getattr(getattr(error, 'response', None), 'status_code', None))
+    if error.args and isinstance(error.args[0], dict):
+        candidates.extend(error.args[0].get(name) for name in ('statusCode', 'status', 'code'))
+    for candidate in candidates:
+        try:
+            status = int(candidate)
+        except (TypeError, ValueError):
+            continue
+        if 100 <= status < 600:
+            return status
+    return None
+
+
+def is_overload(error):
+    """Whether a failed request means the service is throttling or overloaded"""
+    status = http_status(error)
+    return isinstance(error, TimeoutError) or status == 429 or (status is not None and status >= 500)
+
+
+class AIMDLimiter:
+    """Adaptive limit on concurrent requests: additive increase, multiplicative decrease
+    
+    At most `limit` requests run at once. Every `limit` requests in a row
+    that succeed without being slow raise it by one, up to max_limit. A
+    throttled (429), failed (5xx) or timed-out request, or one slower than
+    LATENCY_FACTOR times the usual latency of its kind of request, halves
+    it, at most once per cooldown seconds so one burst of slow answers
+    counts once. The usual latency is a moving average kept per kind
+    ('select', 'remove'...), as a batched delete is slower than a page
+    select, and it follows the service as it slows down or speeds up.
+    """
+    
+    LATENCY_FACTOR = 3
+    # Weight of each request's latency in the moving average of its kind
+    BASELINE_WEIGHT = 0.1
+    
+    def __init__(self, max_limit, cooldown=1.0):
+        self.max_limit = max(1, max_limit)
+        self.limit = max(1, self.max_limit // 2)
+        self.cooldown = cooldown
+        self.decreases = 0
+        self._in_flight = 0
+        self._successes = 0
+        self._baselines = {}
+        self._last_decrease = float('-inf')
+        self._condition = None
+    
+    async def call(self, request, kind='request'):
+        """Await request() within the limit and adjust the limit from its outcome"""
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        
+        async with self._condition:
+            await self._condition.wait_for(lambda: self._in_flight < self.limit)
+            self._in_flight += 1
+        
+        start = time.monotonic()
+        overloaded = False
+        try:
+            return await request()
+        except Exception as e:
+            overloaded = is_overload(e)
+            raise
+        finally:
+            latency = time.monotonic() - start
+            async with self._condition:
+                self._in_flight -= 1
+                self._record(latency, overloaded, kind)
+                self._condition.notify_all()
+    
+    def _record(self, latency, overloaded, kind='request'):
+        """Apply AIMD to one finished request of kind"""
+        if not overloaded:
+            baseline = self._baselines.get(kind, latency)
+            overloaded = latency > baseline * self.LATENCY_FACTOR
+            self._baselines[kind] = baseline + self.BASELINE_WEIGHT * (latency - baseline)
+        
+        now = time.monotonic()
+        if overloaded:
+            self._successes = 0
+            if now - self._last_decrease >= self.cooldown:
+                self.limit = max(1, self.limit // 2)
+                self.decreases += 1
+                self._last_decrease = now
+            return
+        
+        self._successes += 1
+        if self._successes >= self.limit:
+            self._successes = 0
+            self.limit = min(self.max_limit, self.limit + 1)
+
+
+async def call_with_retry(limiter, request, kind='request', attempts=RETRY_ATTEMPTS):
+    """limiter.call(request, kind), retried with exponential backoff while overloaded"""
+    for attempt in range(attempts):
+        try:
+            return await limiter.call(request, kind)
+        except Exception as e:
+            if attempt == attempts - 1 or not is_overload(e):
+                raise
+            await asyncio.sleep(RETRY_BACKOFF * 2 ** attempt)
+
+
+async def adelete_files_from_storage(client, limiter, file_paths):
+    """delete_files_from_storage() with the async client, through limiter"""
+    file_keys, results = split_file_keys(file_paths)
+    if not file_keys:
+        return results
+    
+    bucket = client.storage.from_(BUCKET_NAME)
+    try:
+        removed = await call_with_retry(limiter, lambda: bucket.remove(list(file_keys.values())), 'remove')
+    except Exception as e:
+        results.update(dict.fromkeys(file_keys, str(e)))
+        return results
+    
+    results.update(storage_results(file_keys, removed))
+    
+    async def check(file_path, folder, name):
+        try:
+            entries = await call_with_retry(limiter, lambda: bucket.list(folder, search_options(name)), 'list')
+        except Exception as e:
+            results[file_path] = f"{FILE_NOT_REMOVED}, and listing it failed: {e}"
+            return
+        results[file_path] = absence_result(name, entries)
+    
+    await asyncio.gather(*(check(*file) for file in unremoved_files(file_keys, results)))
+    return results
+
+
+async def adelete_submission_records(client, limiter, submission_ids):
+    """delete_submission_records() with the async client, through limiter"""
+    if not submission_ids:
+        return {}
+    
+    query = client.table('lab_submissions').delete().in_('id', submission_ids)
+    try:
+        response = await call_with_retry(limiter, query.execute, 'delete')
+    except Exception as e:
+        return dict.fromkeys(submission_ids, str(e))
+    
+    return record_results(submission_ids, response.data)
+
+
+async def get_async_supabase_client():
+    """Create an async Supabase client with service role key
+    
+    Its database and Storage clients each keep one pooled HTTP connection
+    pool for every request of the run.
+    """
+    try:
+        from supabase import acreate_client
+    except ImportError:
+        raise ImportError("--async needs supabase-py 2.x. Install with: pip install -U supabase")
+    
+    supabase_url = os.getenv('SUPABASE_URL')
+    supabase_key = os.getenv('SUPABASE_SERVICE_ROLE_KEY')
+    
+    if not supabase_url or not supabase_key:
+        raise ValueError(
+            "SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY environment variables are required"
+        )
+    
+    return await acreate_client(supabase_url, supabase_key)
+
+
+async def cleanup_old_submissions_async(days=30, dry_run=False, page_size=DEFAULT_PAGE_SIZE,
+                                        batch_size=DEFAULT_BATCH_SIZE, concurrency=DEFAULT_CONCURRENCY,
+                                        journal=None, resume=False, time_limit=None):
+    """Cleanup as a pipeline of concurrent stages, with the same results as cleanup_old_submissions()
+    
+    A fetcher pages through expired submissions and queues batches;
+    Storage deleters remove each batch's files; database deleters then
+    delete the records of the files confirmed gone. The stages are
+    joined by bounded queues, so memory stays flat, and every request
+    goes through one AIMDLimiter capped at concurrency. Only failures and
+    a line per batch are printed, except in dry-run mode.
+    
+    journal, resume and time_limit work as in cleanup_old_submissions();
+    at the time limit the fetcher stops and queued batches are finished.
+    """
+    print(f"Starting cleanup of submissions older than {days} days...")
+    if dry_run:
+        print("DRY RUN MODE - No files will be deleted")
+    print()
+    
+    client = await get_async_supabase_client()
+    deadline = time.monotonic() + time_limit if time_limit else None
+    cutoff_iso, last = start_run(journal, days, resume)
+    limiter = AIMDLimiter(concurrency)
+    file_batches = asyncio.Queue(maxsize=concurrency * 2)
+    record_batches = asyncio.Queue(maxsize=concurrency * 2)
+    
+    found = 0
+    totals = {'files': 0, 'records': 0, 'errors': 0}
+    
+    async def fetch():
+        nonlocal found, last
+        for batch, state in iter_pending(journal, batch_size):
+            if out_of_time(deadline):
+                print("Time limit reached, run again with --resume to continue")
+                return
+            found += len(batch)
+            if state == CleanupJournal.FILE_DELETED:
+                file_results = dict.fromkeys((submission['file_url'] for submission in batch), None)
+                await record_batches.put((batch, file_results, state))
+            else:
+                await file_batches.put((batch, state))
+        
+        batch = []
+        while not out_of_time(deadline):
+            query = old_submissions_query(client, cutoff_iso, last, page_size)
+            response = await call_with_retry(limiter, query.execute, 'select')
+            page = response.data or []
+            if not page:
+                if journal is not None:
+                    journal.finish()
+                break
+            last = page[-1]
+            if journal is not None:
+                page = journal.add_page(page)
+            found += len(page)
+            print(f"Fetched {len(page)} old submissions to process ({found} so far)")
+            for submission in page:
+                batch.append(submission)
+                if len(batch) >= batch_size:
+                    await file_batches.put((batch, None))
+                    batch = []
+        else:
+            print("Time limit reached, run again with --resume to continue")
+        if batch:
+            await file_batches.put((batch, None))
+    
+    async def delete_files():
+        while (item := await file_batches.get()) is not None:
+            batch, resumed = item
+            file_paths = [submission['file_url'] for submission in batch]
+            if dry_run:
+                file_results = dict.fromkeys(file_paths)
+            else:
+                file_results = await adelete_files_from_storage(client, limiter, file_paths)
+            if journal is not None and not dry_run:
+                journal.record_files(batch, file_results)
+            await record_batches.put((batch, file_results, resumed))
+    
+    async def delete_records():
+        while (item := await record_batches.get()) is not None:
+            batch, file_results, resumed = item
+            records = {}
+            submission_ids = [] if dry_run else confirmed_ids(batch, file_results)
+            if submission_ids:
+                records = await adelete_submission_records(client, limiter, submission_ids)
+                if resumed:
+                    records = settle_resumed(records, RECORD_NOT_DELETED)
+                if journal is not None:
+                    journal.record_rows(records)
+            report_batch(batch, file_results, records, dry_run, totals, verbose=dry_run)
+    
+    async def produce():
+        await fetch()
+        for _ in range(concurrency):
+            await file_batches.put(None)
+    
+    async def file_stage():
+        await asyncio.gather(*(delete_files() for _ in range(concurrency)))
+        for _ in range(concurrency):
+            await record_batches.put(None)
+    
+    async def record_stage():
+        await asyncio.gather(*(delete_records() for _ in range(concurrency)))
+    
+    # Awaited together, so a failing stage cancels the others instead of
+    # leaving the fetcher blocked on a full queue
+    stages = [asyncio.create_task(stage()) for stage in (produce, file_stage, record_stage)]
+    try:
+        await asyncio.gather(*stages)
+    finally:
+        for task in stages:
+            task.cancel()
+    
+    if not found:
+        print("No old submissions found.")
+        return
+    
+    print()
+    print_summary(found, totals, dry_run)
+    print(f"  Concurrency: ended at {limiter.limit} of {limiter.max_limit}, backed off {limiter.decreases} times")
+
+
+def print_status(journal):
+    """Print the journal's run and how many submissions are in each state"""
+    cutoff_iso = journal.get('cutoff')
+    if cutoff_iso is None:
+        print(f"No cleanup run recorded in {journal.path}")
+        return
+    
+    checkpoint = journal.checkpoint
+    print(f"Journal: {journal.path}")
+    print(f"  Run started: {journal.get('started_at')} (cutoff: {cutoff_iso})")
+    if journal.get('finished_at'):
+        print(f"  Scan finished: {journal.get('finished_at')}")
+    elif checkpoint:
+        print(f"  Scan checkpoint: {checkpoint['submitted_at']} / {checkpoint['id']} (resume with --resume)")
+    else:
+        print(f"  Scan not started")
+    for state, count in journal.counts().items():
+        print(f"  {state}: {count}")
+    
+    failures = journal.failures()
+    if failures:
+        print(f"Most recent failures:")
+        for submission_id, file_url, error in failures:
+            print(f"  ✗ {submission_id}: {file_url} ({error})")
+
+
 def main():
     parser = argparse.ArgumentParser(
         description='Cleanup old lab submission files from Supabase Storage'
@@ -166,14 +935,83 @@ def main():
         action='store_true',
         help='Show what would be deleted without actually deleting'
     )
+    parser.add_argument(
+        '--page-size',
+        type=int,
+        default=DEFAULT_PAGE_SIZE,
+        help=f'Submissions fetched per request (default: {DEFAULT_PAGE_SIZE})'
+    )
+    parser.add_argument(
+        '--batch-size',
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help=f'Files and records deleted per request (default: {DEFAULT_BATCH_SIZE})'
+    )
+    parser.add_argument(
+        '--async',
+        dest='use_async',
+        action='store_true',
+        help='Fetch, delete files and delete records in concurrent stages'
+    )
+    parser.add_argument(
+        '--concurrency',
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help=f'Most requests in flight with --async; backs off on 429/5xx and slow responses '
+             f'(default: {DEFAULT_CONCURRENCY})'
+    )
+    parser.add_argument(
+        '--journal',
+        default=str(DEFAULT_JOURNAL),
+        help='SQLite journal recording each submission\'s progress (default: cleanup_journal.sqlite3 '
+             'next to this script)'
+    )
+    parser.add_argument(
+        '--resume',
+        action='store_true',
+        help='Continue the journal\'s unfinished run from its checkpoint instead of starting over'
+    )
+    parser.add_argument(
+        '--status',
+        action='store_true',
+        help='Show the journal\'s run and progress, then exit'
+    )
+    parser.add_argument(
+        '--time-limit',
+        type=float,
+        help='Stop after this many minutes; continue later with --resume'
+    )
     
     args = parser.parse_args()
+    if args.dry_run and args.resume:
+        parser.error('--resume cannot be combined with --dry-run')
     
+    journal = None
     try:
-        cleanup_old_submissions(days=args.days, dry_run=args.dry_run)
+        if args.status:
+            if not Path(args.journal).exists():
+                print(f"No cleanup run recorded in {args.journal}")
+                return
+            journal = CleanupJournal(args.journal)
+            print_status(journal)
+            return
+        
+        # Dry runs leave the journal untouched
+        if not args.dry_run:
+            journal = CleanupJournal(args.journal)
+        time_limit = args.time_limit * 60 if args.time_limit else None
+        options = dict(days=args.days, dry_run=args.dry_run, page_size=args.page_size,
+                       batch_size=args.batch_size, journal=journal, resume=args.resume, time_limit=time_limit)
+        if args.use_async:
+            asyncio.run(cleanup_old_submissions_async(concurrency=max(args.concurrency, 1), **options))
+        else:
+            cleanup_old_submissions(**options)
     except Exception as e:
         print(f"Error: {e}", file=sys.stderr)
         sys.exit(1)
+    finally:
+        if journal is not None:
+            journal.close()
 
 
 if __name__ == '__main__':
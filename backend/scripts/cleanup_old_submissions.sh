@@ -11,7 +11,8 @@ if [ -f ".env" ]; then
 fi
 
 # Run cleanup script
-python3 backend/scripts/cleanup_old_submissions.py --days 30
+# --resume finishes a run an earlier invocation left unfinished, if any
+python3 backend/scripts/cleanup_old_submissions.py --days 30 --resume
 
 # Log execution
 echo "$(date): Cleanup script executed" >> /var/log/lab-submission-cleanup.log
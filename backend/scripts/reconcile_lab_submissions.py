@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+"""
+Reconcile Lab Submission Files with Their Database Records
+
+cleanup_old_submissions.py only follows lab_submissions rows, so files
+uploaded without a row, and rows whose file is already gone, are never
+cleaned up. This lists the lab-submissions bucket folder by folder
+({userId}/{courseId}/{labId}/) and pages through lab_submissions.file_url,
+indexing both in a scratch SQLite file sorted by storage key. A
+sorted-merge diff of the two then finds orphans in both directions with
+bounded memory, however many objects the bucket holds.
+
+Orphans are reported, optionally to a CSV file, and can be deleted in
+batches. Only orphans older than --min-age hours are deleted, as the LMS
+uploads a file a moment before it inserts the file's row.
+
+Usage:
+    python reconcile_lab_submissions.py [--report FILE] [--delete-files] [--delete-rows] [--min-age 24]
+                                        [--concurrency 8] [--page-size 1000] [--batch-size 100]
+
+Environment Variables Required:
+    SUPABASE_URL - Supabase project URL
+    SUPABASE_SERVICE_ROLE_KEY - Service role key for admin access
+"""
+
+import os
+import sys
+import csv
+import asyncio
+import sqlite3
+import argparse
+import tempfile
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+
+from cleanup_old_submissions import (
+    BUCKET_NAME, DEFAULT_BATCH_SIZE, DEFAULT_CONCURRENCY, AIMDLimiter, call_with_retry, storage_key,
+    get_async_supabase_client, adelete_files_from_storage, adelete_submission_records,
+)
+
+
+# Entries per Storage list() request and rows per database request
+DEFAULT_PAGE_SIZE = 1000
+
+# Hours an orphan must have existed before it may be deleted
+DEFAULT_MIN_AGE = 24
+
+# The file Storage keeps in folders created empty from the dashboard
+FOLDER_PLACEHOLDER = '.emptyFolderPlaceholder'
+
+# Orphans printed per kind; the rest only go to --report
+MAX_PRINTED = 50
+
+INDEX_SCHEMA = """
+CREATE TABLE objects (key TEXT PRIMARY KEY, created_at TEXT) WITHOUT ROWID;
+CREATE TABLE records (key TEXT, id TEXT, submitted_at TEXT, PRIMARY KEY (key, id)) WITHOUT ROWID;
+CREATE TABLE unrecognised (id TEXT PRIMARY KEY, file_url TEXT, submitted_at TEXT) WITHOUT ROWID;
+"""
+
+# kind is 'file' (an object no row points at) or 'row' (a row whose object
+# is missing); submission_id is None for files
+Orphan = namedtuple('Orphan', ['kind', 'key', 'created_at', 'submission_id'])
+
+
+def open_index(path):
+    """A scratch SQLite index of objects and records at path
+    
+    Its keys sort byte-wise, as str comparison does, unlike the server's
+    collation, so the merge can rely on the order.
+    """
+    index = sqlite3.connect(path)
+    index.execute("PRAGMA journal_mode = OFF")
+    index.execute("PRAGMA synchronous = OFF")
+    index.executescript(INDEX_SCHEMA)
+    return index
+
+
+async def list_bucket(client, limiter, index, page_size=DEFAULT_PAGE_SIZE, concurrency=DEFAULT_CONCURRENCY):
+    """Add every object in the bucket to index, listing folders concurrently
+    
+    Storage lists one folder level per request, so the walk goes prefix by
+    prefix, paging each folder by offset. Objects are written to the index
+    a page at a time. Returns (objects, folders) listed.
+    """
+    bucket = client.storage.from_(BUCKET_NAME)
+    folders = asyncio.Queue()
+    folders.put_nowait('')
+    counts = {'objects': 0, 'folders': 0}
+    errors = []
+    
+    async def walk():
+        while True:
+            prefix = await folders.get()
+            try:
+                offset = 0
+                while True:
+                    options = {'limit': page_size, 'offset': offset, 'sortBy': {'column': 'name', 'order': 'asc'}}
+                    entries = await call_with_retry(limiter, lambda: bucket.list(prefix, options), 'list')
+                    objects = []
+                    for entry in entries or []:
+                        path = f"{prefix}/{entry['name']}" if prefix else entry['name']
+                        if entry.get('id') is None:
+                            folders.put_nowait(path)
+                        elif entry['name'] != FOLDER_PLACEHOLDER:
+                            objects.append((path, entry.get('created_at')))
+                    index.executemany("INSERT OR IGNORE INTO objects VALUES (?, ?)", objects)
+                    counts['objects'] += len(objects)
+                    if len(entries or []) < page_size:
+                        break
+                    offset += page_size
+                counts['folders'] += 1
+            except Exception as e:
+                errors.append(e)
+            finally:
+                folders.task_done()
+    
+    workers = [asyncio.create_task(walk()) for _ in range(concurrency)]
+    try:
+        await folders.join()
+    finally:
+        for worker in workers:
+            worker.cancel()
+    
+    # A folder left out would turn all of its rows into orphans
+    if errors:
+        raise RuntimeError(f"listing the {BUCKET_NAME} bucket failed: {errors[0]}")
+    return counts['objects'], counts['folders']
+
+
+async def list_records(client, limiter, index, page_size=DEFAULT_PAGE_SIZE):
+    """Add the storage key of every lab_submissions row with a file to index
+    
+    Rows are paged with keyset pagination on id. A file_url that is not a
+    bucket path, such as an absolute URL, goes to the unrecognised table
+    instead: it cannot be matched to an object, so it is only reported and
+    its row is never deleted. Returns the rows listed.
+    """
+    count = 0
+    last_id = None
+    while True:
+        query = client.table('lab_submissions')\
+            .select('id, file_url, submitted_at')\
+            .not_.is_('file_url', 'null')
+        if last_id is not None:
+            query = query.gt('id', last_id)
+        response = await call_with_retry(limiter, query.order('id').limit(page_size).execute, 'select')
+        page = response.data or []
+        if not page:
+            return count
+        
+        recognised = []
+        unrecognised = []
+        for row in page:
+            key = storage_key(row['file_url'])
+            if key is not None:
+                recognised.append((key, row['id'], row.get('submitted_at')))
+            else:
+                unrecognised.append((row['id'], row['file_url'], row.get('submitted_at')))
+        index.executemany("INSERT OR IGNORE INTO records VALUES (?, ?, ?)", recognised)
+        index.executemany("INSERT OR IGNORE INTO unrecognised VALUES (?, ?, ?)", unrecognised)
+        count += len(page)
+        last_id = page[-1]['id']
+
+
+def sorted_diff(objects, records):
+    """Yield the Orphans of two iterables sorted by key
+    
+    objects yields (key, created_at) and records (key, submission id,
+    submitted_at), both in ascending key order; several records may share
+    a key. Only the current item of each is held at a time.
+    """
+    objects = iter(objects)
+    records = iter(records)
+    obj = next(objects, None)
+    record = next(records, None)
+    
+    while obj is not None or record is not None:
+        if record is None or (obj is not None and obj[0] < record[0]):
+            yield Orphan('file', obj[0], obj[1], None)
+            obj = next(objects, None)
+        elif obj is None or record[0] < obj[0]:
+            yield Orphan('row', record[0], record[2], record[1])
+            record = next(records, None)
+        else:
+            key = obj[0]
+            while record is not None and record[0] == key:
+                record = next(records, None)
+            obj = next(objects, None)
+
+
+def iter_orphans(index):
+    """Orphans of the objects and records in index, in key order"""
+    objects = index.execute("SELECT key, created_at FROM objects ORDER BY key")
+    records = index.cursor().execute("SELECT key, id, submitted_at FROM records ORDER BY key, id")
+    return sorted_diff(objects, records)
+
+
+def is_older(timestamp, cutoff):
+    """Whether an ISO timestamp is before cutoff; unknown or unreadable ones are not"""
+    if not timestamp:
+        return False
+    try:
+        moment = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+    except ValueError:
+        return False
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment < cutoff
+
+
+async def reconcile(delete_files=False, delete_rows=False, min_age=DEFAULT_MIN_AGE, report_file=None,
+                    page_size=DEFAULT_PAGE_SIZE, batch_size=DEFAULT_BATCH_SIZE, concurrency=DEFAULT_CONCURRENCY):
+    """Find, report and optionally delete orphaned files and rows"""
+    print(f"Reconciling the {BUCKET_NAME} bucket with lab_submissions...")
+    if not delete_files and not delete_rows:
+        print("REPORT ONLY - Nothing will be deleted")
+    print()
+    
+    client = await get_async_supabase_client()
+    limiter = AIMDLimiter(concurrency)
+    cutoff = datetime.now(timezone.utc) - timedelta(hours=min_age)
+    
+    fd, index_path = tempfile.mkstemp(suffix='.sqlite3')
+    os.close(fd)
+    index = open_index(index_path)
+    report = None
+    try:
+        (objects, folders), records = await asyncio.gather(
+            list_bucket(client, limiter, index, page_size, concurrency),
+            list_records(client, limiter, index, page_size))
+        print(f"Listed {objects} objects in {folders} folders and {records} rows with a file")
+        print()
+        
+        if delete_files and objects and not records:
+            raise RuntimeError("no lab_submissions rows listed, refusing to delete every file "
+                               "(is SUPABASE_SERVICE_ROLE_KEY the service role key?)")
+        
+        if report_file:
+            report = open(report_file, 'w', encoding='utf-8', newline='')
+            writer = csv.writer(report)
+            writer.writerow(['kind', 'key', 'submission_id', 'created_at', 'action'])
+        
+        counts = {'file': 0, 'row': 0}
+        old = {'file': 0, 'row': 0}
+        totals = {'files': 0, 'rows': 0, 'errors': 0}
+        pending = {'file': [], 'row': []}
+        
+        async def flush(kind):
+            batch = pending[kind]
+            pending[kind] = []
+            if kind == 'file':
+                results = await adelete_files_from_storage(client, limiter, [orphan.key for orphan in batch])
+                errors = [(orphan, results[orphan.key]) for orphan in batch]
+            else:
+                results = await adelete_submission_records(client, limiter, [orphan.submission_id for orphan in batch])
+                errors = [(orphan, results[orphan.submission_id]) for orphan in batch]
+            for orphan, error in errors:
+                if error is None:
+                    totals['files' if kind == 'file' else 'rows'] += 1
+                else:
+                    totals['errors'] += 1
+                    print(f"  ✗ Failed to delete orphan {kind}: {orphan.submission_id or orphan.key} ({error})")
+                if report is not None:
+                    writer.writerow([orphan.kind, orphan.key, orphan.submission_id or '', orphan.created_at or '',
+                                     'deleted' if error is None else f'failed: {error}'])
+        
+        for orphan in iter_orphans(index):
+            kind = orphan.kind
+            counts[kind] += 1
+            if counts[kind] <= MAX_PRINTED:
+                if kind == 'file':
+                    print(f"  Orphan file: {orphan.key} (uploaded: {orphan.created_at})")
+                else:
+                    print(f"  Orphan row: {orphan.submission_id} -> {orphan.key} (submitted: {orphan.created_at})")
+            
+            deleting = delete_files if kind == 'file' else delete_rows
+            if not is_older(orphan.created_at, cutoff):
+                action = 'kept (too recent)'
+            else:
+                old[kind] += 1
+                if deleting:
+                    pending[kind].append(orphan)
+                    if len(pending[kind]) >= batch_size:
+                        await flush(kind)
+                    continue
+                action = 'reported'
+            if report is not None:
+                writer.writerow([orphan.kind, orphan.key, orphan.submission_id or '', orphan.created_at or '', action])
+        
+        for kind in pending:
+            if pending[kind]:
+                await flush(kind)
+        
+        unrecognised = 0
+        for submission_id, file_url, submitted_at in index.execute(
+                "SELECT id, file_url, submitted_at FROM unrecognised ORDER BY id"):
+            unrecognised += 1
+            if unrecognised <= MAX_PRINTED:
+                print(f"  Unrecognised file_url: {submission_id} -> {file_url}")
+            if report is not None:
+                writer.writerow(['unrecognised', file_url, submission_id, submitted_at or '',
+                                 'reported (not a bucket path)'])
+    finally:
+        if report is not None:
+            report.close()
+        index.close()
+        os.unlink(index_path)
+    
+    more = [(counts['file'], 'orphan files'), (counts['row'], 'orphan rows'),
+            (unrecognised, 'unrecognised file_urls')]
+    for count, label in more:
+        if count > MAX_PRINTED:
+            print(f"  ... and {count - MAX_PRINTED} more {label}"
+                  f"{f' (see {report_file})' if report_file else ''}")
+    
+    print()
+    print("=" * 60)
+    print(f"Reconciliation Summary:")
+    print(f"  Objects listed: {objects}")
+    print(f"  Rows listed: {records}")
+    print(f"  Orphan files: {counts['file']} ({old['file']} older than {min_age:g}h)")
+    print(f"  Orphan rows: {counts['row']} ({old['row']} older than {min_age:g}h)")
+    print(f"  Unrecognised file_urls: {unrecognised} (never deleted)")
+    print(f"  Files deleted: {totals['files']}")
+    print(f"  Rows deleted: {totals['rows']}")
+    print(f"  Errors: {totals['errors']}")
+    if report_file:
+        print(f"  Report: {report_file}")
+    return totals['errors']
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Find lab submission files without a database row, and rows without a file'
+    )
+    parser.add_argument(
+        '--report',
+        help='Write every orphan and what was done with it to this CSV file'
+    )
+    parser.add_argument(
+        '--delete-files',
+        action='store_true',
+        help='Delete files no lab_submissions row points at'
+    )
+    parser.add_argument(
+        '--delete-rows',
+        action='store_true',
+        help='Delete lab_submissions rows whose file is missing'
+    )
+    parser.add_argument(
+        '--min-age',
+        type=float,
+        default=DEFAULT_MIN_AGE,
+        help=f'Only delete orphans older than this many hours (default: {DEFAULT_MIN_AGE})'
+    )
+    parser.add_argument(
+        '--concurrency',
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help=f'Most requests in flight; backs off on 429/5xx and slow responses (default: {DEFAULT_CONCURRENCY})'
+    )
+    parser.add_argument(
+        '--page-size',
+        type=int,
+        default=DEFAULT_PAGE_SIZE,
+        help=f'Objects or rows listed per request (default: {DEFAULT_PAGE_SIZE})'
+    )
+    parser.add_argument(
+        '--batch-size',
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help=f'Orphans deleted per request (default: {DEFAULT_BATCH_SIZE})'
+    )
+    
+    args = parser.parse_args()
+    
+    try:
+        errors = asyncio.run(reconcile(
+            delete_files=args.delete_files, delete_rows=args.delete_rows, min_age=args.min_age,
+            report_file=args.report, page_size=args.page_size, batch_size=args.batch_size,
+            concurrency=max(args.concurrency, 1)))
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    if errors:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+"""Deleting expired lab submissions, against an in-memory Storage bucket"""
+
+import asyncio
+
+import pytest
+
+pytest.importorskip('supabase')
+
+from cleanup_old_submissions import (
+    FILE_NOT_FOUND, FILE_STILL_LISTED, AIMDLimiter, CleanupJournal, adelete_files_from_storage,
+    confirmed_ids, delete_files_from_storage,
+)
+
+
+class Bucket:
+    """A Storage bucket of keys whose remove() can fail to report removed objects"""
+    
+    def __init__(self, keys, unreported=(), stuck=()):
+        self.keys = set(keys)
+        self.unreported = set(unreported)
+        self.stuck = set(stuck)
+    
+    def remove(self, keys):
+        removed = [key for key in keys if key in self.keys and key not in self.stuck]
+        self.keys.difference_update(removed)
+        return [{'name': key} for key in removed if key not in self.unreported]
+    
+    def list(self, folder, options):
+        prefix = f'{folder}/' if folder else ''
+        names = sorted(key[len(prefix):] for key in self.keys if key.startswith(prefix))
+        return [{'name': name, 'id': name} for name in names
+                if '/' not in name and name.startswith(options['search'])][:options['limit']]
+
+
+class AsyncBucket(Bucket):
+    async def remove(self, keys):
+        return Bucket.remove(self, keys)
+    
+    async def list(self, folder, options):
+        return Bucket.list(self, folder, options)
+
+
+class Client:
+    def __init__(self, bucket):
+        self.storage = self
+        self.bucket = bucket
+    
+    def from_(self, name):
+        return self.bucket
+
+
+KEYS = ['u1/c1/l1/1_a.docx', 'u1/c1/l1/2_b.docx', 'u2/c1/l1/3_c.docx']
+
+
+def submissions(keys):
+    return [{'id': f'id-{n}', 'file_url': key, 'submitted_at': '2026-01-01T00:00:00'}
+            for n, key in enumerate(keys)]
+
+
+def delete_files(bucket, keys):
+    if isinstance(bucket, AsyncBucket):
+        return asyncio.run(adelete_files_from_storage(Client(bucket), AIMDLimiter(4), keys))
+    return delete_files_from_storage(Client(bucket), keys)
+
+
+@pytest.fixture(params=[Bucket, AsyncBucket], ids=['sync', 'async'])
+def bucket_class(request):
+    return request.param
+
+
+def test_removed_files_are_deleted(bucket_class):
+    assert delete_files(bucket_class(KEYS), KEYS) == dict.fromkeys(KEYS)
+
+
+def test_missing_file_is_confirmed_gone(bucket_class):
+    bucket = bucket_class(KEYS[1:])
+    results = delete_files(bucket, KEYS)
+    
+    assert results == {KEYS[0]: FILE_NOT_FOUND, KEYS[1]: None, KEYS[2]: None}
+    assert confirmed_ids(submissions(KEYS), results) == ['id-0', 'id-1', 'id-2']
+
+
+def test_file_still_listed_keeps_its_record(bucket_class, tmp_path):
+    bucket = bucket_class(KEYS, unreported=KEYS[:1], stuck=KEYS[1:2])
+    batch = submissions(KEYS)
+    results = delete_files(bucket, KEYS)
+    
+    # The first file was removed but not reported, the second not removed at all
+    assert results == {KEYS[0]: FILE_NOT_FOUND, KEYS[1]: FILE_STILL_LISTED, KEYS[2]: None}
+    assert confirmed_ids(batch, results) == ['id-0', 'id-2']
+    
+    journal = CleanupJournal(tmp_path / 'journal.sqlite3')
+    journal.start('2026-02-01T00:00:00')
+    journal.add_page(batch)
+    journal.record_files(batch, results)
+    assert journal.failures() == [('id-1', KEYS[1], FILE_STILL_LISTED)]
+    assert journal.counts()[CleanupJournal.FILE_DELETED] == 2
+    journal.close()
+
+
+def test_unlistable_file_keeps_its_record():
+    class Unlistable(Bucket):
+        def list(self, folder, options):
+            raise RuntimeError('storage down')
+    
+    results = delete_files(Unlistable(KEYS, stuck=KEYS[:1]), KEYS[:1])
+    assert 'storage down' in results[KEYS[0]]
+    assert confirmed_ids(submissions(KEYS[:1]), results) == []
+
+
+def test_limiter_keeps_latency_baselines_per_kind():
+    limiter = AIMDLimiter(8, cooldown=0)
+    for _ in range(50):
+        limiter._record(0.001, False, 'select')
+        limiter._record(0.05, False, 'delete')
+    
+    # Batched deletes fifty times slower than cached selects are still healthy
+    assert limiter.decreases == 0
+    assert limiter.limit == 8
+
+
+def test_limiter_baseline_follows_healthy_latency():
+    limiter = AIMDLimiter(8, cooldown=0)
+    limiter._record(0.001, False, 'remove')
+    for _ in range(100):
+        limiter._record(0.02, False, 'remove')
+    
+    # One fast answer only slows the limit down until the average catches up
+    assert 0 < limiter.decreases <= 5
+    assert limiter.limit == 8
+    
+    decreases = limiter.decreases
+    limiter._record(0.2, False, 'remove')
+    assert limiter.decreases == decreases + 1
+    assert limiter.limit == 4
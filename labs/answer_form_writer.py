@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+HTML Answer Form and JSON Schema Writer for Lab Submission Templates
+
+HTMLFormGenerator renders the same document structure as DOCXGenerator as a
+lightweight HTML form fragment, for collecting answers in the LMS lab
+viewer instead of round-tripping a Word file. It reuses the DOCX section
+builders through the emit interface, so every input is named after the
+answer anchor id of the matching DOCX content control, and schema()
+describes those fields as a JSON Schema. Both are built from the same
+parsed data as the DOCX; generate_docx_template() writes them next to it.
+
+Usage:
+    python answer_form_writer.py <submission_markdown_file> [output_dir]
+
+Example:
+    python answer_form_writer.py data/courses/seo-master-2026/content/labs/Day_01_Lab_01_Submission_Format.md /tmp/forms
+"""
+
+import re
+import sys
+import json
+import argparse
+from html import escape
+from pathlib import Path
+
+from parse_lab_submission import DOCXGenerator, LabSubmissionParser
+
+
+JSON_SCHEMA_DIALECT = 'https://json-schema.org/draft/2020-12/schema'
+
+# Checklist items with blanks to fill in take text; the rest are ticked
+PLACEHOLDER_RE = re.compile(r'\[.*\]|___+')
+
+
+def _runs_html(runs):
+    """Escaped HTML of RunSpec runs"""
+    parts = []
+    for spec in runs:
+        text = escape(spec.text).replace('\n', '<br>')
+        if spec.code:
+            text = f'<code>{text}</code>'
+        if spec.bold:
+            text = f'<strong>{text}</strong>'
+        if spec.italic:
+            text = f'<em>{text}</em>'
+        parts.append(text)
+    return ''.join(parts)
+
+
+def _heading_tag(style):
+    """HTML heading tag of a DOCX paragraph style, or None; 'Title' is <h1>"""
+    if style == 'Title':
+        return 'h1'
+    if style and style.startswith('Heading '):
+        return f"h{min(int(style[len('Heading '):]) + 1, 6)}"
+    return None
+
+
+def _checkbox_takes_text(anchor):
+    """Whether a checklist item has blanks for the learner to fill in"""
+    return bool(PLACEHOLDER_RE.search(anchor.prompt))
+
+
+class HTMLFormGenerator(DOCXGenerator):
+    """Render a lab's answer form as an HTML fragment plus a JSON Schema
+    
+    Read-only content becomes plain text; answer areas become inputs named
+    by anchor id. Table cells are named '<anchor id>.<row>.<column>', with
+    rows counted from 0 below the header. The trainer feedback block is
+    left out: the form only collects what the learner writes.
+    """
+    
+    # Shared skeleton, built once per process by _get_skeleton()
+    _skeleton = None
+    
+    def __init__(self, parsed_data, profile=None):
+        self.parsed_data = parsed_data
+        self.metadata = parsed_data.metadata
+        self.profile = profile
+        self._paragraph_count = 0
+        self._run_count = 0
+        self.anchors = []
+        self.table_columns = {}
+        
+        self._blocks = self._get_skeleton()['blocks']
+        self._sink = None
+    
+    @classmethod
+    def _get_skeleton(cls):
+        """Return the cached HTML of the blocks shared across labs"""
+        if cls._skeleton is None:
+            builder = cls.__new__(cls)
+            builder._paragraph_count = builder._run_count = 0
+            builder.anchors = []
+            builder.table_columns = {}
+            cls._skeleton = {'blocks': builder._capture_shared_blocks()}
+        return cls._skeleton
+    
+    def _capture_block(self, build):
+        """Run a block builder and return the HTML it emitted"""
+        fragments = []
+        self._sink = fragments.append
+        build()
+        self._sink = None
+        return '\n'.join(fragments)
+    
+    def _write_block(self, block):
+        """Write a cached skeleton block"""
+        self._sink(block)
+    
+    def _write_paragraph(self, runs, style, alignment, anchor_id=None):
+        """Write a heading, a paragraph, or the input of an answer area"""
+        content = _runs_html(runs)
+        tag = _heading_tag(style)
+        if anchor_id is not None:
+            self._sink(self._answer_html(self.anchors[-1], content))
+        elif tag is not None:
+            self._sink(f'<{tag}>{content}</{tag}>')
+        elif content:
+            css = []
+            if style and style.startswith('List'):
+                css.append(f'item level-{style[-1] if style[-1].isdigit() else 1}')
+            if all(spec.gray for spec in runs):
+                css.append('read-only')
+            attrs = f' class="{" ".join(css)}"' if css else ''
+            self._sink(f'<p{attrs}>{content}</p>')
+    
+    def _answer_html(self, anchor, content):
+        """The labelled input collecting one anchored answer area"""
+        name = escape(anchor.id)
+        if anchor.kind == 'field':
+            return (f'<label class="field"><span>{escape(anchor.question)}</span>'
+                    f'<input type="text" name="{name}"></label>')
+        if anchor.kind == 'checkbox':
+            if _checkbox_takes_text(anchor):
+                return (f'<label class="answer checkbox"><span>{content}</span>'
+                        f'<input type="text" name="{name}"></label>')
+            return (f'<label class="answer checkbox"><input type="checkbox" name="{name}" value="1">'
+                    f'<span>{content}</span></label>')
+        return (f'<label class="answer"><span>{content}</span>'
+                f'<textarea name="{name}" rows="3"></textarea></label>')
+    
+    def _write_page_break(self):
+        """Page breaks have no place in a form"""
+    
+    def _write_table(self, table_html, anchor_id=None):
+        """Write a complete <table> fragment"""
+        self._sink(table_html)
+    
+    def _add_trainer_feedback_section(self):
+        """The trainer feedback block is not part of the learner's form"""
+    
+    def _add_markdown_table(self, rows, read_only=False, anchor=None):
+        """Convert a markdown table's rows to an HTML table, of inputs if anchored"""
+        if not rows:
+            return None
+        
+        header = rows[0]
+        column_count = len(header)
+        if anchor is not None:
+            anchor = anchor._replace(prompt=' | '.join(header))
+            self.table_columns[anchor.id] = (header, len(rows) - 1)
+            parts = [f'<table class="answer-table" data-anchor="{escape(anchor.id)}">']
+        else:
+            parts = ['<table class="read-only">']
+        
+        parts.append('<thead><tr>')
+        parts.extend(f'<th>{escape(text)}</th>' for text in header)
+        parts.append('</tr></thead><tbody>')
+        
+        run_count = sum(1 for text in header if text)
+        for row_index, cells in enumerate(rows[1:]):
+            cells = (cells + [''] * column_count)[:column_count]
+            run_count += sum(1 for text in cells if text)
+            parts.append('<tr>')
+            for column, text in enumerate(cells):
+                if anchor is None:
+                    parts.append(f'<td>{escape(text)}</td>')
+                else:
+                    parts.append(f'<td><input type="text" name="{escape(anchor.id)}.{row_index}.{column}" '
+                                 f'placeholder="{escape(text)}"></td>')
+            parts.append('</tr>')
+        parts.append('</tbody></table>')
+        
+        return self._emit_table(''.join(parts), len(rows) * column_count, run_count, anchor)
+    
+    def generate(self):
+        """Return the form as an HTML fragment"""
+        fragments = []
+        self._sink = fragments.append
+        self._build_body()
+        self._sink = None
+        
+        day = self.metadata.get('day', 0)
+        lab = self.metadata.get('lab_number', 0)
+        return (f'<form class="lab-submission-form" data-day="{day}" data-lab="{lab}">\n'
+                + '\n'.join(fragments) + '\n</form>\n')
+    
+    def schema(self):
+        """JSON Schema of the form's payload, keyed by input name
+        
+        Only valid after generate(). The payload is what the form submits:
+        a string per input name, with unticked checkboxes left out. Each
+        table cell is its own '<anchor id>.<row>.<column>' property, with
+        x-anchor, x-row and x-column locating it in the table that
+        extract_submission_answers.py returns as an array of rows.
+        """
+        properties = {}
+        for anchor in self.anchors:
+            if anchor.kind == 'table':
+                columns, row_count = self.table_columns[anchor.id]
+                for row in range(row_count):
+                    for column, header in enumerate(columns):
+                        properties[f'{anchor.id}.{row}.{column}'] = {
+                            'title': f'{anchor.question}: {header}, row {row + 1}', 'type': 'string',
+                            'x-kind': 'table', 'x-section': anchor.section,
+                            'x-anchor': anchor.id, 'x-row': row, 'x-column': column,
+                        }
+                continue
+            
+            field = {'title': anchor.question, 'description': anchor.prompt, 'type': 'string'}
+            if anchor.kind == 'checkbox' and not _checkbox_takes_text(anchor):
+                field['const'] = '1'
+            field['x-kind'] = anchor.kind
+            field['x-section'] = anchor.section
+            properties[anchor.id] = field
+        
+        metadata = self.metadata
+        return {
+            '$schema': JSON_SCHEMA_DIALECT,
+            'title': f"Day {metadata.get('day', 0)}, Lab {metadata.get('lab_number', 0)}: "
+                     f"{metadata.get('lab_title', 'N/A')}",
+            'type': 'object',
+            'properties': properties,
+            'additionalProperties': False,
+        }
+
+
+def write_answer_form(parsed_data, form_file, schema_file, profile=None):
+    """Write the HTML form fragment and JSON Schema of already-parsed lab data"""
+    generator = HTMLFormGenerator(parsed_data, profile=profile)
+    html = generator.generate()
+    with open(form_file, 'w', encoding='utf-8') as f:
+        f.write(html)
+    with open(schema_file, 'w', encoding='utf-8') as f:
+        json.dump(generator.schema(), f, ensure_ascii=False, indent=2)
+        f.write('\n')
+    return generator
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Write the HTML answer form and JSON Schema of a lab submission format'
+    )
+    parser.add_argument(
+        'markdown_file',
+        help='Path to a *_Submission_Format.md file'
+    )
+    parser.add_argument(
+        'output_dir',
+        nargs='?',
+        default='.',
+        help='Output directory (default: current directory)'
+    )
+    
+    args = parser.parse_args()
+    
+    try:
+        parsed_data = LabSubmissionParser(args.markdown_file).parse()
+        output_dir = Path(args.output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        stem = Path(args.markdown_file).stem
+        form_file = output_dir / f'{stem}.form.html'
+        schema_file = output_dir / f'{stem}.schema.json'
+        generator = write_answer_form(parsed_data, form_file, schema_file)
+        print(f"Generated: {form_file} ({len(generator.anchors)} answer fields)")
+        print(f"Generated: {schema_file}")
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
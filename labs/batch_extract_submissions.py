@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Batch-Extract a Cohort's Lab Submissions to JSONL
+
+Runs the answer extractor over every completed DOCX in a directory (searched
+recursively) or in a single zip archive of submissions, all for one lab.
+Each submission becomes one JSON line with its learner fields, answers per
+section and question, fill status and word counts. Lines are written in
+submission order (sorted paths for a directory, archive order for a zip)
+to stdout or a file.
+
+Submissions are extracted across a pool of worker processes, each of which
+parses the submission format once. At most a small window of submissions
+is in flight at a time, so memory stays bounded however large the cohort.
+Zip members are read by the workers straight from the archive.
+
+Usage:
+    python batch_extract_submissions.py <submission_format_md> <submissions_dir_or_zip> [--output FILE] [--jobs N]
+
+Example:
+    python batch_extract_submissions.py data/courses/seo-master-2026/content/labs/Day_01_Lab_01_Submission_Format.md \\
+        day01_lab01_submissions.zip --output day01_lab01.jsonl
+"""
+
+import io
+import os
+import sys
+import json
+import zipfile
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from parse_lab_submission import LabSubmissionParser
+from extract_submission_answers import AnswerExtractor
+
+
+# Submissions in flight per worker process
+WINDOW_PER_JOB = 4
+
+# Per-process state set up by _init_worker()
+_extractor = None
+_archive = None
+_base_dir = None
+
+
+def find_submissions(source):
+    """Return (zip path or None, submission names) for a directory or zip
+    
+    Names are paths relative to the directory, or archive member names.
+    Word lock files ('~$...') and macOS archive metadata are skipped.
+    """
+    source = Path(source)
+    if not source.exists():
+        raise FileNotFoundError(f"Submissions not found: {source}")
+    
+    def wanted(name):
+        base = name.rsplit('/', 1)[-1]
+        return name.lower().endswith('.docx') and not base.startswith('~$') and not name.startswith('__MACOSX/')
+    
+    if source.is_dir():
+        names = sorted(path.relative_to(source).as_posix() for path in source.glob('**/*.docx'))
+        return None, [name for name in names if wanted(name)]
+    
+    with zipfile.ZipFile(source) as archive:
+        return source, [info.filename for info in archive.infolist() if not info.is_dir() and wanted(info.filename)]
+
+
+def count_words(question):
+    """Words the learner wrote for a question, across its answer and tables"""
+    words = len(question['answer'].split())
+    for table in question['tables']:
+        for row in table['rows']:
+            words += sum(len(value.split()) for value in row)
+    return words
+
+
+def summarize(name, answers):
+    """One JSONL record: extracted answers plus fill status and word counts"""
+    questions = [question for section in answers['sections'] for question in section['questions']]
+    for question in questions:
+        question['words'] = count_words(question)
+    
+    filled = sum(1 for question in questions if question['filled'])
+    return {
+        'submission': name,
+        'day': answers['lab'].get('day', 0),
+        'lab_number': answers['lab'].get('lab_number', 0),
+        'learner': answers['learner'],
+        'questions': len(questions),
+        'filled': filled,
+        'complete': filled == len(questions),
+        'words': sum(question['words'] for question in questions),
+        'sections': answers['sections'],
+        'error': None,
+    }
+
+
+def _init_worker(format_file, archive_path, base_dir):
+    """Parse the submission format and open the archive once per process"""
+    global _extractor, _archive, _base_dir
+    _extractor = AnswerExtractor(LabSubmissionParser(format_file).parse())
+    _archive = zipfile.ZipFile(archive_path) if archive_path else None
+    _base_dir = Path(base_dir)
+
+
+def _extract_submission(name):
+    """Extract one submission into (JSONL record, ok); errors become records too"""
+    try:
+        if _archive is None:
+            answers = _extractor.extract(_base_dir / name)
+        elif _archive.getinfo(name).compress_type == zipfile.ZIP_STORED:
+            # Stored members can be seeked in place without inflating them
+            with _archive.open(name) as member:
+                answers = _extractor.extract(member)
+        else:
+            answers = _extractor.extract(io.BytesIO(_archive.read(name)))
+        return json.dumps(summarize(name, answers), ensure_ascii=False), True
+    except Exception as e:
+        return json.dumps({'submission': name, 'error': str(e)}, ensure_ascii=False), False
+
+
+def _ordered_map(executor, fn, items, window):
+    """Like executor.map, but with at most `window` items submitted ahead"""
+    pending = deque()
+    for item in items:
+        if len(pending) >= window:
+            yield pending.popleft().result()
+        pending.append(executor.submit(fn, item))
+    while pending:
+        yield pending.popleft().result()
+
+
+def extract_all(format_file, source, out, jobs=1):
+    """Write one JSON line per submission under source to out
+    
+    Returns (submissions extracted, submissions that failed).
+    """
+    archive_path, names = find_submissions(source)
+    init_args = (format_file, archive_path, source if archive_path is None else '.')
+    
+    if jobs <= 1 or len(names) <= 1:
+        _init_worker(*init_args)
+        lines = map(_extract_submission, names)
+        return _write_lines(lines, out)
+    
+    with ProcessPoolExecutor(max_workers=min(jobs, len(names)), initializer=_init_worker,
+                             initargs=init_args) as executor:
+        lines = _ordered_map(executor, _extract_submission, names, jobs * WINDOW_PER_JOB)
+        return _write_lines(lines, out)
+
+
+def _write_lines(lines, out):
+    """Write (line, ok) results as they arrive; returns (written, errors)"""
+    written = errors = 0
+    for line, ok in lines:
+        out.write(line + '\n')
+        written += 1
+        if not ok:
+            errors += 1
+    return written, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Extract a cohort of completed lab submission DOCX files to JSONL'
+    )
+    parser.add_argument(
+        'format_file',
+        help='The lab\'s *_Submission_Format.md file'
+    )
+    parser.add_argument(
+        'source',
+        help='Directory of completed DOCX files, or a zip archive of them'
+    )
+    parser.add_argument(
+        '--output',
+        help='JSONL file to write (default: stdout)'
+    )
+    parser.add_argument(
+        '--jobs', '-j',
+        type=int,
+        default=0,
+        help='Number of worker processes; 0 uses every CPU (default: 0)'
+    )
+    
+    args = parser.parse_args()
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    
+    try:
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as out:
+                written, errors = extract_all(args.format_file, args.source, out, jobs=jobs)
+        else:
+            written, errors = extract_all(args.format_file, args.source, sys.stdout, jobs=jobs)
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    
+    print(f"Extracted {written} submissions, {errors} errors", file=sys.stderr)
+    if errors:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Benchmark the Lab Template Pipeline
+
+Measures LabSubmissionParser.parse, DOCXGenerator.generate and .save over
+every real *_Submission_Format.md file, plus synthetic formats whose body is
+repeated 10x and 100x. For each corpus it reports per-stage wall time,
+tracemalloc peak allocation and the peak RSS of the process that ran it.
+Each corpus runs in a freshly spawned interpreter so RSS figures do not
+leak between corpora. Everything runs offline.
+
+Results are written as JSON and can be compared against a stored baseline;
+the script exits non-zero when any metric regresses past the threshold.
+
+Usage:
+    python benchmark_templates.py [labs_dir] [--output FILE] [--baseline FILE] [--threshold 0.25]
+                                  [--scales 1,10,100] [--sample 4] [--repeat 3]
+                                  [--backend python-docx|stream]
+
+Example:
+    python benchmark_templates.py data/courses/seo-master-2026/content/labs --output bench.json
+    python benchmark_templates.py data/courses/seo-master-2026/content/labs --baseline bench.json
+"""
+
+import io
+import sys
+import json
+import time
+import platform
+import argparse
+import resource
+import tracemalloc
+import multiprocessing
+from datetime import datetime, timezone
+from concurrent.futures import ProcessPoolExecutor
+
+
+STAGES = ('parse', 'generate', 'save')
+
+# Metrics compared against a baseline; all are "lower is better"
+COMPARED_STAGE_METRICS = ('wall_s', 'alloc_peak_kb')
+
+# Bumped when results stop being comparable: 2 scales formats without a
+# Submission Checklist, which format 1 benchmarked unscaled
+RESULTS_FORMAT = 2
+
+
+def scale_format(text, scale):
+    """Build a synthetic format by repeating the body between the first and last rules
+    
+    The header (metadata) before the first `---` rule and the closing
+    lines after the last one are kept once, so the result still parses as
+    a single lab. Raises ValueError for a format without a body between
+    two rules, rather than benchmarking it unscaled.
+    """
+    if scale <= 1:
+        return text
+    
+    first_rule = text.find('\n---\n')
+    last_rule = text.rfind('\n---\n')
+    if first_rule == -1 or last_rule == first_rule:
+        raise ValueError("cannot scale a format without sections between two '---' rules")
+    
+    header = text[:first_rule]
+    body = text[first_rule:last_rule]
+    footer = text[last_rule:]
+    return header + body * scale + footer
+
+
+def load_corpora(base_dir, scales, sample):
+    """Return {corpus name: [(file name, markdown text)]}
+    
+    Scale 1 uses every real format; larger scales use the first `sample`
+    formats so a 100x run stays practical.
+    """
+    from generate_all_templates import find_submission_files
+    
+    files = find_submission_files(base_dir)
+    if not files:
+        raise FileNotFoundError(f"No submission format files found in {base_dir}")
+    
+    sources = [(path.name, path.read_text(encoding='utf-8')) for path in files]
+    
+    corpora = {}
+    for scale in scales:
+        if scale == 1:
+            corpora['real'] = sources
+        else:
+            corpora[f'x{scale}'] = []
+            for name, text in sources[:sample]:
+                try:
+                    corpora[f'x{scale}'].append((name, scale_format(text, scale)))
+                except ValueError as e:
+                    raise ValueError(f"{name}: {e}") from None
+    return corpora
+
+
+def _run_pipeline(docs, generator_class, timings=None, allocations=None):
+    """Run parse -> generate -> save over docs, accumulating per-stage metrics
+    
+    timings sums wall time per stage; allocations keeps the largest
+    tracemalloc peak seen per stage (tracing must already be started).
+    """
+    from parse_lab_submission import LabSubmissionParser
+    
+    for _, text in docs:
+        for stage in STAGES:
+            if allocations is not None:
+                tracemalloc.reset_peak()
+            start = time.perf_counter()
+            
+            if stage == 'parse':
+                parsed = LabSubmissionParser(io.StringIO(text)).parse()
+            elif stage == 'generate':
+                generator = generator_class(parsed)
+                generator.generate()
+            else:
+                generator.save(io.BytesIO())
+            
+            if timings is not None:
+                timings[stage] += time.perf_counter() - start
+            if allocations is not None:
+                allocations[stage] = max(allocations[stage], tracemalloc.get_traced_memory()[1])
+
+
+def benchmark_corpus(docs, repeat, backend):
+    """Benchmark one corpus; runs inside a dedicated worker process"""
+    from parse_lab_submission import generator_class as resolve_generator
+    
+    generator_class = resolve_generator(backend)
+    
+    # Warm up imports and the cached document skeleton
+    _run_pipeline(docs[:1], generator_class)
+    
+    runs = []
+    for _ in range(repeat):
+        timings = dict.fromkeys(STAGES, 0.0)
+        _run_pipeline(docs, generator_class, timings=timings)
+        runs.append(timings)
+    
+    # Allocation tracing slows everything down, so it gets its own pass
+    allocations = dict.fromkeys(STAGES, 0)
+    tracemalloc.start()
+    try:
+        _run_pipeline(docs, generator_class, allocations=allocations)
+    finally:
+        tracemalloc.stop()
+    
+    stages = {}
+    for stage in STAGES:
+        samples = sorted(run[stage] for run in runs)
+        stages[stage] = {
+            'wall_s': round(samples[len(samples) // 2], 6),
+            'wall_min_s': round(samples[0], 6),
+            'alloc_peak_kb': round(allocations[stage] / 1024, 1),
+        }
+    
+    return {
+        'files': len(docs),
+        'lines': sum(text.count('\n') + 1 for _, text in docs),
+        'stages': stages,
+        'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+
+def run_benchmarks(base_dir, scales=(1, 10, 100), sample=4, repeat=3, backend='python-docx'):
+    """Benchmark every corpus, each in a freshly spawned interpreter"""
+    corpora = load_corpora(base_dir, scales, sample)
+    context = multiprocessing.get_context('spawn')
+    
+    results = {
+        'format': RESULTS_FORMAT,
+        'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'backend': backend,
+        'repeat': repeat,
+        'corpora': {},
+    }
+    
+    for name, docs in corpora.items():
+        print(f"Benchmarking {name} ({len(docs)} files)...", end=' ', flush=True)
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            corpus = executor.submit(benchmark_corpus, docs, repeat, backend).result()
+        results['corpora'][name] = corpus
+        total = sum(stage['wall_s'] for stage in corpus['stages'].values())
+        print(f"{total:.3f}s")
+    
+    return results
+
+
+def print_results(results):
+    """Print a per-corpus, per-stage summary table"""
+    print()
+    print(f"{'corpus':<8} {'stage':<9} {'wall (s)':>10} {'alloc peak (KB)':>16} {'peak RSS (KB)':>14}")
+    print("-" * 61)
+    for name, corpus in results['corpora'].items():
+        for stage in STAGES:
+            metrics = corpus['stages'][stage]
+            print(f"{name:<8} {stage:<9} {metrics['wall_s']:>10.4f} {metrics['alloc_peak_kb']:>16.1f} "
+                  f"{corpus['peak_rss_kb'] if stage == STAGES[0] else '':>14}")
+
+
+def compare_results(results, baseline, threshold):
+    """Return regressions of results against baseline as printable strings
+    
+    A metric regresses when it exceeds the baseline by more than
+    `threshold` (a fraction, e.g. 0.25 for 25%). Raises ValueError for a
+    baseline in another results format.
+    """
+    if baseline.get('format') != RESULTS_FORMAT:
+        raise ValueError(f"baseline is in results format {baseline.get('format')}, not {RESULTS_FORMAT}; "
+                         f"record a new one with --output")
+    
+    regressions = []
+    
+    for name, corpus in results['corpora'].items():
+        base_corpus = baseline.get('corpora', {}).get(name)
+        if base_corpus is None:
+            continue
+        
+        checks = [('peak_rss_kb', corpus['peak_rss_kb'], base_corpus.get('peak_rss_kb'))]
+        for stage in STAGES:
+            for metric in COMPARED_STAGE_METRICS:
+                checks.append((f'{stage}.{metric}', corpus['stages'][stage][metric],
+                               base_corpus.get('stages', {}).get(stage, {}).get(metric)))
+        
+        for label, current, previous in checks:
+            if not previous:
+                continue
+            change = (current - previous) / previous
+            if change > threshold:
+                regressions.append(f"{name} {label}: {previous} -> {current} (+{change:.0%})")
+    
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark lab submission template parsing, generation and saving'
+    )
+    parser.add_argument(
+        'base_dir',
+        nargs='?',
+        default='data/courses/seo-master-2026/content/labs',
+        help='Directory containing *_Submission_Format.md files'
+    )
+    parser.add_argument(
+        '--output',
+        default='template_benchmark.json',
+        help='Where to write the JSON results (default: template_benchmark.json)'
+    )
+    parser.add_argument(
+        '--baseline',
+        help='Stored results to compare against'
+    )
+    parser.add_argument(
+        '--threshold',
+        type=float,
+        default=0.25,
+        help='Allowed fractional regression against the baseline (default: 0.25)'
+    )
+    parser.add_argument(
+        '--scales',
+        default='1,10,100',
+        help='Comma-separated corpus scales; 1 is the real formats (default: 1,10,100)'
+    )
+    parser.add_argument(
+        '--sample',
+        type=int,
+        default=4,
+        help='Number of formats used to build each synthetic corpus (default: 4)'
+    )
+    parser.add_argument(
+        '--repeat',
+        type=int,
+        default=3,
+        help='Timed repetitions per corpus; the median is reported (default: 3)'
+    )
+    parser.add_argument(
+        '--backend',
+        choices=['python-docx', 'stream'],
+        default='python-docx',
+        help='DOCX writer to benchmark (default: python-docx)'
+    )
+    
+    args = parser.parse_args()
+    
+    try:
+        scales = [int(scale) for scale in args.scales.split(',') if scale.strip()]
+        results = run_benchmarks(args.base_dir, scales=scales, sample=args.sample,
+                                 repeat=max(args.repeat, 1), backend=args.backend)
+        print_results(results)
+        
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+            f.write('\n')
+        print(f"\nResults written to {args.output}")
+        
+        if args.baseline:
+            with open(args.baseline, 'r', encoding='utf-8') as f:
+                baseline = json.load(f)
+            regressions = compare_results(results, baseline, args.threshold)
+            if regressions:
+                print(f"\n{len(regressions)} regressions over {args.threshold:.0%}:")
+                for regression in regressions:
+                    print(f"  ✗ {regression}")
+                sys.exit(1)
+            print(f"\nNo regressions over {args.threshold:.0%} against {args.baseline}")
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
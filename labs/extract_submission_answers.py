@@ -0,0 +1,425 @@
+#!/usr/bin/env python3
+"""
+Extract Answers from Completed Lab Submission DOCX Files
+
+Reads a learner's completed submission template back into structured
+answers, per section and question, using the submission format parsed by
+LabSubmissionParser as the map of what the template contained.
+
+Only word/document.xml is read, with a streaming iterparse that discards
+each body element once it has been handled. Embedded screenshots in
+word/media are never read or decoded (drawings are only counted), so
+screenshot-heavy submissions parse in milliseconds with flat memory.
+
+Answer areas in templates are content controls tagged with an anchor id
+derived from their section and question (see answer_anchor_id), so text
+inside one is attributed to its question by a direct lookup. Text outside
+any control is attributed to the question heading it follows. Answers are
+recovered by comparing that text against the template: a paragraph still
+holding the template's prompt text is unanswered, a 'Label: ____' line
+keeps whatever follows its label, and any other text a learner added is
+part of the answer.
+
+Usage:
+    python extract_submission_answers.py <submission_format_md> <completed_docx> [--output FILE]
+
+Example:
+    python extract_submission_answers.py data/courses/seo-master-2026/content/labs/Day_01_Lab_01_Submission_Format.md \\
+        Day01_Lab01_Submission_Template.docx --output answers.json
+"""
+
+import re
+import sys
+import json
+import zipfile
+import argparse
+
+from lxml import etree
+
+from parse_lab_submission import (
+    LabSubmissionParser, anchor_question_key, question_anchor_key, section_blocks
+)
+
+
+W_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+W_BODY = f'{W_NS}body'
+W_P = f'{W_NS}p'
+W_TBL = f'{W_NS}tbl'
+W_TR = f'{W_NS}tr'
+W_TC = f'{W_NS}tc'
+W_SDT = f'{W_NS}sdt'
+W_SDT_CONTENT = f'{W_NS}sdtContent'
+W_SDT_TAG = f'{W_NS}sdtPr/{W_NS}tag'
+W_T = f'{W_NS}t'
+W_TAB = f'{W_NS}tab'
+W_BR = f'{W_NS}br'
+W_P_STYLE = f'{W_NS}pStyle'
+W_VAL = f'{W_NS}val'
+W_TYPE = f'{W_NS}type'
+W_DRAWING = f'{W_NS}drawing'
+W_PICT = f'{W_NS}pict'
+
+# Placeholder text left in answer areas: blanks to fill and '[...]' prompts
+BLANK_RE = re.compile(r'_{3,}\**')
+BRACKET_RE = re.compile(r'\[[^\]]*\]?')
+
+# Headings DOCXGenerator emits around the markdown sections
+INSTRUCTIONS_HEADING = 'Instructions'
+SELF_ASSESSMENT_HEADING = 'Self-Assessment'
+TRAINER_HEADING = 'Trainer Feedback (Read-Only)'
+
+# Cover fields filled in by the learner -> key in the extracted 'learner'
+LEARNER_FIELDS = {'Learner Name:': 'name', 'Email:': 'email', 'Date:': 'date'}
+LEARNER_ANCHOR_PREFIX = 'learner-'
+
+# Pseudo-scopes for content outside any question
+COVER = 'cover'
+TRAINER = 'trainer'
+
+
+class TemplateQuestion:
+    """What the template put under one question heading"""
+    
+    def __init__(self, section, title, key):
+        self.section = section
+        self.title = title
+        self.key = key
+        self.prompts = set()
+        self.labels = []
+        self.brackets = []
+        self.tables = []
+    
+    def add_prompt(self, text):
+        """Record a prompt paragraph and the label and placeholders it contains"""
+        self.prompts.add(text)
+        self.brackets.extend(match.group(0) for match in BRACKET_RE.finditer(text) if len(match.group(0)) > 2)
+        
+        blank = re.search(r'_{3,}|\[', text)
+        if blank:
+            label = text[:blank.start()]
+            if label.rstrip(' *').endswith(':'):
+                self.labels.append(label)
+    
+    def answer_text(self, text):
+        """The part of a paragraph's text that the learner wrote, or ''
+        
+        For 'Label: ____' prompts the answer is returned as 'Label: value'.
+        """
+        if text in self.prompts:
+            return ''
+        
+        label = ''
+        for prefix in self.labels:
+            if text.startswith(prefix):
+                label, text = prefix, text[len(prefix):]
+                break
+        
+        for bracket in self.brackets:
+            text = text.replace(bracket, '')
+        text = BLANK_RE.sub('', text).strip()
+        
+        # Keep the label so several blanks under one heading stay distinguishable
+        if text and label:
+            return f"{label.rstrip(' *')} {text}"
+        return text
+
+
+class AnswerExtractor:
+    """Extract learner answers from completed DOCX submissions for one lab
+    
+    The outline of the template (question headings, anchor keys and the
+    prompt text under each question) is built once from the parsed
+    submission format, so one extractor can be reused across every
+    learner's submission.
+    """
+    
+    def __init__(self, parsed_data):
+        self.metadata = parsed_data.metadata
+        self.sections = []
+        self.questions = []
+        self.headings = []
+        self._by_key = {}
+        self._declaration = None
+        self._build_outline(parsed_data)
+    
+    def _build_outline(self, parsed_data):
+        """Mirror DOCXGenerator's section order as a list of headings"""
+        declarations = [section for section in parsed_data.of_type('meta') if 'declaration' in section.key]
+        
+        for index, section in enumerate(parsed_data.of_type('instruction')):
+            self._add_section(section, INSTRUCTIONS_HEADING if index == 0 else None)
+        for section in parsed_data.of_type('question'):
+            self._add_section(section, section.title)
+        for index, section in enumerate(parsed_data.of_type('self_assessment')):
+            self._add_section(section, SELF_ASSESSMENT_HEADING if index == 0 else None)
+        
+        self.headings.append((TRAINER_HEADING, TRAINER))
+        
+        for index, section in enumerate(declarations):
+            question = self._add_section(section, None)
+            if index == 0:
+                # The declaration has no heading; it starts at the page break after the trainer block
+                self._declaration = question
+    
+    def _add_section(self, section, heading):
+        """Add a section's questions and headings; returns its leading question
+        
+        Content before the section's first heading belongs to a question
+        titled after the section itself, numbered like DOCXGenerator's
+        answer anchors.
+        """
+        section_index = len(self.sections)
+        self.sections.append({'title': section.title, 'type': section.type})
+        
+        question = self._add_question(section_index, section.title, heading, question_anchor_key(section.number, 0))
+        leading = question
+        question_number = 0
+        
+        for block in section_blocks(section):
+            if block.kind == 'table':
+                question.tables.append(block.rows)
+            elif block.kind == 'heading':
+                # Same question numbering as DOCXGenerator._add_markdown_content
+                if question_number == 0 and block.text == section.title:
+                    self.headings.append((block.text, leading))
+                else:
+                    question_number += 1
+                    question = self._add_question(section_index, block.text, block.text,
+                                                  question_anchor_key(section.number, question_number))
+            else:
+                # Document text is read back stripped, code lines included
+                question.add_prompt(block.text.strip())
+        
+        return leading
+    
+    def _add_question(self, section_index, title, heading, key):
+        """Add a question, found at heading if the document has one"""
+        question = TemplateQuestion(section_index, title, key)
+        self.questions.append(question)
+        self._by_key[key] = question
+        if heading is not None:
+            self.headings.append((heading, question))
+        return question
+    
+    def extract(self, source):
+        """Extract answers from a completed DOCX (a path or binary file object)"""
+        results = {id(question): {'answer': [], 'tables': [], 'images': 0} for question in self.questions}
+        learner = dict.fromkeys(LEARNER_FIELDS.values(), '')
+        
+        scope = COVER
+        next_heading = 0
+        
+        for kind, block, anchor_id in self._iter_blocks(source):
+            target = scope
+            if anchor_id is not None:
+                if anchor_id.startswith(LEARNER_ANCHOR_PREFIX):
+                    key, value = _learner_field(block[0])
+                    learner[key or anchor_id[len(LEARNER_ANCHOR_PREFIX):]] = value
+                    continue
+                target = self._by_key.get(anchor_question_key(anchor_id), scope)
+            
+            if kind == 'table':
+                if isinstance(target, TemplateQuestion):
+                    result = results[id(target)]
+                    result['images'] += block['images']
+                    # Tables are matched to the template's by position within the question
+                    table_index = len(result['tables'])
+                    template_rows = target.tables[table_index] if table_index < len(target.tables) else []
+                    result['tables'].append(self._table_answers(block['rows'], template_rows, target))
+                continue
+            
+            text, style, images, page_break = block
+            
+            if anchor_id is None and style.startswith('Heading') and text:
+                found = self._find_heading(text, next_heading)
+                if found is not None:
+                    next_heading = found + 1
+                    scope = self.headings[found][1]
+                    continue
+            
+            if target is TRAINER:
+                if page_break and self._declaration is not None:
+                    scope = self._declaration
+                continue
+            
+            if target is COVER:
+                key, value = _learner_field(text)
+                if key is not None:
+                    learner[key] = value
+                continue
+            
+            result = results[id(target)]
+            result['images'] += images
+            if text:
+                answer = target.answer_text(text)
+                if answer:
+                    result['answer'].append(answer)
+        
+        return self._assemble(results, learner)
+    
+    def _find_heading(self, text, start):
+        """Index of the next outline heading with this text, or None"""
+        for index in range(start, len(self.headings)):
+            if self.headings[index][0] == text:
+                return index
+        return None
+    
+    def _table_answers(self, rows, template_rows, question):
+        """Table cells as columns plus body rows, blanking cells left as in the template"""
+        if not rows:
+            return {'columns': [], 'rows': []}
+        
+        body = []
+        for row_index, cells in enumerate(rows[1:], start=1):
+            template_cells = template_rows[row_index] if row_index < len(template_rows) else []
+            values = []
+            for cell_index, text in enumerate(cells):
+                template_text = template_cells[cell_index] if cell_index < len(template_cells) else None
+                values.append('' if text == template_text else question.answer_text(text))
+            body.append(values)
+        
+        return {'columns': rows[0], 'rows': body}
+    
+    def _assemble(self, results, learner):
+        """Group per-question results by section, dropping empty leading questions"""
+        sections = [dict(section, questions=[]) for section in self.sections]
+        
+        for question in self.questions:
+            result = results[id(question)]
+            tables = result['tables']
+            filled = bool(result['answer'] or result['images']
+                          or any(value for table in tables for row in table['rows'] for value in row))
+            
+            if not (question.prompts or question.tables or filled) and question.title == sections[question.section]['title']:
+                continue
+            
+            sections[question.section]['questions'].append({
+                'title': question.title,
+                'answer': '\n'.join(result['answer']),
+                'tables': tables,
+                'images': result['images'],
+                'filled': filled,
+            })
+        
+        return {
+            'lab': self.metadata,
+            'learner': learner,
+            'sections': [section for section in sections if section['questions']],
+        }
+    
+    def _iter_blocks(self, source):
+        """Yield ('paragraph', (text, style, images, page_break), anchor id) and ('table', {...}, anchor id)
+        
+        The anchor id is the tag of the content control holding the block,
+        or None. Top-level body elements are handled as soon as they close
+        and then removed from the tree, so memory stays bounded by the
+        largest one.
+        """
+        with zipfile.ZipFile(source) as package, package.open('word/document.xml') as stream:
+            # lxml filters events by tag in C, so only block elements reach Python
+            for _, elem in etree.iterparse(stream, events=('end',), tag=(W_P, W_TBL, W_SDT)):
+                parent = elem.getparent()
+                if parent is not None and parent.tag == W_BODY:
+                    yield from self._body_blocks(elem)
+                    parent.remove(elem)
+    
+    def _body_blocks(self, elem, anchor_id=None):
+        """Yield the paragraphs and tables of one top-level body element"""
+        if elem.tag == W_P:
+            yield 'paragraph', _paragraph_info(elem), anchor_id
+        elif elem.tag == W_TBL:
+            rows = []
+            images = 0
+            for tr in elem.iter(W_TR):
+                cells = []
+                for tc in tr.findall(W_TC):
+                    paragraphs = [_paragraph_info(p) for p in tc.iter(W_P)]
+                    cells.append('\n'.join(info[0] for info in paragraphs if info[0]))
+                    images += sum(info[2] for info in paragraphs)
+                rows.append(cells)
+            yield 'table', {'rows': rows, 'images': images}, anchor_id
+        elif elem.tag == W_SDT:
+            tag = elem.find(W_SDT_TAG)
+            if tag is not None:
+                anchor_id = tag.get(W_VAL)
+            content = elem.find(W_SDT_CONTENT)
+            if content is not None:
+                for child in content:
+                    yield from self._body_blocks(child, anchor_id)
+
+
+def _learner_field(text):
+    """(learner key, value) of a cover field paragraph; key is None if no label matches"""
+    for label, key in LEARNER_FIELDS.items():
+        if text.startswith(label):
+            return key, BLANK_RE.sub('', text[len(label):]).strip()
+    return None, BLANK_RE.sub('', text).strip()
+
+
+def _paragraph_info(p):
+    """(text, style id, drawing count, has page break) of a w:p element"""
+    parts = []
+    images = 0
+    page_break = False
+    style = ''
+    
+    for elem in p.iter():
+        tag = elem.tag
+        if tag == W_T:
+            parts.append(elem.text or '')
+        elif tag == W_TAB:
+            parts.append('\t')
+        elif tag == W_BR:
+            if elem.get(W_TYPE) == 'page':
+                page_break = True
+            else:
+                parts.append('\n')
+        elif tag == W_P_STYLE:
+            style = elem.get(W_VAL, '')
+        elif tag == W_DRAWING or tag == W_PICT:
+            images += 1
+    
+    return ''.join(parts).strip(), style, images, page_break
+
+
+def extract_answers(format_file, docx_file):
+    """Extract answers from one completed DOCX against its submission format"""
+    parsed_data = LabSubmissionParser(format_file).parse()
+    return AnswerExtractor(parsed_data).extract(docx_file)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Extract learner answers from a completed lab submission DOCX as JSON'
+    )
+    parser.add_argument(
+        'format_file',
+        help='The lab\'s *_Submission_Format.md file'
+    )
+    parser.add_argument(
+        'docx_file',
+        help='Completed submission DOCX'
+    )
+    parser.add_argument(
+        '--output',
+        help='Where to write the JSON answers (default: stdout)'
+    )
+    
+    args = parser.parse_args()
+    
+    try:
+        answers = extract_answers(args.format_file, args.docx_file)
+        text = json.dumps(answers, indent=2, ensure_ascii=False)
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                f.write(text + '\n')
+            print(f"Answers written to {args.output}")
+        else:
+            print(text)
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -5,17 +5,66 @@ Generate DOCX Templates for All Lab Submissions
 This script automatically finds all lab submission format markdown files
 and generates corresponding DOCX templates.
 
+Builds are incremental: a manifest in the output directory records, per
+submission format, the source content hash, the generator version, the
+backend and the hashes of every output - the DOCX template, its anchor
+index, and the HTML answer form and its JSON Schema. Formats whose source,
+generator version, backend and outputs are all unchanged are skipped, and
+templates whose format was removed are pruned along with their sidecars.
+
+With --jobs N the remaining templates are built across a pool of N worker
+processes. Progress is still reported in Day/Lab order. --backend stream
+uses the bounded-memory OOXML writer instead of python-docx. --profile FILE
+writes a JSON trace of per-stage timings and paragraph/run counts for every
+template built.
+
+With --catalog, every course under data/courses/*/content/labs is built
+into its own assets/templates directory, with all courses' templates
+scheduled through one shared worker pool, followed by a per-course summary.
+
+With --watch, the script keeps running after the build and polls the
+submission formats, rebuilding only the templates whose format changed
+once a burst of saves has settled. Rebuilds run in the same warm process.
+
+With --check, the submission formats (of every course, with --catalog) are
+only parsed and validated, in parallel, and nothing is written. python-docx
+is never imported, so this is fast enough for a pre-commit hook.
+--check-reproducible instead builds every template twice in memory and
+checks that the two DOCX packages are byte-identical.
+
 Usage:
-    python generate_all_templates.py [base_dir] [output_dir]
+    python generate_all_templates.py [base_dir] [output_dir] [course_name] [--force] [--jobs N]
+                                     [--backend python-docx|stream] [--profile FILE]
+                                     [--watch] [--interval SECONDS] [--catalog [COURSES_DIR]] [--check]
+                                     [--check-reproducible]
 
 Example:
     python generate_all_templates.py data/courses/seo-master-2026/content/labs labs/templates/
 """
 
+import io
 import sys
 import os
+import re
+import json
+import time
+import hashlib
+import zipfile
+import argparse
+import traceback
+from functools import partial
 from pathlib import Path
-from parse_lab_submission import generate_docx_template
+from parse_lab_submission import (
+    generate_docx_template, generator_class, package_timestamp, template_sidecars, validate_submission_format,
+    BuildProfile, LabSubmissionParser, GENERATOR_VERSION
+)
+
+
+MANIFEST_NAME = '.template_manifest.json'
+MANIFEST_FORMAT = 1
+
+# Quiet period after the last change before --watch rebuilds
+WATCH_DEBOUNCE_SECONDS = 0.3
 
 
 def find_submission_files(base_dir):
@@ -27,7 +76,6 @@ def find_submission_files(base_dir):
     
     # Find all files matching pattern: Day_XX_Lab_XX_Submission_Format.md
     pattern = r'Day_\d+_Lab_\d+_Submission_Format\.md'
-    import re
     
     submission_files = []
     for file_path in base_path.glob('**/*.md'):
@@ -46,49 +94,625 @@ def find_submission_files(base_dir):
     return submission_files
 
 
-def generate_all_templates(base_dir, output_dir=None, course_name='seo-master-2026'):
-    """Generate DOCX templates for all lab submissions"""
+def _file_digest(path):
+    """SHA-256 hex digest of a file's bytes"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _stat_key(path):
+    """(mtime_ns, size) of a file, or None if it does not exist"""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+def load_manifest(output_dir):
+    """Load the build manifest for an output directory"""
+    manifest_path = Path(output_dir) / MANIFEST_NAME
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+    
+    if manifest.get('format') != MANIFEST_FORMAT:
+        return {}
+    return manifest.get('templates', {})
+
+
+def save_manifest(output_dir, entries):
+    """Atomically write the build manifest for an output directory"""
+    manifest_path = Path(output_dir) / MANIFEST_NAME
+    tmp_path = manifest_path.with_name(manifest_path.name + '.tmp')
+    
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'format': MANIFEST_FORMAT, 'templates': entries}, f, indent=2, sort_keys=True)
+        f.write('\n')
+    os.replace(tmp_path, manifest_path)
+
+
+def is_up_to_date(entry, source_path, output_dir, backend='python-docx'):
+    """Check a manifest entry against the source and output on disk
+    
+    Unchanged (mtime, size) stats short-circuit the check; files are only
+    re-hashed when their stat has moved. Refreshed stats are written back
+    into the entry.
+    """
+    if not entry or entry.get('generator_version') != GENERATOR_VERSION:
+        return False
+    if entry.get('backend', 'python-docx') != backend:
+        return False
+    
+    source_stat = _stat_key(source_path)
+    if source_stat != entry.get('source_stat'):
+        if source_stat is None or _file_digest(source_path) != entry.get('source_hash'):
+            return False
+        entry['source_stat'] = source_stat
+    
+    for field in ('output', 'index', 'form', 'schema'):
+        if field not in entry:
+            return False
+        path = Path(output_dir) / entry[field]
+        stat = _stat_key(path)
+        if stat != entry.get(f'{field}_stat'):
+            if stat is None or _file_digest(path) != entry.get(f'{field}_hash'):
+                return False
+            entry[f'{field}_stat'] = stat
+    
+    return True
+
+
+def _manifest_entry(source_path, output_path, backend):
+    """Build a manifest entry for a freshly generated template"""
+    output_path = Path(output_path)
+    entry = {
+        'backend': backend,
+        'source_hash': _file_digest(source_path),
+        'source_stat': _stat_key(source_path),
+        'generator_version': GENERATOR_VERSION,
+    }
+    for field, path in [('output', output_path)] + template_sidecars(output_path):
+        entry[field] = path.name
+        entry[f'{field}_hash'] = _file_digest(path)
+        entry[f'{field}_stat'] = _stat_key(path)
+    return entry
+
+
+def prune_removed(manifest, current_keys, output_dir):
+    """Delete templates whose submission format no longer exists"""
+    pruned = []
+    kept_outputs = {entry['output'] for key, entry in manifest.items() if key in current_keys}
+    
+    for key in sorted(set(manifest) - current_keys):
+        entry = manifest.pop(key)
+        output_name = entry.get('output')
+        # Another format may now own the same Day/Lab filename
+        if output_name and output_name not in kept_outputs:
+            output_path = Path(output_dir) / output_name
+            for path in [output_path] + [path for _, path in template_sidecars(output_path)]:
+                if path.exists():
+                    path.unlink()
+            pruned.append(output_name)
+    
+    return pruned
+
+
+def _build_template(task):
+    """Generate one template; runs in a worker process when --jobs > 1
+    
+    Exceptions are caught here so that one bad format never tears down the
+    pool; the formatted traceback is returned to the parent instead.
+    """
+    key, submission_file, output_dir, course_name, backend, profiled = task
+    profile = BuildProfile() if profiled else None
+    try:
+        output_path = generate_docx_template(submission_file, output_dir, course_name, verbose=False,
+                                             backend=backend, profile=profile)
+        return {'key': key, 'entry': _manifest_entry(submission_file, output_path, backend), 'error': None,
+                'profile': profile.to_dict() if profile else None}
+    except Exception as e:
+        return {'key': key, 'entry': None, 'error': str(e), 'traceback': traceback.format_exc()}
+
+
+def _run_tasks(tasks, jobs):
+    """Yield build results in task order, serially or across a process pool"""
+    if jobs <= 1 or len(tasks) <= 1:
+        for task in tasks:
+            yield _build_template(task)
+        return
+    
+    from concurrent.futures import ProcessPoolExecutor
+    
+    with ProcessPoolExecutor(max_workers=min(jobs, len(tasks))) as executor:
+        # map() yields in submission order, keeping output deterministic
+        yield from executor.map(_build_template, tasks)
+
+
+def write_profile(profile_path, traces):
+    """Write per-template traces plus totals summed across templates by stage"""
+    totals = {}
+    for trace in traces:
+        for name, stage in trace['stages'].items():
+            total = totals.setdefault(name, {'seconds': 0.0, 'calls': 0})
+            for metric, value in stage.items():
+                if isinstance(value, (int, float)):
+                    total[metric] = total.get(metric, 0) + value
+    
+    for total in totals.values():
+        total['seconds'] = round(total['seconds'], 6)
+    
+    with open(profile_path, 'w', encoding='utf-8') as f:
+        json.dump({'templates': traces, 'totals_by_stage': totals}, f, indent=2)
+        f.write('\n')
+
+
+def _resolve_output_dir(output_dir, course_name):
+    """The given output directory, or the course-specific assets directory"""
     if output_dir is None:
-        # Default to course-specific assets directory
-        output_dir = Path(f'data/courses/{course_name}/assets/templates')
-    else:
-        output_dir = Path(output_dir)
+        return Path(f'data/courses/{course_name}/assets/templates')
+    return Path(output_dir)
+
+
+def discover_courses(courses_dir):
+    """(course name, labs directory) for every course under courses_dir with content/labs"""
+    courses_path = Path(courses_dir)
+    if not courses_path.exists():
+        raise FileNotFoundError(f"Courses directory not found: {courses_path}")
+    
+    return [(path.name, path / 'content' / 'labs')
+            for path in sorted(courses_path.iterdir())
+            if (path / 'content' / 'labs').is_dir()]
+
+
+def _plan_course(base_dir, output_dir, course_name, force, backend, profiled):
+    """Prune removed formats and collect the build tasks for one course
     
+    Returns a plan dict holding the course's manifest, its tasks and the
+    counters that _record_result() and _finish_course() fill in.
+    """
+    output_dir = Path(output_dir)
     output_dir.mkdir(parents=True, exist_ok=True)
     
     submission_files = find_submission_files(base_dir)
+    base_path = Path(base_dir)
+    
+    manifest = load_manifest(output_dir)
+    current_keys = {path.relative_to(base_path).as_posix() for path in submission_files}
+    
+    plan = {
+        'course_name': course_name,
+        'base_dir': base_dir,
+        'output_dir': output_dir,
+        'manifest': manifest,
+        'files': len(submission_files),
+        'pruned': prune_removed(manifest, current_keys, output_dir),
+        'tasks': [],
+        'skipped': 0,
+        'success': 0,
+        'errors': [],
+        'traces': [],
+    }
+    
+    for submission_file in submission_files:
+        key = submission_file.relative_to(base_path).as_posix()
+        
+        if not force and is_up_to_date(manifest.get(key), submission_file, output_dir, backend):
+            plan['skipped'] += 1
+            continue
+        
+        plan['tasks'].append((key, submission_file, output_dir, course_name, backend, profiled))
+    
+    return plan
+
+
+def _record_result(plan, result, prefix=''):
+    """Apply one build result to its course's manifest and print its progress line"""
+    name = Path(result['key']).name
+    if result['error'] is None:
+        plan['manifest'][result['key']] = result['entry']
+        print(f"Processing: {prefix}{name}... ✓")
+        plan['success'] += 1
+        if result['profile'] is not None:
+            plan['traces'].append(result['profile'])
+    else:
+        plan['manifest'].pop(result['key'], None)
+        print(f"Processing: {prefix}{name}... ✗ Error: {result['error']}")
+        plan['errors'].append((prefix + name, result['error'], result['traceback']))
+
+
+def _finish_course(plan):
+    """Save a course's manifest and print its pruned templates"""
+    save_manifest(plan['output_dir'], plan['manifest'])
+    for output_name in plan['pruned']:
+        print(f"Pruned: {output_name}")
+
+
+def _print_tracebacks(errors):
+    """Print the traceback of every failed template to stderr"""
+    for name, _, tb in errors:
+        print(f"\n--- {name} ---", file=sys.stderr)
+        print(tb.rstrip(), file=sys.stderr)
+
+
+def _summary(plan):
+    """'N successful, N unchanged, N pruned, N errors' for a course plan"""
+    return (f"{plan['success']} successful, {plan['skipped']} unchanged, "
+            f"{len(plan['pruned'])} pruned, {len(plan['errors'])} errors")
+
+
+def generate_all_templates(base_dir, output_dir=None, course_name='seo-master-2026', force=False, jobs=1,
+                           backend='python-docx', profile_path=None):
+    """Generate DOCX templates for all lab submissions
+    
+    Returns a list of (submission file name, error message, traceback) for
+    every template that failed to build. With profile_path, a JSON trace of
+    every template built is written there.
+    """
+    output_dir = _resolve_output_dir(output_dir, course_name)
+    plan = _plan_course(base_dir, output_dir, course_name, force, backend, profile_path is not None)
     
-    if not submission_files:
+    if not plan['files']:
         print(f"No submission format files found in {base_dir}")
-        return
+        save_manifest(output_dir, plan['manifest'])
+        return []
     
-    print(f"Found {len(submission_files)} submission format files")
+    print(f"Found {plan['files']} submission format files")
     print(f"Output directory: {output_dir}\n")
     
-    success_count = 0
-    error_count = 0
+    for result in _run_tasks(plan['tasks'], jobs):
+        _record_result(plan, result)
     
-    for submission_file in submission_files:
-        try:
-            print(f"Processing: {submission_file.name}...", end=' ')
-            generate_docx_template(submission_file, output_dir, course_name)
-            print("✓")
-            success_count += 1
-        except Exception as e:
-            print(f"✗ Error: {e}")
-            error_count += 1
+    _finish_course(plan)
+    
+    if profile_path is not None:
+        write_profile(profile_path, plan['traces'])
+        print(f"Profile written to {profile_path}")
+    
+    _print_tracebacks(plan['errors'])
+    
+    print(f"\nCompleted: {_summary(plan)}")
     
-    print(f"\nCompleted: {success_count} successful, {error_count} errors")
+    return plan['errors']
 
 
-if __name__ == '__main__':
-    base_dir = sys.argv[1] if len(sys.argv) > 1 else 'data/courses/seo-master-2026/content/labs'
-    output_dir = sys.argv[2] if len(sys.argv) > 2 else None
-    course_name = sys.argv[3] if len(sys.argv) > 3 else 'seo-master-2026'
+def generate_catalog_templates(courses_dir='data/courses', force=False, jobs=1, backend='python-docx',
+                               profile_path=None):
+    """Generate templates for every course under courses_dir
+    
+    Each course keeps its own manifest and writes to its own
+    assets/templates directory, but the templates of all courses are
+    scheduled through a single pool, so the worker processes (and the
+    document skeleton each one caches) are shared across the catalog.
+    Returns the failed templates of every course, as generate_all_templates().
+    """
+    courses = discover_courses(courses_dir)
+    if not courses:
+        print(f"No courses with content/labs found in {courses_dir}")
+        return []
+    
+    plans = []
+    for course_name, labs_dir in courses:
+        output_dir = Path(courses_dir) / course_name / 'assets' / 'templates'
+        plan = _plan_course(labs_dir, output_dir, course_name, force, backend, profile_path is not None)
+        print(f"{course_name}: {plan['files']} submission format files -> {output_dir}")
+        plans.append(plan)
+    print()
+    
+    # Tasks run course by course, in Day/Lab order within each course
+    owners = [plan for plan in plans for _ in plan['tasks']]
+    tasks = [task for plan in plans for task in plan['tasks']]
+    
+    for plan, result in zip(owners, _run_tasks(tasks, jobs)):
+        _record_result(plan, result, prefix=f"{plan['course_name']}/")
+    
+    errors = []
+    for plan in plans:
+        _finish_course(plan)
+        errors.extend(plan['errors'])
+    
+    if profile_path is not None:
+        write_profile(profile_path, [trace for plan in plans for trace in plan['traces']])
+        print(f"Profile written to {profile_path}")
+    
+    _print_tracebacks(errors)
+    
+    print("\nCourse summary:")
+    width = max(len(plan['course_name']) for plan in plans)
+    for plan in plans:
+        print(f"  {plan['course_name']:<{width}}  {_summary(plan)}")
+    
+    totals = {
+        'success': sum(plan['success'] for plan in plans),
+        'skipped': sum(plan['skipped'] for plan in plans),
+        'pruned': [name for plan in plans for name in plan['pruned']],
+        'errors': errors,
+    }
+    print(f"\nCompleted {len(plans)} courses: {_summary(totals)}")
+    
+    return errors
+
+
+def _check_format(path):
+    """Parse and validate one submission format; returns (path, problems)"""
+    try:
+        return path, validate_submission_format(LabSubmissionParser(path).parse())
+    except Exception as e:
+        return path, [f"Error: {e}"]
+
+
+def _check_reproducible(backend, path):
+    """Build one template twice in memory; returns (path, problems)
+    
+    The two packages must be byte-identical, and every zip entry must carry
+    the fixed package_timestamp() rather than the time it was written.
+    """
+    try:
+        parsed_data = LabSubmissionParser(path).parse()
+        builds = []
+        for _ in range(2):
+            generator = generator_class(backend)(parsed_data)
+            generator.generate()
+            buffer = io.BytesIO()
+            generator.save(buffer)
+            builds.append(buffer.getvalue())
+    except Exception as e:
+        return path, [f"Error: {e}"]
+    
+    problems = []
+    if builds[0] != builds[1]:
+        problems.append("two builds differ")
+    
+    # Zip entries store seconds at a 2-second resolution
+    timestamp = package_timestamp()
+    expected = tuple(timestamp[:5]) + (timestamp[5] // 2 * 2,)
+    with zipfile.ZipFile(io.BytesIO(builds[0])) as package:
+        stamped = [info.filename for info in package.infolist() if info.date_time != expected]
+    if stamped:
+        problems.append(f"entries not at the fixed timestamp: {', '.join(stamped)}")
+    
+    return path, problems
+
+
+def check_formats(base_dirs, jobs=1, check=_check_format):
+    """Validate every submission format under base_dirs without building anything
+    
+    Only the markdown is parsed, so python-docx is never imported. Formats
+    are checked across `jobs` processes in a few large chunks, since each
+    one takes well under a millisecond. check(path) returns (path,
+    problems); pass another check, such as _check_reproducible, to run it
+    the same way. Returns the number of formats with problems.
+    """
+    files = [path for base_dir in base_dirs for path in find_submission_files(base_dir)]
+    if not files:
+        print(f"No submission format files found in {', '.join(map(str, base_dirs))}")
+        return 0
+    
+    if jobs <= 1 or len(files) <= 1:
+        results = map(check, files)
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        
+        workers = min(jobs, len(files))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(check, files, chunksize=-(-len(files) // workers)))
+    
+    failed = 0
+    for path, problems in results:
+        if problems:
+            failed += 1
+            print(f"Checking: {path}... ✗ {'; '.join(problems)}")
+        else:
+            print(f"Checking: {path}... ✓")
+    
+    print(f"\nChecked {len(files)} formats: {len(files) - failed} passed, {failed} with problems")
+    return failed
+
+
+def _scan_sources(base_dir):
+    """{manifest key: (mtime_ns, size)} of every submission format under base_dir"""
+    base_path = Path(base_dir)
+    sources = {}
+    for path in find_submission_files(base_path):
+        stat = _stat_key(path)
+        if stat is not None:
+            sources[path.relative_to(base_path).as_posix()] = stat
+    return sources
+
+
+def _wait_for_changes(base_dir, known, interval, debounce=WATCH_DEBOUNCE_SECONDS):
+    """Poll until the formats differ from `known` and then stop changing
+    
+    Returns the settled {key: stat} snapshot, so a burst of saves to one
+    or several files triggers a single rebuild.
+    """
+    while True:
+        time.sleep(interval)
+        current = _scan_sources(base_dir)
+        if current != known:
+            break
+    
+    while True:
+        time.sleep(debounce)
+        settled = _scan_sources(base_dir)
+        if settled == current:
+            return settled
+        current = settled
+
+
+def watch_templates(base_dir, output_dir=None, course_name='seo-master-2026', backend='python-docx',
+                    interval=0.5):
+    """Rebuild templates whose submission format changes, until interrupted
+    
+    Call after a full generate_all_templates() run. Only changed formats
+    are rebuilt, in this process, so the imports and the cached document
+    skeleton stay warm between rebuilds.
+    """
+    output_dir = _resolve_output_dir(output_dir, course_name)
+    base_path = Path(base_dir)
+    
+    # Import the backend and build its cached skeleton before the first edit
+    generator_class(backend)._get_skeleton()
+    
+    known = _scan_sources(base_path)
+    print(f"\nWatching {base_path} for changes (Ctrl+C to stop)...")
+    
+    while True:
+        current = _wait_for_changes(base_path, known, interval)
+        changed = sorted(key for key, stat in current.items() if known.get(key) != stat)
+        known = current
+        
+        manifest = load_manifest(output_dir)
+        for key in changed:
+            start = time.perf_counter()
+            result = _build_template((key, base_path / key, output_dir, course_name, backend, False))
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            name = Path(key).name
+            if result['error'] is None:
+                manifest[key] = result['entry']
+                print(f"Rebuilt: {name} -> {result['entry']['output']} in {elapsed_ms:.0f} ms ✓")
+            else:
+                manifest.pop(key, None)
+                print(f"Rebuilt: {name}... ✗ Error: {result['error']}")
+                print(result['traceback'].rstrip(), file=sys.stderr)
+        
+        for output_name in prune_removed(manifest, set(current), output_dir):
+            print(f"Pruned: {output_name}")
+        save_manifest(output_dir, manifest)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Generate DOCX templates for all lab submission formats'
+    )
+    parser.add_argument(
+        'base_dir',
+        nargs='?',
+        default='data/courses/seo-master-2026/content/labs',
+        help='Directory containing *_Submission_Format.md files'
+    )
+    parser.add_argument(
+        'output_dir',
+        nargs='?',
+        default=None,
+        help='Output directory (default: data/courses/<course_name>/assets/templates)'
+    )
+    parser.add_argument(
+        'course_name',
+        nargs='?',
+        default='seo-master-2026',
+        help='Course identifier (default: seo-master-2026)'
+    )
+    parser.add_argument(
+        '--force',
+        action='store_true',
+        help='Ignore the build manifest and regenerate every template'
+    )
+    parser.add_argument(
+        '--jobs', '-j',
+        type=int,
+        default=None,
+        help='Number of worker processes; 0 uses every CPU (default: 1, or every CPU with --check)'
+    )
+    parser.add_argument(
+        '--backend',
+        choices=['python-docx', 'stream'],
+        default='python-docx',
+        help='DOCX writer: python-docx or the streaming OOXML writer (default: python-docx)'
+    )
+    parser.add_argument(
+        '--profile',
+        metavar='FILE',
+        help='Write a JSON trace of per-stage timings and paragraph/run counts to FILE'
+    )
+    parser.add_argument(
+        '--watch',
+        action='store_true',
+        help='After building, keep rebuilding templates as submission formats change'
+    )
+    parser.add_argument(
+        '--interval',
+        type=float,
+        default=0.5,
+        help='Seconds between --watch polls of the submission formats (default: 0.5)'
+    )
+    parser.add_argument(
+        '--catalog',
+        nargs='?',
+        const='data/courses',
+        metavar='COURSES_DIR',
+        help='Build every course under COURSES_DIR/*/content/labs through one shared pool '
+             '(default: data/courses); positional arguments are ignored'
+    )
+    parser.add_argument(
+        '--check',
+        action='store_true',
+        help='Only parse and validate the submission formats (all courses with --catalog); '
+             'nothing is written and python-docx is never loaded'
+    )
+    parser.add_argument(
+        '--check-reproducible',
+        action='store_true',
+        help='Build every template twice in memory and check the DOCX bytes are identical; '
+             'nothing is written'
+    )
+    
+    args = parser.parse_args()
+    checking = args.check or args.check_reproducible
+    jobs = args.jobs if args.jobs is not None else (0 if checking else 1)
+    if jobs <= 0:
+        jobs = os.cpu_count() or 1
+    
+    if args.catalog and args.watch:
+        parser.error('--watch cannot be combined with --catalog')
+    if checking and args.watch:
+        parser.error('--watch cannot be combined with --check or --check-reproducible')
+    
+    if checking:
+        try:
+            if args.catalog:
+                base_dirs = [labs_dir for _, labs_dir in discover_courses(args.catalog)]
+            else:
+                base_dirs = [args.base_dir]
+            if args.check_reproducible:
+                failed = check_formats(base_dirs, jobs=jobs, check=partial(_check_reproducible, args.backend))
+            else:
+                failed = check_formats(base_dirs, jobs=jobs)
+        except Exception as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
+        if failed:
+            sys.exit(1)
+        return
     
     try:
-        generate_all_templates(base_dir, output_dir, course_name)
+        if args.catalog:
+            errors = generate_catalog_templates(args.catalog, force=args.force, jobs=jobs, backend=args.backend,
+                                                profile_path=args.profile)
+        else:
+            errors = generate_all_templates(args.base_dir, args.output_dir, args.course_name,
+                                            force=args.force, jobs=jobs, backend=args.backend,
+                                            profile_path=args.profile)
     except Exception as e:
         print(f"Error: {e}", file=sys.stderr)
         sys.exit(1)
+    
+    if args.watch:
+        try:
+            watch_templates(args.base_dir, args.output_dir, args.course_name, backend=args.backend,
+                            interval=args.interval)
+        except KeyboardInterrupt:
+            print("\nStopped watching")
+        return
+    
+    if errors:
+        sys.exit(1)
 
+
+if __name__ == '__main__':
+    main()
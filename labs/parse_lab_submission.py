@@ -7,104 +7,696 @@ for learner submissions. The templates include read-only sections, editable answ
 and trainer feedback sections.
 
 Usage:
-    python parse_lab_submission.py <submission_markdown_file> [output_dir]
+    python parse_lab_submission.py <submission_markdown_file> [output_dir] [course_name]
+                                   [--backend python-docx|stream] [--profile FILE] [--no-forms]
+    python parse_lab_submission.py <submission_markdown_file> --check
 
 Example:
     python parse_lab_submission.py data/courses/seo-master-2026/content/labs/Day_01_Lab_01_Submission_Format.md labs/templates/
 """
 
+import io
 import re
 import sys
 import os
+import copy
+import json
+import time
+import zipfile
+import argparse
+from collections import namedtuple
+from contextlib import contextmanager, nullcontext
 from pathlib import Path
-from docx import Document
-from docx.shared import Pt, RGBColor, Inches
-from docx.enum.text import WD_ALIGN_PARAGRAPH
-from docx.oxml.ns import qn
-from docx.oxml import OxmlElement
-import markdown
+from html import escape
+
+# python-docx is imported by the DOCXGenerator methods that use it, so
+# parsing, validation and the other backends never load it
+
+
+# Bump whenever a change alters the generated DOCX for unchanged markdown,
+# so incremental builds know their cached templates are stale
+GENERATOR_VERSION = '6'
+
+# Markdown table rows: '|---|:--:|' separators and unescaped cell pipes
+TABLE_SEPARATOR_RE = re.compile(r'^\|?\s*:?-+:?\s*(\|\s*:?-+:?\s*)*\|?$')
+TABLE_CELL_SPLIT_RE = re.compile(r'(?<!\\)\|')
+
+# Package parts written first, in this order; the rest follow by name
+FIRST_PACKAGE_PARTS = ('[Content_Types].xml', '_rels/.rels')
+CORE_PROPERTIES_PART = 'docProps/core.xml'
+
+# 1980-01-01, the earliest time a zip entry can record
+ZIP_EPOCH = 315532800
+
+CORE_PROPERTIES_XML = (
+    "<?xml version='1.0' encoding='UTF-8' standalone='yes'?>\n"
+    '<cp:coreProperties '
+    'xmlns:cp="http://schemas.openxmlformats.org/package/2006/metadata/core-properties" '
+    'xmlns:dc="http://purl.org/dc/elements/1.1/" xmlns:dcterms="http://purl.org/dc/terms/" '
+    'xmlns:dcmitype="http://purl.org/dc/dcmitype/" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance">'
+    '<dc:title>{title}</dc:title><dc:subject>{subject}</dc:subject><dc:creator>{creator}</dc:creator>'
+    '<cp:revision>1</cp:revision>'
+    '<dcterms:created xsi:type="dcterms:W3CDTF">{timestamp}</dcterms:created>'
+    '<dcterms:modified xsi:type="dcterms:W3CDTF">{timestamp}</dcterms:modified>'
+    '</cp:coreProperties>'
+)
+
+# Question section titles, e.g. 'Section 3: Query Type Comparison'
+NUMBERED_SECTION_RE = re.compile(r'^Section\s+\d+\b')
+
+# Markdown block syntax, matched once per line by parse_markdown_blocks()
+HORIZONTAL_RULE = '---'
+CODE_FENCE_RE = re.compile(r'^(```|~~~)')
+HEADING_RE = re.compile(r'^(#+)\s*(.*)$')
+LIST_ITEM_RE = re.compile(r'^([-*+]|\d+[.)])\s+(?:\[([ xX])\]\s*)?(.*)$')
+
+# Inline markdown, tokenized left to right in one pass by parse_inline()
+INLINE_RE = re.compile(
+    r'`(?P<code>[^`]+)`'
+    r'|\[(?P<link>[^\]]+)\]\((?P<url>[^)\s]+)\)'
+    r'|\*\*(?P<bold>.+?)\*\*'
+    r'|(?<!\*)\*(?P<italic>[^*\s](?:[^*]*[^*\s])?)\*(?!\*)'
+)
+
+# Text marking a line as an answer area: '[...]' prompts, blanks or '(...)'
+ANSWER_AREA_RE = re.compile(r'\[.*\]|___+|\(.*\)')
+
+# A text run and the formatting flags every DOCX backend understands
+RunSpec = namedtuple('RunSpec', ['text', 'bold', 'italic', 'gray', 'highlight', 'code'],
+                     defaults=[False, False, False, False, False])
+
+# One block of a section body: a heading, paragraph, list item, checkbox,
+# code line or table; see parse_markdown_blocks()
+MarkdownBlock = namedtuple('MarkdownBlock', ['kind', 'level', 'text', 'runs', 'rows', 'answer_area'])
+
+# An answer area wrapped in a content control tagged with its id
+Anchor = namedtuple('Anchor', ['id', 'kind', 'section', 'question', 'prompt'])
+
+# A '### ' heading inside a section, at its offset in the source buffer
+Subsection = namedtuple('Subsection', ['title', 'start'])
+
+# Sidecar index of a template's answer anchors
+ANCHOR_INDEX_FORMAT = 1
+
+# Namespace declaration of the w: prefix, as docx.oxml.ns.nsdecls('w') renders it
+W_NSDECL = 'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"'
+
+# Paragraph style of each list block kind, by nesting level
+LIST_STYLES = {
+    'bullet': ('List Bullet', 'List Bullet 2', 'List Bullet 3'),
+    'checkbox': ('List Bullet', 'List Bullet 2', 'List Bullet 3'),
+    'number': ('List', 'List 2', 'List 3'),
+}
+
+# Font of inline code and fenced code lines
+CODE_FONT = 'Courier New'
+
+# Usable width of a Letter page with the 1" margins set in _setup_document
+TABLE_WIDTH_TWIPS = 9360
+
+# Metadata fields: key -> (cheap substring guard, per-line pattern)
+METADATA_PATTERNS = {
+    'header': ('#', re.compile(r'#\s*Lab Submission\s*—\s*Day\s*(\d+),\s*Lab\s*(\d+)', re.IGNORECASE)),
+    'lab_title': ('**Lab Title:**', re.compile(r'\*\*Lab Title:\*\*\s*(.+?)(?:\*\*|$)')),
+    'day_title': ('**Day:**', re.compile(r'\*\*Day:\*\*\s*(.+?)(?:\*\*|$)')),
+}
+
+
+class BuildProfile:
+    """Per-stage timings and output counts for one template build
+    
+    Stages with the same name accumulate, so every question section lands
+    in a single 'question' entry. A stage opened inside another records the
+    outer stage as 'within' and is left out of the totals. Markdown
+    constructs handled inside a stage are tallied under its 'constructs'.
+    """
+    
+    def __init__(self):
+        self.info = {}
+        self.stages = {}
+        self._active = []
+    
+    @contextmanager
+    def stage(self, name, counts=None):
+        """Time a stage; counts() returns running (paragraphs, runs) totals"""
+        entry = self.stages.setdefault(name, {'seconds': 0.0, 'calls': 0})
+        if self._active:
+            entry['within'] = self._active[-1][0]
+        before = counts() if counts else None
+        self._active.append((name, entry))
+        start = time.perf_counter()
+        try:
+            yield entry
+        finally:
+            entry['seconds'] += time.perf_counter() - start
+            entry['calls'] += 1
+            self._active.pop()
+            if counts:
+                after = counts()
+                entry['paragraphs'] = entry.get('paragraphs', 0) + after[0] - before[0]
+                entry['runs'] = entry.get('runs', 0) + after[1] - before[1]
+    
+    def add(self, **values):
+        """Add numeric values to the innermost active stage"""
+        if self._active:
+            entry = self._active[-1][1]
+            for key, value in values.items():
+                entry[key] = entry.get(key, 0) + value
+    
+    def add_construct(self, kind, seconds):
+        """Tally one markdown construct handled in the innermost stage"""
+        if self._active:
+            constructs = self._active[-1][1].setdefault('constructs', {})
+            construct = constructs.setdefault(kind, {'count': 0, 'seconds': 0.0})
+            construct['count'] += 1
+            construct['seconds'] += seconds
+    
+    def to_dict(self):
+        """JSON-serializable trace with rounded timings and totals"""
+        stages = {}
+        for name, entry in self.stages.items():
+            stage = dict(entry, seconds=round(entry['seconds'], 6))
+            if 'constructs' in entry:
+                stage['constructs'] = {
+                    kind: {'count': c['count'], 'seconds': round(c['seconds'], 6)}
+                    for kind, c in entry['constructs'].items()
+                }
+            stages[name] = stage
+        
+        outer = [entry for entry in self.stages.values() if 'within' not in entry]
+        return dict(self.info, stages=stages, totals={
+            'seconds': round(sum(entry['seconds'] for entry in outer), 6),
+            'paragraphs': sum(entry.get('paragraphs', 0) for entry in self.stages.values()),
+            'runs': sum(entry.get('runs', 0) for entry in self.stages.values()),
+        })
+
+
+def parse_inline(text, bold=False, italic=False):
+    """Tokenize inline markdown into (RunSpec runs, plain text)
+    
+    Bold, italic, code spans and links are matched left to right by one
+    precompiled pattern; bold, italic and link text may nest further
+    markup. A link keeps its text followed by its URL in parentheses,
+    which the plain text leaves out.
+    """
+    runs = []
+    plain = []
+    pos = 0
+    for match in INLINE_RE.finditer(text):
+        if match.start() > pos:
+            literal = text[pos:match.start()]
+            runs.append(RunSpec(literal, bold=bold, italic=italic))
+            plain.append(literal)
+        pos = match.end()
+        
+        if match.group('code') is not None:
+            runs.append(RunSpec(match.group('code'), bold=bold, italic=italic, code=True))
+            plain.append(match.group('code'))
+            continue
+        
+        if match.group('link') is not None:
+            inner_runs, inner_plain = parse_inline(match.group('link'), bold, italic)
+            inner_runs.append(RunSpec(f" ({match.group('url')})", bold=bold, italic=italic))
+        elif match.group('bold') is not None:
+            inner_runs, inner_plain = parse_inline(match.group('bold'), True, italic)
+        else:
+            inner_runs, inner_plain = parse_inline(match.group('italic'), bold, True)
+        runs.extend(inner_runs)
+        plain.append(inner_plain)
+    
+    if pos < len(text):
+        runs.append(RunSpec(text[pos:], bold=bold, italic=italic))
+        plain.append(text[pos:])
+    return runs, ''.join(plain)
+
+
+def clean_inline_markdown(text):
+    """Plain text of inline markdown, without markers or link targets"""
+    return parse_inline(text)[1]
+
+
+def split_table_rows(table_lines):
+    """Split markdown table lines into rows of cleaned cell text, skipping separators"""
+    rows = []
+    for line in table_lines:
+        if TABLE_SEPARATOR_RE.match(line):
+            continue
+        cells = TABLE_CELL_SPLIT_RE.split(line.strip().strip('|'))
+        rows.append([clean_inline_markdown(cell.strip().replace('\\|', '|')) for cell in cells])
+    return rows
+
+
+def _indent_width(line):
+    """Leading whitespace width of a line, counting tabs as four spaces"""
+    line = line.expandtabs(4)
+    return len(line) - len(line.lstrip())
+
+
+def _text_block(kind, level, runs, plain):
+    """A paragraph-like MarkdownBlock; a line entirely in bold is a label"""
+    answer_area = kind == 'checkbox' or (
+        bool(ANSWER_AREA_RE.search(plain)) and not all(run.bold for run in runs))
+    return MarkdownBlock(kind, level, ''.join(run.text for run in runs), runs, (), answer_area)
+
+
+def parse_markdown_blocks(markdown_text):
+    """Parse a section body into a flat list of MarkdownBlocks in one pass
+    
+    Every line is its own block, as the submission formats lay prompts out
+    line by line: '#' headings (level = number of '#'), '-', '*' or '1.'
+    list items and '- [ ]' checkboxes (level = indentation, two spaces per
+    step, up to 2) and paragraphs, with inline markup parsed into runs.
+    Contiguous '|' lines form one table block and lines inside a code
+    fence are kept verbatim; blank lines and '---' rules produce nothing.
+    
+    text is the block's text as written to the document and answer_area
+    tells whether it holds a placeholder for the learner to replace.
+    """
+    blocks = []
+    table_lines = []
+    in_code = False
+    
+    for raw in markdown_text.split('\n'):
+        line = raw.strip()
+        
+        if in_code:
+            if CODE_FENCE_RE.match(line):
+                in_code = False
+            elif line:
+                code = raw.rstrip()
+                blocks.append(_text_block('code', 0, [RunSpec(code, code=True)], code))
+            continue
+        
+        if line.startswith('|'):
+            table_lines.append(line)
+            continue
+        if table_lines:
+            blocks.append(MarkdownBlock('table', 0, '', (), split_table_rows(table_lines), False))
+            table_lines = []
+        
+        if not line or line == HORIZONTAL_RULE:
+            continue
+        
+        if CODE_FENCE_RE.match(line):
+            in_code = True
+        elif line.startswith('#'):
+            hashes, title = HEADING_RE.match(line).groups()
+            plain = parse_inline(title)[1].strip()
+            blocks.append(MarkdownBlock('heading', min(len(hashes), 6), plain, (RunSpec(plain),), (), False))
+        else:
+            item = LIST_ITEM_RE.match(line)
+            if item is None:
+                blocks.append(_text_block('paragraph', 0, *parse_inline(line)))
+                continue
+            
+            marker, check, body = item.groups()
+            level = min(_indent_width(raw) // 2, 2)
+            runs, plain = parse_inline(body)
+            if check is not None:
+                blocks.append(_text_block('checkbox', level, runs, plain))
+            elif marker[0].isdigit():
+                blocks.append(_text_block('number', level, [RunSpec(marker + ' ')] + runs, plain))
+            else:
+                blocks.append(_text_block('bullet', level, runs, plain))
+    
+    if table_lines:
+        blocks.append(MarkdownBlock('table', 0, '', (), split_table_rows(table_lines), False))
+    return blocks
+
+
+def section_blocks(section):
+    """A parsed section's MarkdownBlocks, parsed on first use and kept on the section
+    
+    Every writer fed the same parsed data (DOCX, HTML form, answer
+    extractor outline) then shares one parse of each section body.
+    """
+    if section.blocks is None:
+        section.blocks = parse_markdown_blocks(section.content)
+    return section.blocks
+
+
+def answer_anchor_id(section_number, question_number, area_number):
+    """Content-control tag of an answer area, e.g. 's2-q1-a3'
+    
+    section_number is the section's 1-based position in the submission
+    format, question_number counts headings within the section (0 for
+    content before the first, including the section's own heading) and
+    area_number counts answer areas under that heading.
+    """
+    return f'{question_anchor_key(section_number, question_number)}-a{area_number}'
+
+
+def question_anchor_key(section_number, question_number):
+    """The section/question prefix shared by a question's answer anchors, e.g. 's2-q1'"""
+    return f's{section_number}-q{question_number}'
+
+
+def anchor_question_key(anchor_id):
+    """The section/question prefix of an answer anchor id"""
+    return anchor_id.rsplit('-', 1)[0]
+
+
+def content_control_tags(anchor_id):
+    """Opening and closing XML of a block-level content control tagged anchor_id"""
+    return (f'<w:sdt {W_NSDECL}><w:sdtPr><w:tag w:val="{anchor_id}"/></w:sdtPr><w:sdtContent>',
+            '</w:sdtContent></w:sdt>')
+
+
+def anchor_index_path(output_path):
+    """Sidecar anchor index written next to a template"""
+    output_path = Path(output_path)
+    return output_path.with_name(output_path.stem + '.anchors.json')
+
+
+def answer_form_paths(output_path):
+    """HTML answer form and JSON Schema written next to a template"""
+    output_path = Path(output_path)
+    return (output_path.with_name(output_path.stem + '.form.html'),
+            output_path.with_name(output_path.stem + '.schema.json'))
+
+
+def template_sidecars(output_path):
+    """(manifest field, path) of every file generated alongside a template"""
+    form_path, schema_path = answer_form_paths(output_path)
+    return [('index', anchor_index_path(output_path)), ('form', form_path), ('schema', schema_path)]
+
+
+def write_anchor_index(index_path, metadata, template_name, anchors):
+    """Write the compact {anchor id: location} index of a generated template"""
+    index = {
+        'format': ANCHOR_INDEX_FORMAT,
+        'generator_version': GENERATOR_VERSION,
+        'template': template_name,
+        'day': metadata.get('day', 0),
+        'lab_number': metadata.get('lab_number', 0),
+        'anchors': {
+            anchor.id: {'kind': anchor.kind, 'section': anchor.section, 'question': anchor.question,
+                        'prompt': anchor.prompt}
+            for anchor in anchors
+        },
+    }
+    with open(index_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False, separators=(',', ':'))
+        f.write('\n')
+
+
+def package_timestamp():
+    """Build time recorded in reproducible packages, as a UTC struct_time
+    
+    SOURCE_DATE_EPOCH is honoured when set, as in other reproducible
+    builds; otherwise it is ZIP_EPOCH.
+    """
+    epoch = int(os.environ.get('SOURCE_DATE_EPOCH', ZIP_EPOCH))
+    return time.gmtime(max(epoch, ZIP_EPOCH))
+
+
+def core_properties_xml(metadata, timestamp):
+    """docProps/core.xml naming the lab, dated timestamp rather than the save time"""
+    title = (f"Day {metadata.get('day', 0)}, Lab {metadata.get('lab_number', 0)}: "
+             f"{metadata.get('lab_title', 'N/A')}")
+    course = metadata.get('course_name', '')
+    return CORE_PROPERTIES_XML.format(
+        title=escape(title), subject=escape(course), creator=escape(course),
+        timestamp=time.strftime('%Y-%m-%dT%H:%M:%SZ', timestamp),
+    ).encode('utf-8')
+
+
+def package_part_order(name):
+    """Sort key putting FIRST_PACKAGE_PARTS first and every other part by name"""
+    if name in FIRST_PACKAGE_PARTS:
+        return (FIRST_PACKAGE_PARTS.index(name), name)
+    return (len(FIRST_PACKAGE_PARTS), name)
+
+
+def package_zip_info(name, timestamp):
+    """Zip entry header with fixed date, permissions and host system"""
+    info = zipfile.ZipInfo(name, date_time=timestamp[:6])
+    info.compress_type = zipfile.ZIP_DEFLATED
+    info.create_system = 3  # Unix, whichever platform builds the package
+    info.external_attr = 0o644 << 16
+    return info
+
+
+def write_reproducible_package(parts, path_or_stream, metadata):
+    """Write (name, bytes) package parts as a byte-reproducible DOCX
+    
+    Parts are written in package_part_order() with package_zip_info()
+    headers, and docProps/core.xml is replaced by core_properties_xml(),
+    so the same parts always produce the same bytes.
+    """
+    timestamp = package_timestamp()
+    with zipfile.ZipFile(path_or_stream, 'w', zipfile.ZIP_DEFLATED) as package:
+        for name, data in sorted(parts, key=lambda part: package_part_order(part[0])):
+            if name == CORE_PROPERTIES_PART:
+                data = core_properties_xml(metadata, timestamp)
+            package.writestr(package_zip_info(name, timestamp), data)
+
+
+def validate_submission_format(parsed_data):
+    """Problems in a parsed submission format, as messages; empty when valid
+    
+    Checks the 'Day N, Lab N' header and Lab Title, that there are
+    sections, that every section title matches a section type (rather than
+    falling back to a question section) and that no question section is
+    empty below its heading.
+    """
+    metadata = parsed_data.metadata
+    problems = []
+    if 'day' not in metadata:
+        problems.append("missing '# Lab Submission — Day N, Lab N' header")
+    if 'lab_title' not in metadata:
+        problems.append("missing '**Lab Title:**' line")
+    if not parsed_data.sections:
+        problems.append("no '## ' sections")
+    
+    for section in parsed_data.of_type('question'):
+        if not NUMBERED_SECTION_RE.match(section.title):
+            problems.append(f"section '{section.title}' matches no section type")
+        if all(block.kind == 'heading' for block in section_blocks(section)):
+            problems.append(f"question section '{section.title}' is empty")
+    
+    return problems
+
+
+def _profile_stage(profile, name, counts=None):
+    """profile.stage(), or a no-op context when profiling is off"""
+    if profile is None:
+        return nullcontext()
+    return profile.stage(name, counts)
+
+
+class Section:
+    """A '## ' section of a submission format
+    
+    start and end are offsets into the source buffer, which every section
+    of a lab shares; content slices the body out of it on demand instead
+    of keeping a copy. number is the section's 1-based position in the
+    format, key its casefolded title, and blocks caches section_blocks().
+    """
+    
+    __slots__ = ('title', 'key', 'type', 'number', 'start', 'end', 'subsections', 'source', 'blocks')
+    
+    def __init__(self, title, number, start, source):
+        self.title = title
+        self.key = title.casefold()
+        self.type = None
+        self.number = number
+        self.start = start
+        self.end = start
+        self.subsections = []
+        self.source = source
+        self.blocks = None
+    
+    @property
+    def content(self):
+        """The section body, sliced from the source buffer"""
+        return self.source[self.start:self.end]
+    
+    def __getstate__(self):
+        # key is derived and the blocks cache is re-parsed on first use
+        return (self.title, self.type, self.number, self.start, self.end, self.subsections, self.source)
+    
+    def __setstate__(self, state):
+        self.title, self.type, self.number, self.start, self.end, self.subsections, self.source = state
+        self.key = self.title.casefold()
+        self.blocks = None
+    
+    def __repr__(self):
+        return f"Section({self.number}, {self.title!r}, {self.type!r}, {self.start}:{self.end})"
+
+
+class ParsedLab:
+    """A parsed submission format: metadata, sections and a section type index
+    
+    by_type maps each section type to its sections in format order. It is
+    built once here, so writers look sections up instead of re-filtering
+    the list. The sections share source, so a pickled ParsedLab carries the
+    markdown once plus a few offsets per section.
+    """
+    
+    __slots__ = ('metadata', 'sections', 'by_type', 'source')
+    
+    def __init__(self, metadata, sections, source):
+        self.metadata = metadata
+        self.sections = sections
+        self.source = source
+        self.by_type = {}
+        for section in sections:
+            self.by_type.setdefault(section.type, []).append(section)
+    
+    def of_type(self, section_type):
+        """Sections of one type, in format order"""
+        return self.by_type.get(section_type, [])
+    
+    def __repr__(self):
+        return f"ParsedLab({self.metadata!r}, {len(self.sections)} sections)"
 
 
 class LabSubmissionParser:
-    """Parser for lab submission markdown files"""
+    """Parser for lab submission markdown files
+    
+    The source may be a path or an open file object (text or binary). It
+    is decoded once into a single buffer which is scanned line by line in
+    one pass; parse() returns a ParsedLab whose sections are offsets into
+    that buffer.
+    """
     
-    def __init__(self, markdown_file):
-        self.markdown_file = Path(markdown_file)
-        self.content = self._read_markdown()
+    def __init__(self, source, profile=None):
+        self.profile = profile
+        self.markdown_file = None
+        if isinstance(source, (str, os.PathLike)):
+            self.markdown_file = Path(source)
+        with _profile_stage(profile, 'read'):
+            self.content = self._read_markdown(source)
         self.metadata = {}
         self.sections = []
+    
+    def _read_markdown(self, source):
+        """Read markdown content from a path or file object"""
+        if self.markdown_file is not None:
+            if not self.markdown_file.exists():
+                raise FileNotFoundError(f"Markdown file not found: {self.markdown_file}")
+            
+            with open(self.markdown_file, 'r', encoding='utf-8') as f:
+                return f.read()
         
-    def _read_markdown(self):
-        """Read markdown file content"""
-        if not self.markdown_file.exists():
-            raise FileNotFoundError(f"Markdown file not found: {self.markdown_file}")
+        data = source.read()
         
-        with open(self.markdown_file, 'r', encoding='utf-8') as f:
-            return f.read()
+        if isinstance(data, bytes):
+            data = data.decode('utf-8')
+        return data
     
     def parse(self):
-        """Parse markdown content into structured sections"""
-        # Extract metadata
-        self._extract_metadata()
-        
-        # Extract sections
-        self._extract_sections()
-        
-        return {
-            'metadata': self.metadata,
-            'sections': self.sections
-        }
-    
-    def _extract_metadata(self):
-        """Extract metadata from markdown header"""
-        # Extract Day and Lab Title from first line
-        first_line_match = re.search(r'#\s*Lab Submission\s*—\s*Day\s*(\d+),\s*Lab\s*(\d+)', self.content, re.IGNORECASE)
-        if first_line_match:
-            self.metadata['day'] = int(first_line_match.group(1))
-            self.metadata['lab_number'] = int(first_line_match.group(2))
-        
-        # Extract Lab Title
-        lab_title_match = re.search(r'\*\*Lab Title:\*\*\s*(.+?)(?:\n|\*\*)', self.content)
-        if lab_title_match:
-            self.metadata['lab_title'] = lab_title_match.group(1).strip()
-        
-        # Extract Day Title
-        day_title_match = re.search(r'\*\*Day:\*\*\s*(.+?)(?:\n|\*\*)', self.content)
-        if day_title_match:
-            self.metadata['day_title'] = day_title_match.group(1).strip()
+        """Parse markdown content into a ParsedLab"""
+        # Metadata extraction and section splitting share one scan
+        with _profile_stage(self.profile, 'scan'):
+            self._scan()
         
-        # Default course name
-        self.metadata['course_name'] = 'SEO Master Course 2026'
+        with _profile_stage(self.profile, 'index'):
+            parsed_data = ParsedLab(self.metadata, self.sections, self.content)
+        
+        if self.profile is not None:
+            self.profile.info['lines'] = self.content.count('\n') + 1
+            self.profile.info['sections'] = len(self.sections)
+        
+        return parsed_data
     
-    def _extract_sections(self):
-        """Extract all sections from markdown"""
-        # Split by horizontal rules (---)
-        parts = re.split(r'\n---\n', self.content)
+    def _scan(self):
+        """Build metadata and section offsets from the tokenizer's events"""
+        # Default course name
+        self.metadata = {'course_name': 'SEO Master Course 2026'}
+        self.sections = []
         
         current_section = None
         
-        for part in parts:
-            # Check for section headers (##)
-            section_match = re.search(r'^##\s+(.+)$', part, re.MULTILINE)
-            if section_match:
+        for event in self.tokenize():
+            kind = event[0]
+            
+            if kind == 'metadata':
+                self.metadata[event[1]] = event[2]
+            elif kind == 'section':
                 if current_section:
                     self.sections.append(current_section)
                 
-                current_section = {
-                    'title': section_match.group(1).strip(),
-                    'type': self._classify_section(section_match.group(1)),
-                    'content': part
-                }
-            elif current_section:
-                current_section['content'] += '\n---\n' + part
+                current_section = Section(event[1], len(self.sections) + 1, event[2], self.content)
+                current_section.type = self._classify_section(current_section.key)
+            elif current_section is None:
+                continue
+            elif kind == 'subsection':
+                current_section.subsections.append(Subsection(event[1], event[2]))
+            elif kind == 'part_end':
+                current_section.end = event[1]
         
         if current_section:
             self.sections.append(current_section)
     
-    def _classify_section(self, title):
-        """Classify section type based on title"""
-        title_lower = title.lower()
+    def tokenize(self):
+        """Scan the buffer once, yielding metadata, section and sub-section events
+        
+        Events are tuples:
+            ('metadata', key, value)
+            ('section', title, part_start)   first '## ' heading of a part
+            ('subsection', title, line_start)
+            ('part_end', offset)             end of the text between '---' rules
+        
+        A part is the text between two '---' rule lines; a section owns every
+        part from the one holding its '## ' heading up to the next heading.
+        """
+        content = self.content
+        length = len(content)
+        pending_metadata = dict(METADATA_PATTERNS)
+        
+        pos = 0
+        part_start = 0
+        part_has_section = False
+        last_rule_end = -1
+        
+        while pos < length:
+            newline = content.find('\n', pos)
+            if newline == -1:
+                line_end = next_pos = length
+            else:
+                line_end = newline
+                next_pos = newline + 1
+            line = content[pos:line_end]
+            
+            # Horizontal rule: '---' preceded and followed by a newline,
+            # not sharing its leading newline with the previous rule
+            if line == '---' and newline != -1 and pos > 0 and pos != last_rule_end:
+                yield ('part_end', pos - 1)
+                part_start = next_pos
+                part_has_section = False
+                last_rule_end = next_pos
+                pos = next_pos
+                continue
+            
+            if line.startswith('##'):
+                if line[2:3].isspace() and line[2:].strip():
+                    if not part_has_section:
+                        part_has_section = True
+                        yield ('section', line[2:].strip(), part_start)
+                elif line.startswith('### '):
+                    yield ('subsection', line[3:].strip(), pos)
+            
+            if pending_metadata and ('**' in line or '#' in line):
+                for key, (marker, pattern) in list(pending_metadata.items()):
+                    if marker not in line:
+                        continue
+                    match = pattern.search(line)
+                    if match:
+                        del pending_metadata[key]
+                        if key == 'header':
+                            yield ('metadata', 'day', int(match.group(1)))
+                            yield ('metadata', 'lab_number', int(match.group(2)))
+                        else:
+                            yield ('metadata', key, match.group(1).strip())
+            
+            pos = next_pos
         
+        yield ('part_end', length)
+    
+    def _classify_section(self, title_lower):
+        """Classify section type based on its casefolded title"""
         if 'trainer' in title_lower or 'feedback' in title_lower or 'score' in title_lower:
             return 'trainer'
         elif 'self-assessment' in title_lower or 'reflection' in title_lower:
@@ -118,16 +710,238 @@ class LabSubmissionParser:
 
 
 class DOCXGenerator:
-    """Generate DOCX templates from parsed lab submission data"""
+    """Generate DOCX templates from parsed lab submission data
+    
+    Section builders describe the document through a small set of emit
+    methods (_emit_paragraph, _emit_page_break, _emit_table and
+    _append_block), which count what they produce and delegate to the
+    backend's _write_* primitives. This class implements those with
+    python-docx; the streaming backend in stream_docx_writer.py implements
+    them as raw OOXML fragments.
+    
+    Every answer area is wrapped in a content control tagged with an
+    answer_anchor_id(); the Anchors emitted are collected in self.anchors.
+    """
+    
+    # Shared skeleton, built once per process by _get_skeleton()
+    _skeleton = None
+    
+    def __init__(self, parsed_data, profile=None):
+        self.parsed_data = parsed_data
+        self.metadata = parsed_data.metadata
+        self.profile = profile
+        self._paragraph_count = 0
+        self._run_count = 0
+        self.anchors = []
+        
+        skeleton = self._get_skeleton()
+        self.doc = self._clone_document(skeleton['document'])
+        self._sect_pr = self.doc.element.body.sectPr
+        self._blocks = skeleton['blocks']
+        self._style_ids = skeleton['style_ids']
     
-    def __init__(self, parsed_data):
-        self.metadata = parsed_data['metadata']
-        self.sections = parsed_data['sections']
-        self.doc = Document()
-        self._setup_document()
+    @classmethod
+    def _get_skeleton(cls):
+        """Return the cached document skeleton, building it on first use
+        
+        The skeleton is python-docx's default template with margins applied,
+        a name -> id map of its paragraph styles, and the pre-rendered XML of
+        every block that is identical across labs. Each generator clones the
+        skeleton instead of unzipping and parsing a fresh Document().
+        """
+        if cls._skeleton is None:
+            from docx import Document
+            from docx.enum.style import WD_STYLE_TYPE
+            
+            builder = cls.__new__(cls)
+            builder._paragraph_count = builder._run_count = 0
+            builder.anchors = []
+            builder.doc = Document()
+            builder._style_ids = {
+                style.name: style.style_id
+                for style in builder.doc.styles
+                if style.type == WD_STYLE_TYPE.PARAGRAPH
+            }
+            builder._setup_document()
+            builder._sect_pr = builder.doc.element.body.sectPr
+            
+            cls._skeleton = {
+                'document': builder.doc,
+                'blocks': builder._capture_shared_blocks(),
+                'style_ids': builder._style_ids,
+            }
+        return cls._skeleton
+    
+    @staticmethod
+    def _clone_document(document):
+        """Deep-copy a document through its package
+        
+        lxml elements ignore the deepcopy memo, so copying the Document proxy
+        directly would split the body it writes to from the part that gets
+        saved. Copy the package and re-wrap the cloned main part instead.
+        """
+        from docx.document import Document as DocxDocument
+        
+        package = copy.deepcopy(document.part.package)
+        part = package.main_document_part
+        return DocxDocument(part.element, part)
+    
+    def _capture_shared_blocks(self):
+        """Render every block shared across labs
+        
+        Returns {block name: (rendered block, paragraph count, run count,
+        anchors)}.
+        """
+        blocks = {}
+        for name, build in (('cover_title', self._build_cover_title),
+                            ('learner_fields', self._build_learner_fields),
+                            ('trainer_feedback', self._build_trainer_feedback)):
+            before = self._emitted_counts()
+            first_anchor = len(self.anchors)
+            block = self._capture_block(build)
+            after = self._emitted_counts()
+            blocks[name] = (block, after[0] - before[0], after[1] - before[1], self.anchors[first_anchor:])
+        return blocks
+    
+    def _capture_block(self, build):
+        """Run a block builder and detach the body elements it produced"""
+        body = self.doc.element.body
+        before = len(body)
+        build()
+        # Paragraphs are inserted ahead of the trailing <w:sectPr>
+        elements = list(body)[before - 1:-1]
+        for element in elements:
+            body.remove(element)
+        return elements
+    
+    def _emitted_counts(self):
+        """Running (paragraphs, runs) totals, as read by BuildProfile"""
+        return (self._paragraph_count, self._run_count)
+    
+    def _append_block(self, name):
+        """Append a cached skeleton block"""
+        block, paragraphs, runs, anchors = self._blocks[name]
+        self._paragraph_count += paragraphs
+        self._run_count += runs
+        self.anchors.extend(anchors)
+        self._write_block(block)
+    
+    def _emit_paragraph(self, runs=(), style=None, alignment=None, anchor=None):
+        """Add a paragraph of RunSpec runs, as an answer area if anchor is given"""
+        self._paragraph_count += 1
+        self._run_count += len(runs)
+        if anchor is None:
+            return self._write_paragraph(runs, style, alignment)
+        self.anchors.append(anchor)
+        return self._write_paragraph(runs, style, alignment, anchor.id)
+    
+    def _emit_page_break(self):
+        """Add a paragraph holding only a page break"""
+        self._paragraph_count += 1
+        self._run_count += 1
+        return self._write_page_break()
+    
+    def _emit_table(self, table_xml, paragraphs, runs, anchor=None):
+        """Add a complete <w:tbl> fragment holding the given counts"""
+        self._paragraph_count += paragraphs
+        self._run_count += runs
+        if anchor is None:
+            return self._write_table(table_xml)
+        self.anchors.append(anchor)
+        return self._write_table(table_xml, anchor.id)
+    
+    def _write_block(self, block):
+        """Append deep copies of a cached block's body elements"""
+        for element in block:
+            self._sect_pr.addprevious(copy.deepcopy(element))
+    
+    def _write_paragraph(self, runs, style, alignment, anchor_id=None):
+        """Add a paragraph of RunSpec runs, setting its style by cached id
+        
+        Document.add_paragraph() would resolve the style name against the
+        whole styles part on every call. With anchor_id the paragraph is
+        wrapped in a content control carrying that tag.
+        """
+        from docx.enum.text import WD_ALIGN_PARAGRAPH
+        from docx.oxml import parse_xml
+        from docx.shared import RGBColor
+        
+        p = self._new_paragraph()
+        if anchor_id is not None:
+            sdt = parse_xml(''.join(content_control_tags(anchor_id)))
+            p._p.addprevious(sdt)
+            sdt[-1].append(p._p)
+        if style is not None:
+            p._p.style = self._style_ids[style]
+        if alignment is not None:
+            p.alignment = getattr(WD_ALIGN_PARAGRAPH, alignment.upper())
+        
+        for spec in runs:
+            run = p.add_run(spec.text)
+            if spec.bold:
+                run.bold = True
+            if spec.italic:
+                run.italic = True
+            if spec.gray:
+                run.font.color.rgb = RGBColor(128, 128, 128)
+            if spec.highlight:
+                run.font.highlight_color = 7  # Yellow highlight
+            if spec.code:
+                run.font.name = CODE_FONT
+        return p
+    
+    def _new_paragraph(self):
+        """Append an empty paragraph ahead of the cached <w:sectPr>
+        
+        Document.add_paragraph() searches the body's children for the
+        <w:sectPr> on every call, which makes building a long document
+        quadratic.
+        """
+        from docx.oxml import OxmlElement
+        from docx.text.paragraph import Paragraph
+        
+        p = OxmlElement('w:p')
+        self._sect_pr.addprevious(p)
+        return Paragraph(p, self.doc._body)
+    
+    def _write_page_break(self):
+        """Add a paragraph holding only a page break"""
+        from docx.enum.text import WD_BREAK
+        
+        self._new_paragraph().add_run().add_break(WD_BREAK.PAGE)
+    
+    def _write_table(self, table_xml, anchor_id=None):
+        """Parse a <w:tbl> fragment and append it, in a content control if anchored"""
+        from docx.oxml import parse_xml
+        
+        if anchor_id is not None:
+            start, end = content_control_tags(anchor_id)
+            table_xml = start + table_xml + end
+        tbl = parse_xml(table_xml)
+        self._sect_pr.addprevious(tbl)
+        return tbl
+    
+    def _add_paragraph(self, text='', style=None, read_only=False, editable=False, anchor=None):
+        """Add a single-run paragraph; an empty text adds no run"""
+        runs = [RunSpec(text)] if text else []
+        return self._emit_paragraph(self._format_runs(runs, read_only, editable), style, anchor=anchor)
+    
+    def _add_heading(self, text, level, read_only=False):
+        """Add a heading paragraph, see Document.add_heading()"""
+        style = 'Title' if level == 0 else f'Heading {level}'
+        return self._add_paragraph(text, style, read_only=read_only)
+    
+    def _add_field(self, label, value_run, anchor_id=None):
+        """Add a 'Label: value' paragraph with a bold label"""
+        anchor = None
+        if anchor_id is not None:
+            anchor = Anchor(anchor_id, 'field', 'Cover', label.rstrip(': '), label + value_run.text)
+        return self._emit_paragraph([RunSpec(label, bold=True), value_run], anchor=anchor)
     
     def _setup_document(self):
         """Setup document styles and properties"""
+        from docx.shared import Inches
+        
         # Set document margins
         sections = self.doc.sections
         for section in sections:
@@ -138,220 +952,316 @@ class DOCXGenerator:
     
     def generate(self):
         """Generate complete DOCX document"""
-        self._add_cover_section()
-        self._add_instructions_section()
-        self._add_question_sections()
-        self._add_self_assessment_sections()
-        self._add_trainer_feedback_section()
-        self._add_submission_declaration()
+        self._build_body()
         
         return self.doc
     
+    def save(self, path_or_stream):
+        """Save the generated document as a byte-reproducible package
+        
+        python-docx stamps every zip entry with the current time, so its
+        output is re-packed by write_reproducible_package().
+        """
+        buffer = io.BytesIO()
+        self.doc.save(buffer)
+        with zipfile.ZipFile(buffer) as package:
+            parts = [(name, package.read(name)) for name in package.namelist()]
+        write_reproducible_package(parts, path_or_stream, self.metadata)
+    
+    def _build_body(self):
+        """Emit every section of the template in document order
+        
+        Each builder runs as a profile stage named after the section type
+        it renders.
+        """
+        for stage, build in (('cover', self._add_cover_section),
+                             ('instruction', self._add_instructions_section),
+                             ('question', self._add_question_sections),
+                             ('self_assessment', self._add_self_assessment_sections),
+                             ('trainer', self._add_trainer_feedback_section),
+                             ('declaration', self._add_submission_declaration)):
+            with _profile_stage(self.profile, stage, self._emitted_counts):
+                build()
+    
     def _add_cover_section(self):
         """Add cover section with metadata"""
         # Title
-        title = self.doc.add_heading('Lab Submission Template', 0)
-        title.alignment = WD_ALIGN_PARAGRAPH.CENTER
+        self._append_block('cover_title')
         
         # Course Name
-        self.doc.add_paragraph().add_run('Course: ').bold = True
-        self.doc.add_paragraph(self.metadata.get('course_name', 'SEO Master Course 2026'))
+        self._emit_paragraph([RunSpec('Course: ', bold=True)])
+        self._add_paragraph(self.metadata.get('course_name', 'SEO Master Course 2026'))
         
         # Day
-        self.doc.add_paragraph().add_run('Day: ').bold = True
-        self.doc.add_paragraph(self.metadata.get('day_title', f"Day {self.metadata.get('day', 'N/A')}"))
+        self._emit_paragraph([RunSpec('Day: ', bold=True)])
+        self._add_paragraph(self.metadata.get('day_title', f"Day {self.metadata.get('day', 'N/A')}"))
         
         # Lab Title
-        self.doc.add_paragraph().add_run('Lab Title: ').bold = True
-        self.doc.add_paragraph(self.metadata.get('lab_title', 'N/A'))
+        self._emit_paragraph([RunSpec('Lab Title: ', bold=True)])
+        self._add_paragraph(self.metadata.get('lab_title', 'N/A'))
         
         # Learner Information (editable fields)
-        self.doc.add_paragraph()
-        learner_name_p = self.doc.add_paragraph()
-        learner_name_p.add_run('Learner Name: ').bold = True
-        learner_name_run = learner_name_p.add_run('_________________________')
-        self._make_editable(learner_name_run)
-        
-        email_p = self.doc.add_paragraph()
-        email_p.add_run('Email: ').bold = True
-        email_run = email_p.add_run('_________________________')
-        self._make_editable(email_run)
+        self._append_block('learner_fields')
+    
+    def _build_cover_title(self):
+        """Build the cover title shared by every lab"""
+        self._emit_paragraph([RunSpec('Lab Submission Template')], style='Title', alignment='center')
+    
+    def _build_learner_fields(self):
+        """Build the learner information fields shared by every lab"""
+        self._emit_paragraph()
+        self._add_field('Learner Name: ', self._editable_run('_________________________'), 'learner-name')
+        self._add_field('Email: ', self._editable_run('_________________________'), 'learner-email')
         
         # Submission Attempt
-        attempt_p = self.doc.add_paragraph()
-        attempt_p.add_run('Submission Attempt: ').bold = True
-        attempt_p.add_run('1 (Auto-incremented on resubmission)')
+        self._add_field('Submission Attempt: ', RunSpec('1 (Auto-incremented on resubmission)'))
         
         # Date
-        date_p = self.doc.add_paragraph()
-        date_p.add_run('Date: ').bold = True
-        date_run = date_p.add_run('_________________________')
-        self._make_editable(date_run)
+        self._add_field('Date: ', self._editable_run('_________________________'), 'learner-date')
         
-        self.doc.add_page_break()
+        self._emit_page_break()
     
     def _add_instructions_section(self):
         """Add instructions section (read-only)"""
-        instruction_sections = [s for s in self.sections if s['type'] == 'instruction']
+        instruction_sections = self.parsed_data.of_type('instruction')
         
         if instruction_sections:
-            self.doc.add_heading('Instructions', 1)
+            self._add_heading('Instructions', 1)
             
             for section in instruction_sections:
                 # Parse markdown content and convert to DOCX
-                self._add_markdown_content(section['content'], read_only=True)
+                self._add_markdown_content(section, read_only=True, section_number=section.number)
             
-            self.doc.add_page_break()
+            self._emit_page_break()
     
     def _add_question_sections(self):
         """Add question sections with editable answer areas"""
-        question_sections = [s for s in self.sections if s['type'] == 'question']
+        question_sections = self.parsed_data.of_type('question')
         
         for section in question_sections:
             # Add section title
-            self.doc.add_heading(section['title'], 1)
+            self._add_heading(section.title, 1)
             
             # Parse and add content
-            self._add_markdown_content(section['content'], read_only=False)
+            self._add_markdown_content(section, read_only=False, section_number=section.number)
             
-            self.doc.add_paragraph()  # Spacing
+            self._emit_paragraph()  # Spacing
     
     def _add_self_assessment_sections(self):
         """Add self-assessment sections"""
-        assessment_sections = [s for s in self.sections if s['type'] == 'self_assessment']
+        assessment_sections = self.parsed_data.of_type('self_assessment')
         
         if assessment_sections:
-            self.doc.add_page_break()
-            self.doc.add_heading('Self-Assessment', 1)
+            self._emit_page_break()
+            self._add_heading('Self-Assessment', 1)
             
             for section in assessment_sections:
-                self._add_markdown_content(section['content'], read_only=False)
+                self._add_markdown_content(section, read_only=False, section_number=section.number)
     
     def _add_trainer_feedback_section(self):
         """Add trainer feedback section (locked)"""
-        self.doc.add_page_break()
-        self.doc.add_heading('Trainer Feedback (Read-Only)', 1)
+        self._append_block('trainer_feedback')
+    
+    def _build_trainer_feedback(self):
+        """Build the trainer feedback block shared by every lab"""
+        self._emit_page_break()
+        self._add_heading('Trainer Feedback (Read-Only)', 1)
         
         # Feedback field
-        feedback_p = self.doc.add_paragraph()
-        feedback_p.add_run('Feedback: ').bold = True
-        feedback_run = feedback_p.add_run('\n[Trainer feedback will appear here]')
-        self._make_read_only(feedback_run)
+        self._add_field('Feedback: ', self._read_only_run('\n[Trainer feedback will appear here]'))
         
         # Status field
-        status_p = self.doc.add_paragraph()
-        status_p.add_run('Status: ').bold = True
-        status_run = status_p.add_run('[Pending / Approved / Needs Revision]')
-        self._make_read_only(status_run)
+        self._add_field('Status: ', self._read_only_run('[Pending / Approved / Needs Revision]'))
         
         # Score field
-        score_p = self.doc.add_paragraph()
-        score_p.add_run('Score: ').bold = True
-        score_run = score_p.add_run('[Score will appear here]')
-        self._make_read_only(score_run)
+        self._add_field('Score: ', self._read_only_run('[Score will appear here]'))
     
     def _add_submission_declaration(self):
         """Add submission declaration section"""
-        meta_sections = [s for s in self.sections if s['type'] == 'meta']
+        meta_sections = self.parsed_data.of_type('meta')
         
         if meta_sections:
-            self.doc.add_page_break()
+            self._emit_page_break()
             
             for section in meta_sections:
-                if 'declaration' in section['title'].lower():
-                    self._add_markdown_content(section['content'], read_only=False)
+                if 'declaration' in section.key:
+                    self._add_markdown_content(section, read_only=False, section_number=section.number)
     
-    def _add_markdown_content(self, markdown_text, read_only=False):
-        """Convert markdown content to DOCX paragraphs"""
-        # Remove horizontal rules
-        markdown_text = re.sub(r'^---\s*$', '', markdown_text, flags=re.MULTILINE)
+    def _add_markdown_content(self, section, read_only=False, section_number=None):
+        """Emit a section body's markdown blocks as DOCX paragraphs and tables
+        
+        The body is parsed once by section_blocks() and mapped to runs in a
+        single walk. With section_number, every answer area is anchored
+        with an id derived from the section and the heading it falls under.
+        """
+        profile = self.profile
+        if profile is not None:
+            start = time.perf_counter()
+        blocks = section_blocks(section)
+        if profile is not None:
+            profile.add_construct('parse', time.perf_counter() - start)
+            profile.add(blocks=len(blocks))
         
-        # Split into lines
-        lines = markdown_text.split('\n')
+        section_title = section.title if section_number else None
+        question_title = section_title
+        question_number = 0
+        area_number = 0
         
-        i = 0
-        while i < len(lines):
-            line = lines[i].strip()
+        def next_anchor(kind, prompt):
+            nonlocal area_number
+            if section_number is None:
+                return None
+            area_number += 1
+            return Anchor(answer_anchor_id(section_number, question_number, area_number), kind,
+                          section_title, question_title, prompt)
+        
+        for block in blocks:
+            if profile is not None:
+                start = time.perf_counter()
             
-            if not line:
-                i += 1
-                continue
+            kind = block.kind
+            if kind == 'table':
+                anchor = None if read_only else next_anchor('table', '')
+                self._add_markdown_table(block.rows, read_only=read_only, anchor=anchor)
+            elif kind == 'heading':
+                question_title = block.text
+                self._add_heading(question_title, block.level, read_only=read_only)
+                # The section's own heading opens its content and is not a question
+                if question_number or question_title != section_title:
+                    question_number += 1
+                    area_number = 0
+            else:
+                editable = block.answer_area and not read_only
+                anchor = None
+                if editable:
+                    anchor = next_anchor('checkbox' if kind == 'checkbox' else 'paragraph', block.text)
+                style = LIST_STYLES[kind][block.level] if kind in LIST_STYLES else None
+                self._emit_paragraph(self._format_runs(block.runs, read_only, editable), style, anchor=anchor)
             
-            # Handle headers
-            if line.startswith('###'):
-                text = line[3:].strip()
-                p = self.doc.add_heading(text, 3)
-                if read_only:
-                    self._make_read_only_paragraph(p)
-            elif line.startswith('##'):
-                text = line[2:].strip()
-                p = self.doc.add_heading(text, 2)
-                if read_only:
-                    self._make_read_only_paragraph(p)
-            elif line.startswith('#'):
-                text = line[1:].strip()
-                p = self.doc.add_heading(text, 1)
-                if read_only:
-                    self._make_read_only_paragraph(p)
-            # Handle bold text
-            elif line.startswith('**') and line.endswith('**'):
-                text = line[2:-2].strip()
-                p = self.doc.add_paragraph()
-                run = p.add_run(text)
-                run.bold = True
-                if read_only:
-                    self._make_read_only_paragraph(p)
-            # Handle checkboxes
-            elif line.startswith('- [ ]'):
-                text = line[5:].strip()
-                p = self.doc.add_paragraph(text, style='List Bullet')
-                if not read_only:
-                    self._make_editable_paragraph(p)
-            # Handle regular paragraphs
+            if profile is not None:
+                profile.add_construct(kind, time.perf_counter() - start)
+    
+    def _add_markdown_table(self, rows, read_only=False, anchor=None):
+        """Convert a markdown table's rows of cell text to a native Word table
+        
+        The whole <w:tbl> is serialized as one XML string and parsed by lxml
+        in a single call, which is far cheaper than python-docx's per-cell
+        table API for wide tables. The first row becomes a repeating bold
+        header; body cells are answer areas unless the table is read-only:
+        they are shaded yellow, even when empty, and their paragraph mark
+        carries the highlight so text typed into them is highlighted too.
+        """
+        if not rows:
+            return None
+        
+        if anchor is not None:
+            anchor = anchor._replace(prompt=' | '.join(rows[0]))
+        
+        column_count = len(rows[0])
+        column_width = TABLE_WIDTH_TWIPS // column_count
+        
+        if read_only:
+            body_rpr = '<w:rPr><w:color w:val="808080"/></w:rPr>'
+            header_rpr = '<w:rPr><w:b/><w:color w:val="808080"/></w:rPr>'
+        else:
+            body_rpr = '<w:rPr><w:highlight w:val="yellow"/></w:rPr>'
+            header_rpr = '<w:rPr><w:b/></w:rPr>'
+        
+        grid = ''.join(f'<w:gridCol w:w="{column_width}"/>' for _ in range(column_count))
+        tc_pr = f'<w:tcPr><w:tcW w:w="{column_width}" w:type="dxa"/></w:tcPr>'
+        if read_only:
+            answer_tc_pr, answer_p_pr = tc_pr, ''
+        else:
+            answer_tc_pr = (f'<w:tcPr><w:tcW w:w="{column_width}" w:type="dxa"/>'
+                            f'<w:shd w:val="clear" w:color="auto" w:fill="FFFF00"/></w:tcPr>')
+            answer_p_pr = f'<w:pPr>{body_rpr}</w:pPr>'
+        
+        run_count = 0
+        parts = [
+            f'<w:tbl {W_NSDECL}>',
+            '<w:tblPr><w:tblStyle w:val="TableGrid"/><w:tblW w:w="0" w:type="auto"/>'
+            '<w:tblLook w:val="04A0" w:firstRow="1" w:lastRow="0" w:firstColumn="1" '
+            'w:lastColumn="0" w:noHBand="0" w:noVBand="1"/></w:tblPr>',
+            f'<w:tblGrid>{grid}</w:tblGrid>',
+        ]
+        
+        for row_index, cells in enumerate(rows):
+            # Pad short rows and drop overflow cells so the grid stays rectangular
+            cells = (cells + [''] * column_count)[:column_count]
+            if row_index == 0:
+                parts.append('<w:tr><w:trPr><w:tblHeader/></w:trPr>')
+                rpr, cell_pr, p_pr = header_rpr, tc_pr, ''
             else:
-                # Clean up markdown formatting
-                text = re.sub(r'\*\*(.+?)\*\*', r'\1', line)  # Remove bold
-                text = re.sub(r'\[(.+?)\]\(.+?\)', r'\1', text)  # Remove links
-                
+                parts.append('<w:tr>')
+                rpr, cell_pr, p_pr = body_rpr, answer_tc_pr, answer_p_pr
+            for text in cells:
+                parts.append(f'<w:tc>{cell_pr}<w:p>{p_pr}')
                 if text:
-                    p = self.doc.add_paragraph(text)
-                    if read_only:
-                        self._make_read_only_paragraph(p)
-                    else:
-                        # Check if this looks like an answer area
-                        if re.search(r'\[.*\]|___+|\(.*\)', text):
-                            self._make_editable_paragraph(p)
-            
-            i += 1
+                    run_count += 1
+                    parts.append(f'<w:r>{rpr}<w:t xml:space="preserve">{escape(text, quote=False)}</w:t></w:r>')
+                parts.append('</w:p></w:tc>')
+            parts.append('</w:tr>')
+        
+        parts.append('</w:tbl>')
+        
+        return self._emit_table(''.join(parts), len(rows) * column_count, run_count, anchor)
+    
+    def _format_runs(self, runs, read_only=False, editable=False):
+        """Apply paragraph-level read-only or editable styling to every run"""
+        if read_only:
+            runs = [self._make_read_only_paragraph_run(run) for run in runs]
+        if editable:
+            runs = [self._make_editable(run) for run in runs]
+        return runs
+    
+    def _editable_run(self, text):
+        """A run marked as an answer area"""
+        return self._make_editable(RunSpec(text))
+    
+    def _read_only_run(self, text):
+        """A run marked as read-only"""
+        return self._make_read_only(RunSpec(text))
     
     def _make_editable(self, run):
         """Make a run editable (highlighted background)"""
         # Add light yellow background
-        run.font.highlight_color = 7  # Yellow highlight
-    
-    def _make_editable_paragraph(self, paragraph):
-        """Make entire paragraph editable with highlight"""
-        for run in paragraph.runs:
-            run.font.highlight_color = 7  # Yellow highlight
+        return run._replace(highlight=True)
     
     def _make_read_only(self, run):
         """Make a run read-only (grayed out)"""
-        run.font.color.rgb = RGBColor(128, 128, 128)
-        run.font.italic = True
+        return run._replace(gray=True, italic=True)
     
-    def _make_read_only_paragraph(self, paragraph):
-        """Make entire paragraph read-only"""
-        for run in paragraph.runs:
-            run.font.color.rgb = RGBColor(128, 128, 128)
+    def _make_read_only_paragraph_run(self, run):
+        """Gray out a run belonging to a read-only paragraph"""
+        return run._replace(gray=True)
+
 
+def generator_class(backend):
+    """Resolve the DOCX generator class for a backend name"""
+    if backend == 'stream':
+        from stream_docx_writer import StreamingDOCXGenerator
+        return StreamingDOCXGenerator
+    if backend == 'python-docx':
+        return DOCXGenerator
+    raise ValueError(f"Unknown DOCX backend: {backend}")
 
-def generate_docx_template(markdown_file, output_dir=None, course_name='seo-master-2026'):
-    """Main function to generate DOCX template from markdown"""
-    parser = LabSubmissionParser(markdown_file)
+
+def generate_docx_template(markdown_file, output_dir=None, course_name='seo-master-2026', verbose=True,
+                           backend='python-docx', profile=None, forms=True):
+    """Main function to generate DOCX template from markdown
+    
+    backend selects the writer: 'python-docx' (default) or 'stream', the
+    bounded-memory OOXML writer in stream_docx_writer.py. The template's
+    answer anchors are indexed in a sidecar file, see anchor_index_path().
+    Unless forms is False, the same parsed data also feeds the HTML answer
+    form and JSON Schema writer, see answer_form_paths().
+    Pass a BuildProfile as profile to record per-stage timings and counts.
+    """
+    parser = LabSubmissionParser(markdown_file, profile=profile)
     parsed_data = parser.parse()
     
-    generator = DOCXGenerator(parsed_data)
-    doc = generator.generate()
+    generator = generator_class(backend)(parsed_data, profile=profile)
+    generator.generate()
     
     # Generate output filename
     if output_dir:
@@ -362,29 +1272,104 @@ def generate_docx_template(markdown_file, output_dir=None, course_name='seo-mast
     
     output_dir.mkdir(parents=True, exist_ok=True)
     
-    day = parsed_data['metadata'].get('day', 0)
-    lab = parsed_data['metadata'].get('lab_number', 0)
+    day = parsed_data.metadata.get('day', 0)
+    lab = parsed_data.metadata.get('lab_number', 0)
     filename = f"Day{day:02d}_Lab{lab:02d}_Submission_Template.docx"
     output_path = output_dir / filename
     
-    doc.save(str(output_path))
-    print(f"Generated: {output_path}")
+    # The stream backend builds its body here, so its section stages nest in 'save'
+    with _profile_stage(profile, 'save'):
+        generator.save(str(output_path))
+    # Anchors are only complete once the stream backend has written the body
+    write_anchor_index(anchor_index_path(output_path), parsed_data.metadata, filename, generator.anchors)
+    if verbose:
+        print(f"Generated: {output_path}")
+    
+    if forms:
+        from answer_form_writer import write_answer_form
+        form_path, schema_path = answer_form_paths(output_path)
+        with _profile_stage(profile, 'forms'):
+            write_answer_form(parsed_data, form_path, schema_path)
+        if verbose:
+            print(f"Generated: {form_path}")
+            print(f"Generated: {schema_path}")
+    
+    if profile is not None:
+        profile.info.update(source=str(markdown_file), output=str(output_path), backend=backend)
     
     return output_path
 
 
-if __name__ == '__main__':
-    if len(sys.argv) < 2:
-        print("Usage: python parse_lab_submission.py <submission_markdown_file> [output_dir] [course_name]")
-        sys.exit(1)
+def main():
+    parser = argparse.ArgumentParser(
+        description='Generate a DOCX submission template from a lab submission format'
+    )
+    parser.add_argument(
+        'markdown_file',
+        help='Path to a *_Submission_Format.md file'
+    )
+    parser.add_argument(
+        'output_dir',
+        nargs='?',
+        default=None,
+        help='Output directory (default: data/courses/<course_name>/assets/templates)'
+    )
+    parser.add_argument(
+        'course_name',
+        nargs='?',
+        default='seo-master-2026',
+        help='Course identifier (default: seo-master-2026)'
+    )
+    parser.add_argument(
+        '--backend',
+        choices=['python-docx', 'stream'],
+        default='python-docx',
+        help='DOCX writer: python-docx or the streaming OOXML writer (default: python-docx)'
+    )
+    parser.add_argument(
+        '--profile',
+        metavar='FILE',
+        help='Write a JSON trace of per-stage timings and paragraph/run counts to FILE'
+    )
+    parser.add_argument(
+        '--check',
+        action='store_true',
+        help='Only parse and validate the submission format; nothing is written'
+    )
+    parser.add_argument(
+        '--no-forms',
+        action='store_true',
+        help='Skip the HTML answer form and JSON Schema written next to the template'
+    )
     
-    markdown_file = sys.argv[1]
-    output_dir = sys.argv[2] if len(sys.argv) > 2 else None
-    course_name = sys.argv[3] if len(sys.argv) > 3 else 'seo-master-2026'
+    args = parser.parse_args()
+    profile = BuildProfile() if args.profile else None
+    
+    if args.check:
+        try:
+            problems = validate_submission_format(LabSubmissionParser(args.markdown_file).parse())
+        except Exception as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
+        for problem in problems:
+            print(f"✗ {problem}")
+        if problems:
+            sys.exit(1)
+        print(f"✓ {args.markdown_file}")
+        return
     
     try:
-        generate_docx_template(markdown_file, output_dir, course_name)
+        generate_docx_template(args.markdown_file, args.output_dir, args.course_name,
+                               backend=args.backend, profile=profile, forms=not args.no_forms)
+        if profile is not None:
+            with open(args.profile, 'w', encoding='utf-8') as f:
+                json.dump(profile.to_dict(), f, indent=2)
+                f.write('\n')
+            print(f"Profile written to {args.profile}")
     except Exception as e:
         print(f"Error: {e}", file=sys.stderr)
         sys.exit(1)
 
+
+if __name__ == '__main__':
+    main()
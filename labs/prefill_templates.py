@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Pre-fill Lab Submission Templates for a Cohort
+
+Writes one copy of every lab's submission template per enrolled learner,
+with the Learner Name, Email and, when given, Date cover fields filled in.
+Learners come from a CSV file with a header row or a JSON list of objects,
+with 'name' and 'email' keys plus optional 'date' and 'id' ('id', else the
+email, names the learner's folder).
+
+Each base template is read once and its word/document.xml split around the
+placeholder text of the learner-* content controls. Every other package
+member, and every stretch of document.xml between the fields, is deflated
+once; a learner's copy only compresses its own values and is assembled
+from the precomputed bytes, so no template is rebuilt per learner.
+Copies stream into a single zip archive (an output ending in .zip) or a
+folder per learner.
+
+Usage:
+    python prefill_templates.py <learners_csv_or_json> <template_docx_or_dir> <output_dir_or_zip> [--date DATE]
+
+Example:
+    python prefill_templates.py cohort.csv data/courses/seo-master-2026/assets/templates cohort_templates.zip
+"""
+
+import re
+import sys
+import csv
+import json
+import time
+import zlib
+import struct
+import zipfile
+import argparse
+from html import escape
+from pathlib import Path
+
+from parse_lab_submission import package_timestamp, package_zip_info
+
+
+# Cover fields that can be pre-filled: content-control tag -> learner key
+PREFILL_FIELDS = {'learner-name': 'name', 'learner-email': 'email', 'learner-date': 'date'}
+
+DOCUMENT_PART = 'word/document.xml'
+
+# Characters that may not name a learner's folder
+UNSAFE_NAME_RE = re.compile(r'[^\w.@+-]+')
+
+DEFLATE_LEVEL = 6
+
+# Zip records, as written by zipfile for deflated members
+LOCAL_HEADER = struct.Struct('<IHHHHHIIIHH')
+CENTRAL_HEADER = struct.Struct('<IHHHHHHIIIHHHHHII')
+END_RECORD = struct.Struct('<IHHHHIIH')
+ZIP_VERSION = 20
+
+
+def _deflate(data, final=False):
+    """Raw deflate data as a stand-alone segment
+    
+    Segments end in a full flush, which byte-aligns them and leaves no
+    back-references, so any run of them followed by one final segment
+    concatenates into a valid deflate stream.
+    """
+    compressor = zlib.compressobj(DEFLATE_LEVEL, zlib.DEFLATED, -zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush(zlib.Z_FINISH if final else zlib.Z_FULL_FLUSH)
+
+
+def _dos_date_time(date_time):
+    """(time, date) words of a zip entry's date_time tuple"""
+    year, month, day, hour, minute, second = date_time
+    return (hour << 11 | minute << 5 | second // 2), ((year - 1980) << 9 | month << 5 | day)
+
+
+def split_document(document_xml):
+    """Split document.xml around the pre-fillable fields' placeholder text
+    
+    Returns (segments, fields) with one more segment than fields, each
+    field a (learner key, placeholder) pair: the value for fields[i] goes
+    between segments[i] and segments[i + 1], in place of the placeholder,
+    the last w:t element of the field's content control.
+    """
+    spans = []
+    for tag, key in PREFILL_FIELDS.items():
+        start = document_xml.find(f'<w:tag w:val="{tag}"/>'.encode())
+        if start == -1:
+            continue
+        end = document_xml.find(b'</w:sdtContent>', start)
+        text_start = max(document_xml.rfind(b'<w:t>', start, end), document_xml.rfind(b'<w:t ', start, end))
+        if text_start == -1:
+            continue
+        text_end = document_xml.find(b'</w:t>', text_start) + len(b'</w:t>')
+        spans.append((text_start, text_end, key))
+    spans.sort()
+    
+    segments = []
+    fields = []
+    pos = 0
+    for text_start, text_end, key in spans:
+        segments.append(document_xml[pos:text_start])
+        fields.append((key, document_xml[text_start:text_end]))
+        pos = text_end
+    segments.append(document_xml[pos:])
+    return segments, fields
+
+
+class TemplatePrefiller:
+    """A base template, read once and copied for any number of learners"""
+    
+    def __init__(self, template_path):
+        self.path = Path(template_path)
+        self.name = self.path.name
+        self._entries = []
+        self._document = None
+        self._fields = []
+        
+        with zipfile.ZipFile(self.path) as package:
+            for info in package.infolist():
+                data = package.read(info)
+                time_word, date_word = _dos_date_time(info.date_time)
+                entry = [info.filename.encode('utf-8'), time_word, date_word, info.create_system,
+                         info.external_attr, zlib.crc32(data), _deflate(data, final=True), len(data)]
+                if info.filename == DOCUMENT_PART:
+                    self._document = len(self._entries)
+                    self._split(data)
+                self._entries.append(entry)
+        
+        if not self._fields:
+            raise ValueError(f"{self.path}: no learner fields to pre-fill")
+    
+    def _split(self, document_xml):
+        """Precompress the stretches of document.xml around the learner fields"""
+        segments, self._fields = split_document(document_xml)
+        self._segments = segments
+        self._compressed = [_deflate(segment) for segment in segments[:-1]]
+        self._compressed.append(_deflate(segments[-1], final=True))
+    
+    def _fill_document(self, learner):
+        """(crc, compressed bytes, size) of document.xml with learner's values"""
+        parts = [self._compressed[0]]
+        crc = zlib.crc32(self._segments[0])
+        size = len(self._segments[0])
+        for (key, placeholder), segment, compressed in zip(self._fields, self._segments[1:], self._compressed[1:]):
+            value = learner.get(key)
+            if value:
+                text = f'<w:t xml:space="preserve">{escape(value, quote=False)}</w:t>'.encode('utf-8')
+            else:
+                text = placeholder
+            parts.append(_deflate(text))
+            parts.append(compressed)
+            crc = zlib.crc32(segment, zlib.crc32(text, crc))
+            size += len(text) + len(segment)
+        return crc, b''.join(parts), size
+    
+    def fill(self, learner):
+        """The template's DOCX bytes with learner's cover fields filled in"""
+        out = bytearray()
+        central = bytearray()
+        for index, (name, time_word, date_word, system, attr, crc, compressed, size) in enumerate(self._entries):
+            if index == self._document:
+                crc, compressed, size = self._fill_document(learner)
+            central += CENTRAL_HEADER.pack(
+                0x02014b50, system << 8 | ZIP_VERSION, ZIP_VERSION, 0, zipfile.ZIP_DEFLATED,
+                time_word, date_word, crc, len(compressed), size, len(name), 0, 0, 0, 0, attr, len(out))
+            central += name
+            out += LOCAL_HEADER.pack(0x04034b50, ZIP_VERSION, 0, zipfile.ZIP_DEFLATED, time_word, date_word,
+                                     crc, len(compressed), size, len(name), 0)
+            out += name
+            out += compressed
+        
+        central_start = len(out)
+        out += central
+        out += END_RECORD.pack(0x06054b50, 0, 0, len(self._entries), len(self._entries),
+                               len(central), central_start, 0)
+        return bytes(out)
+
+
+def load_learners(learners_file, date=None):
+    """Read learner records from a CSV or JSON file
+    
+    Each record gets a 'folder' key: its 'id', else its email, made safe
+    for a path. date fills in records without a 'date' of their own.
+    """
+    learners_file = Path(learners_file)
+    with open(learners_file, 'r', encoding='utf-8-sig', newline='') as f:
+        if learners_file.suffix.lower() == '.json':
+            records = json.load(f)
+        else:
+            records = list(csv.DictReader(f))
+    
+    learners = []
+    folders = set()
+    for number, record in enumerate(records, 1):
+        record = {str(key).strip().lower(): str(value or '').strip() for key, value in record.items()}
+        if not record.get('name') and not record.get('email'):
+            raise ValueError(f"{learners_file}: learner {number} has neither a name nor an email")
+        if date and not record.get('date'):
+            record['date'] = date
+        
+        folder = UNSAFE_NAME_RE.sub('_', record.get('id') or record.get('email') or record['name']).strip('._')
+        if not folder or folder in folders:
+            raise ValueError(f"{learners_file}: learner {number} has a missing or duplicate id '{folder}'")
+        folders.add(folder)
+        record['folder'] = folder
+        learners.append(record)
+    return learners
+
+
+def find_templates(source):
+    """The template to pre-fill, or every *_Submission_Template.docx in a directory"""
+    source = Path(source)
+    if source.is_dir():
+        return sorted(source.glob('*_Submission_Template.docx'))
+    if not source.exists():
+        raise FileNotFoundError(f"Template not found: {source}")
+    return [source]
+
+
+def prefill_templates(learners, templates, output):
+    """Write every template pre-filled for every learner; returns the documents written
+    
+    An output ending in .zip becomes one archive of '<folder>/<template>'
+    members, stored as-is since DOCX files are already compressed.
+    Otherwise each learner gets a folder of templates under output.
+    """
+    output = Path(output)
+    archive = None
+    if output.suffix.lower() == '.zip':
+        output.parent.mkdir(parents=True, exist_ok=True)
+        archive = zipfile.ZipFile(output, 'w', zipfile.ZIP_STORED)
+    timestamp = package_timestamp()
+    
+    written = 0
+    try:
+        for template in templates:
+            prefiller = TemplatePrefiller(template)
+            start = time.perf_counter()
+            for learner in learners:
+                data = prefiller.fill(learner)
+                if archive is not None:
+                    info = package_zip_info(f"{learner['folder']}/{prefiller.name}", timestamp)
+                    info.compress_type = zipfile.ZIP_STORED
+                    archive.writestr(info, data)
+                else:
+                    folder = output / learner['folder']
+                    folder.mkdir(parents=True, exist_ok=True)
+                    (folder / prefiller.name).write_bytes(data)
+                written += 1
+            elapsed = time.perf_counter() - start
+            print(f"Pre-filled: {prefiller.name} ✓ ({len(learners)} learners, {elapsed:.2f}s)")
+    finally:
+        if archive is not None:
+            archive.close()
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Pre-fill lab submission templates with each learner\'s cover details'
+    )
+    parser.add_argument(
+        'learners_file',
+        help='CSV (with a header row) or JSON list of learners: name, email, optional date and id'
+    )
+    parser.add_argument(
+        'templates',
+        help='A submission template DOCX, or a directory of them'
+    )
+    parser.add_argument(
+        'output',
+        help='Zip archive to write (ending in .zip), or a directory for per-learner folders'
+    )
+    parser.add_argument(
+        '--date',
+        help='Date to fill in for learners without one of their own (default: left blank)'
+    )
+    
+    args = parser.parse_args()
+    
+    try:
+        learners = load_learners(args.learners_file, date=args.date)
+        templates = find_templates(args.templates)
+        if not templates:
+            raise FileNotFoundError(f"No submission templates found in {args.templates}")
+        
+        start = time.perf_counter()
+        written = prefill_templates(learners, templates, args.output)
+        elapsed = time.perf_counter() - start
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    
+    rate = written / elapsed if elapsed else 0
+    print(f"\nWrote {written} documents ({len(learners)} learners x {len(templates)} templates) "
+          f"to {args.output} in {elapsed:.2f}s ({rate:.0f}/s)")
+
+
+if __name__ == '__main__':
+    main()
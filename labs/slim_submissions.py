@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+Slim Completed Lab Submission DOCX Files
+
+Learner submissions are mostly pasted full-page screenshots, often stored
+as barely compressed PNGs, plus revision-tracking noise Word adds on every
+save. This rewrites each DOCX package member by member:
+
+- images in word/media larger than --max-pixels on their longest side are
+  downsampled (the size shown in the document is unchanged), and PNGs are
+  otherwise losslessly re-deflated without their text/time chunks
+- rsid attributes, the settings.xml rsid table, spell-check markers and
+  rendered page-break hints are removed from the word/ XML parts
+- the docProps/thumbnail preview is dropped with its relationship
+
+Only one member is held in memory at a time, and a package is kept as it
+was unless the rewrite is smaller. Downsampling needs Pillow (listed in
+requirements.txt); without it PNGs are only re-deflated, with a warning. A directory is slimmed recursively across a
+pool of worker processes, keeping its layout
+(lab-submissions/{userId}/{courseId}/{labId}/...), and the bytes saved
+are reported per file and in total.
+
+Usage:
+    python slim_submissions.py <submission_docx_or_dir> [output_dir] [--in-place] [--jobs N] [--max-pixels N]
+
+Example:
+    python slim_submissions.py lab-submissions/ slimmed/ --jobs 8
+"""
+
+import io
+import os
+import re
+import sys
+import zlib
+import struct
+import shutil
+import zipfile
+import importlib.util
+import argparse
+import tempfile
+from functools import partial
+from pathlib import Path
+
+
+# Longest side, in pixels, that an image is downsampled to
+MAX_IMAGE_PIXELS = 2000
+
+JPEG_QUALITY = 85
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+# PNG chunks that carry no pixels or colour information
+PNG_METADATA_CHUNKS = {b'tEXt', b'zTXt', b'iTXt', b'tIME'}
+
+MEDIA_PREFIX = 'word/media/'
+
+# The preview image Word saves for file browsers
+THUMBNAIL_RE = re.compile(r'^docProps/thumbnail\.\w+$')
+THUMBNAIL_REFERENCE_RE = re.compile(
+    rb'<(?:Relationship|Override)\b[^>]*"/?docProps/thumbnail\.\w+"[^>]*/>')
+
+# Revision-session ids, spell-check markers and layout hints in word/ parts
+RSID_ATTRIBUTE_RE = re.compile(rb'\sw:rsid\w*="[^"]*"')
+NOISE_ELEMENT_RE = re.compile(
+    rb'<w:rsids>.*?</w:rsids>|<w:proofErr\b[^>]*/>|<w:lastRenderedPageBreak/>', re.S)
+
+
+def recompress_png(data):
+    """The PNG with its image data re-deflated at the highest level
+    
+    IDAT chunks are merged into one and text/time chunks are dropped;
+    every other chunk is kept, so the pixels are unchanged.
+    """
+    chunks = []
+    idat = []
+    pos = len(PNG_SIGNATURE)
+    while pos + 8 <= len(data):
+        length, kind = struct.unpack('>I4s', data[pos:pos + 8])
+        body = data[pos + 8:pos + 8 + length]
+        pos += length + 12
+        if kind == b'IDAT':
+            if not idat:
+                chunks.append((kind, None))
+            idat.append(body)
+        elif kind not in PNG_METADATA_CHUNKS:
+            chunks.append((kind, body))
+        if kind == b'IEND':
+            break
+    
+    packed = zlib.compress(zlib.decompress(b''.join(idat)), 9)
+    out = [PNG_SIGNATURE]
+    for kind, body in chunks:
+        if body is None:
+            body = packed
+        out.append(struct.pack('>I4s', len(body), kind) + body
+                   + struct.pack('>I', zlib.crc32(body, zlib.crc32(kind))))
+    return b''.join(out)
+
+
+def downsample_image(data, max_pixels=MAX_IMAGE_PIXELS):
+    """A PNG or JPEG scaled to max_pixels on its longest side, in its own format
+    
+    Returns None when the image is already small enough, is in another
+    format, is too large for Pillow to decode safely, or Pillow is not
+    installed.
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+    
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            if image.format not in ('PNG', 'JPEG') or max(image.size) <= max_pixels:
+                return None
+            scale = max_pixels / max(image.size)
+            size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+            resized = image.resize(size, Image.LANCZOS)
+            out = io.BytesIO()
+            if image.format == 'PNG':
+                resized.save(out, 'PNG', optimize=True)
+            else:
+                resized.save(out, 'JPEG', quality=JPEG_QUALITY, optimize=True)
+            return out.getvalue()
+    except Image.DecompressionBombError:
+        # Pillow refuses to decode images past its pixel limit; keep them as they are
+        return None
+
+
+def slim_image(data, max_pixels=MAX_IMAGE_PIXELS, stored_size=None):
+    """The smallest of an image and its downsampled or re-deflated versions
+    
+    stored_size is what the image takes up now, e.g. its compressed size
+    in the package; it defaults to len(data). Returns data unless another
+    version is smaller than that.
+    """
+    versions = [partial(downsample_image, data, max_pixels)]
+    if data.startswith(PNG_SIGNATURE):
+        versions.append(partial(recompress_png, data))
+    
+    best = data
+    limit = stored_size if stored_size is not None else len(data)
+    for version in versions:
+        try:
+            slimmed = version()
+        except (OSError, ValueError, zlib.error, struct.error):
+            # Unreadable or truncated images are kept exactly as they were
+            continue
+        if slimmed is not None and len(slimmed) < limit:
+            best, limit = slimmed, len(slimmed)
+    return best
+
+
+def slim_part(name, data):
+    """A package part's XML without rsids, markers and thumbnail references"""
+    if name.startswith('word/') and name.endswith('.xml'):
+        return NOISE_ELEMENT_RE.sub(b'', RSID_ATTRIBUTE_RE.sub(b'', data))
+    if name in ('_rels/.rels', '[Content_Types].xml'):
+        return THUMBNAIL_REFERENCE_RE.sub(b'', data)
+    return data
+
+
+def slim_docx(source, target, max_pixels=MAX_IMAGE_PIXELS):
+    """Write a slimmed copy of the DOCX at source to target (a path or stream)
+    
+    Members keep their order and timestamps and are all deflated, as a
+    pasted PNG may be barely compressed itself. Returns a report with the
+    images slimmed and the parts dropped.
+    """
+    report = {'images': 0, 'dropped': []}
+    with zipfile.ZipFile(source) as package, \
+            zipfile.ZipFile(target, 'w', zipfile.ZIP_DEFLATED, compresslevel=9) as slimmed:
+        for info in package.infolist():
+            if THUMBNAIL_RE.match(info.filename):
+                report['dropped'].append(info.filename)
+                continue
+            
+            data = package.read(info)
+            member = zipfile.ZipInfo(info.filename, date_time=info.date_time)
+            member.external_attr = info.external_attr
+            member.compress_type = zipfile.ZIP_DEFLATED
+            if info.filename.startswith(MEDIA_PREFIX):
+                image = slim_image(data, max_pixels, info.compress_size)
+                if image is not data:
+                    report['images'] += 1
+                data = image
+            else:
+                data = slim_part(info.filename, data)
+            slimmed.writestr(member, data)
+    return report
+
+
+def slim_file(source, target, max_pixels=MAX_IMAGE_PIXELS):
+    """Slim one submission file; target may be source itself
+    
+    The rewrite goes to a temporary file next to target and replaces it
+    only if it is smaller; otherwise target gets the original bytes.
+    Returns the report with the sizes before and after.
+    """
+    source = Path(source)
+    target = Path(target)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    
+    before = source.stat().st_size
+    fd, temp_name = tempfile.mkstemp(suffix='.docx', dir=target.parent)
+    try:
+        with os.fdopen(fd, 'wb') as temp:
+            report = slim_docx(source, temp, max_pixels)
+        after = os.path.getsize(temp_name)
+        if after < before:
+            os.replace(temp_name, target)
+        else:
+            after = before
+            report = {'images': 0, 'dropped': []}
+            if source != target:
+                shutil.copyfile(source, target)
+    finally:
+        if os.path.exists(temp_name):
+            os.unlink(temp_name)
+    
+    report.update(before=before, after=after)
+    return report
+
+
+def find_docx_files(source):
+    """Relative paths of the DOCX files under source (or source itself)
+    
+    Word lock files ('~$...') are skipped.
+    """
+    source = Path(source)
+    if not source.exists():
+        raise FileNotFoundError(f"Submissions not found: {source}")
+    if not source.is_dir():
+        return [Path(source.name)]
+    return sorted(path.relative_to(source) for path in source.glob('**/*.docx')
+                  if not path.name.startswith('~$'))
+
+
+def _slim_job(job):
+    """Slim one (source, target, max_pixels) job; returns (report, error)"""
+    source, target, max_pixels = job
+    try:
+        return slim_file(source, target, max_pixels), None
+    except Exception as e:
+        return None, str(e)
+
+
+def _megabytes(size):
+    """A byte count in MB, for progress lines"""
+    return f"{size / (1024 * 1024):.1f} MB"
+
+
+def slim_all(source, output=None, jobs=1, max_pixels=MAX_IMAGE_PIXELS):
+    """Slim every submission under source into output, or in place if output is None
+    
+    Returns (total bytes before, total bytes after, files that failed).
+    Warns once when Pillow is missing, as images then keep their size.
+    """
+    if importlib.util.find_spec('PIL') is None:
+        print("⚠ Pillow is not installed: images are only re-deflated, not downsampled. "
+              "Install with: pip install Pillow")
+        print()
+    
+    source = Path(source)
+    base = source if source.is_dir() else source.parent
+    names = find_docx_files(source)
+    target_base = Path(output) if output is not None else base
+    work = [(base / name, target_base / name, max_pixels) for name in names]
+    
+    if jobs <= 1 or len(work) <= 1:
+        return _print_reports(names, map(_slim_job, work))
+    
+    from concurrent.futures import ProcessPoolExecutor
+    
+    with ProcessPoolExecutor(max_workers=min(jobs, len(work))) as executor:
+        return _print_reports(names, executor.map(_slim_job, work))
+
+
+def _print_reports(names, results):
+    """Print each file's result as it arrives; returns (before, after, failed)"""
+    total_before = total_after = failed = 0
+    for name, (report, error) in zip(names, results):
+        if error is not None:
+            failed += 1
+            print(f"Slimming: {name}... ✗ {error}")
+            continue
+        total_before += report['before']
+        total_after += report['after']
+        saved = report['before'] - report['after']
+        print(f"Slimming: {name}... ✓ {_megabytes(report['before'])} -> {_megabytes(report['after'])} "
+              f"(-{saved / max(report['before'], 1):.0%}, {report['images']} images)")
+    return total_before, total_after, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Shrink completed lab submission DOCX files by slimming images and Word metadata'
+    )
+    parser.add_argument(
+        'source',
+        help='A submission DOCX, or a directory searched recursively'
+    )
+    parser.add_argument(
+        'output_dir',
+        nargs='?',
+        help='Directory for the slimmed copies, mirroring the source layout'
+    )
+    parser.add_argument(
+        '--in-place',
+        action='store_true',
+        help='Replace each submission with its slimmed copy instead'
+    )
+    parser.add_argument(
+        '--jobs', '-j',
+        type=int,
+        default=0,
+        help='Number of worker processes; 0 uses every CPU (default: 0)'
+    )
+    parser.add_argument(
+        '--max-pixels',
+        type=int,
+        default=MAX_IMAGE_PIXELS,
+        help=f'Longest image side kept, in pixels (default: {MAX_IMAGE_PIXELS})'
+    )
+    
+    args = parser.parse_args()
+    if (args.output_dir is None) == (not args.in_place):
+        parser.error('give an output directory or --in-place, but not both')
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    
+    try:
+        before, after, failed = slim_all(args.source, None if args.in_place else args.output_dir,
+                                         jobs=jobs, max_pixels=args.max_pixels)
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    
+    saved = before - after
+    print(f"\nSlimmed {_megabytes(before)} -> {_megabytes(after)}, saved {_megabytes(saved)}"
+          f"{f' ({saved / before:.0%})' if before else ''}, {failed} failed")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+Streaming OOXML Backend for Lab Submission Templates
+
+StreamingDOCXGenerator produces the same document structure as DOCXGenerator
+without building a python-docx object tree. word/document.xml is written
+fragment by fragment straight into its zipfile.ZipFile member, and every
+other package part is copied from precomputed bytes taken once from
+python-docx's default template. Memory stays bounded by the largest single
+paragraph or table, whatever the size of the template.
+
+Usage:
+    python stream_docx_writer.py <submission_markdown_file> [output_dir] [course_name]
+    python stream_docx_writer.py --parity [LABS_DIR]
+
+Example:
+    python stream_docx_writer.py --parity data/courses/seo-master-2026/content/labs
+"""
+
+import io
+import re
+import sys
+import zipfile
+import argparse
+import importlib.util
+from html import escape
+from pathlib import Path
+from xml.etree import ElementTree
+
+from parse_lab_submission import (
+    CODE_FONT, CORE_PROPERTIES_PART, DOCXGenerator, LabSubmissionParser, content_control_tags,
+    core_properties_xml, generate_docx_template, package_part_order, package_timestamp, package_zip_info
+)
+
+
+W_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+
+# The course's submission formats, for --parity
+DEFAULT_LABS_DIR = Path(__file__).resolve().parent.parent / 'data' / 'courses' / 'seo-master-2026' / 'content' / 'labs'
+
+# One inch in twentieths of a point, matching DOCXGenerator._setup_document
+MARGIN_TWIPS = '1440'
+
+PAGE_BREAK_XML = '<w:p><w:r><w:br w:type="page"/></w:r></w:p>'
+
+# Run text is split on the characters python-docx turns into elements
+RUN_SPECIAL_CHARS_RE = re.compile(r'([\t\r\n])')
+
+
+def _default_template_path():
+    """Locate python-docx's bundled default.docx without importing docx"""
+    spec = importlib.util.find_spec('docx')
+    if spec is None or not spec.submodule_search_locations:
+        raise FileNotFoundError("python-docx default template not found")
+    return Path(spec.submodule_search_locations[0]) / 'templates' / 'default.docx'
+
+
+def _split_document_xml(document_xml):
+    """Split the template's document.xml around its (empty) body
+    
+    Returns the text up to and including <w:body> and the text from
+    <w:sectPr> to the end, with inter-tag whitespace removed and 1" margins
+    applied to <w:pgMar>.
+    """
+    text = re.sub(r'>\s+<', '><', document_xml.decode('utf-8'))
+    body_start = text.index('<w:body>') + len('<w:body>')
+    sect_start = text.index('<w:sectPr', body_start)
+    
+    def set_margins(match):
+        pg_mar = match.group(0)
+        for side in ('top', 'right', 'bottom', 'left'):
+            pg_mar = re.sub(rf'w:{side}="\d+"', f'w:{side}="{MARGIN_TWIPS}"', pg_mar)
+        return pg_mar
+    
+    tail = re.sub(r'<w:pgMar\b[^>]*/>', set_margins, text[sect_start:])
+    return text[:body_start], tail
+
+
+def _paragraph_style_ids(styles_xml):
+    """Map lowercased paragraph style names to style ids
+    
+    styles.xml stores built-in names in lowercase ('heading 1'); python-docx
+    exposes them capitalized ('Heading 1'), so lookups are case-insensitive.
+    """
+    style_ids = {}
+    for style in ElementTree.fromstring(styles_xml).iter(f'{W_NS}style'):
+        if style.get(f'{W_NS}type') != 'paragraph':
+            continue
+        name = style.find(f'{W_NS}name')
+        if name is not None:
+            style_ids[name.get(f'{W_NS}val').lower()] = style.get(f'{W_NS}styleId')
+    return style_ids
+
+
+def _run_xml(spec):
+    """Serialize a RunSpec exactly as python-docx would"""
+    rpr = []
+    if spec.code:
+        rpr.append(f'<w:rFonts w:ascii="{CODE_FONT}" w:hAnsi="{CODE_FONT}"/>')
+    if spec.bold:
+        rpr.append('<w:b/>')
+    if spec.italic:
+        rpr.append('<w:i/>')
+    if spec.gray:
+        rpr.append('<w:color w:val="808080"/>')
+    if spec.highlight:
+        rpr.append('<w:highlight w:val="yellow"/>')
+    
+    parts = ['<w:r>']
+    if rpr:
+        parts.append('<w:rPr>')
+        parts.extend(rpr)
+        parts.append('</w:rPr>')
+    
+    for piece in RUN_SPECIAL_CHARS_RE.split(spec.text):
+        if not piece:
+            continue
+        if piece == '\t':
+            parts.append('<w:tab/>')
+        elif piece in '\r\n':
+            parts.append('<w:br/>')
+        elif len(piece.strip()) < len(piece):
+            parts.append(f'<w:t xml:space="preserve">{escape(piece, quote=False)}</w:t>')
+        else:
+            parts.append(f'<w:t>{escape(piece, quote=False)}</w:t>')
+    
+    parts.append('</w:r>')
+    return ''.join(parts)
+
+
+class StreamingDOCXGenerator(DOCXGenerator):
+    """Generate DOCX templates by streaming OOXML, bypassing python-docx
+    
+    generate() only binds the parsed data; the document body is produced
+    while save() writes it, so no document tree is ever held in memory.
+    """
+    
+    # Shared skeleton, built once per process by _get_skeleton()
+    _skeleton = None
+    
+    def __init__(self, parsed_data, profile=None):
+        self.parsed_data = parsed_data
+        self.metadata = parsed_data.metadata
+        self.profile = profile
+        self._paragraph_count = 0
+        self._run_count = 0
+        self.anchors = []
+        
+        skeleton = self._get_skeleton()
+        self._blocks = skeleton['blocks']
+        self._style_ids = skeleton['style_ids']
+        self._sink = None
+    
+    @classmethod
+    def _get_skeleton(cls):
+        """Return the cached package parts and shared blocks
+        
+        'parts' holds every (name, bytes) member of the default template in
+        package_part_order(), with None standing in for word/document.xml;
+        'head' and 'tail' wrap the streamed body.
+        """
+        if cls._skeleton is None:
+            with zipfile.ZipFile(_default_template_path()) as template:
+                names = sorted(template.namelist(), key=package_part_order)
+                parts = [(name, template.read(name)) for name in names]
+            
+            members = dict(parts)
+            head, tail = _split_document_xml(members['word/document.xml'])
+            
+            builder = cls.__new__(cls)
+            builder._paragraph_count = builder._run_count = 0
+            builder.anchors = []
+            builder._style_ids = _paragraph_style_ids(members['word/styles.xml'])
+            
+            cls._skeleton = {
+                'parts': [(name, None if name == 'word/document.xml' else data) for name, data in parts],
+                'head': head,
+                'tail': tail,
+                'blocks': builder._capture_shared_blocks(),
+                'style_ids': builder._style_ids,
+            }
+        return cls._skeleton
+    
+    def _capture_block(self, build):
+        """Run a block builder and return the XML it emitted"""
+        fragments = []
+        self._sink = fragments.append
+        build()
+        self._sink = None
+        return ''.join(fragments)
+    
+    def _write_block(self, block):
+        """Write a cached skeleton block"""
+        self._sink(block)
+    
+    def _paragraph_fragments(self, runs, style, alignment):
+        """Yield the XML fragments of one paragraph"""
+        yield '<w:p>'
+        if style is not None or alignment is not None:
+            yield '<w:pPr>'
+            if style is not None:
+                yield f'<w:pStyle w:val="{self._style_ids[style.lower()]}"/>'
+            if alignment is not None:
+                yield f'<w:jc w:val="{alignment}"/>'
+            yield '</w:pPr>'
+        for spec in runs:
+            yield _run_xml(spec)
+        yield '</w:p>'
+    
+    def _write_paragraph(self, runs, style, alignment, anchor_id=None):
+        """Write a paragraph of RunSpec runs, inside a content control if anchored"""
+        paragraph = ''.join(self._paragraph_fragments(runs, style, alignment))
+        if anchor_id is not None:
+            start, end = content_control_tags(anchor_id)
+            paragraph = start + paragraph + end
+        self._sink(paragraph)
+    
+    def _write_page_break(self):
+        """Write a paragraph holding only a page break"""
+        self._sink(PAGE_BREAK_XML)
+    
+    def _write_table(self, table_xml, anchor_id=None):
+        """Write a complete <w:tbl> fragment, inside a content control if anchored"""
+        if anchor_id is not None:
+            start, end = content_control_tags(anchor_id)
+            table_xml = start + table_xml + end
+        self._sink(table_xml)
+    
+    def generate(self):
+        """Return self; the body is streamed by save()"""
+        return self
+    
+    def save(self, path_or_stream):
+        """Write the DOCX package, streaming word/document.xml
+        
+        Entries get the same fixed headers and core properties as
+        write_reproducible_package(), so the output is byte-reproducible.
+        """
+        skeleton = self._get_skeleton()
+        timestamp = package_timestamp()
+        
+        with zipfile.ZipFile(path_or_stream, 'w', zipfile.ZIP_DEFLATED) as package:
+            for name, data in skeleton['parts']:
+                info = package_zip_info(name, timestamp)
+                if name == CORE_PROPERTIES_PART:
+                    data = core_properties_xml(self.metadata, timestamp)
+                if data is not None:
+                    package.writestr(info, data)
+                    continue
+                
+                with package.open(info, 'w') as member, \
+                        io.TextIOWrapper(member, encoding='utf-8', newline='') as stream:
+                    self._sink = stream.write
+                    stream.write(skeleton['head'])
+                    self._build_body()
+                    stream.write(skeleton['tail'])
+                    self._sink = None
+
+
+def _canonical_document_xml(docx_bytes):
+    """Canonical (C14N) form of a package's word/document.xml"""
+    from lxml import etree
+    
+    with zipfile.ZipFile(io.BytesIO(docx_bytes)) as package:
+        document_xml = package.read('word/document.xml')
+    parser = etree.XMLParser(remove_blank_text=True)
+    root = etree.fromstring(document_xml, parser)
+    return etree.tostring(root, method='c14n')
+
+
+def check_parity(base_dir):
+    """Compare both backends on every submission format under base_dir
+    
+    Returns the names of formats whose document.xml differs.
+    """
+    from generate_all_templates import find_submission_files
+    
+    mismatches = []
+    for submission_file in find_submission_files(base_dir):
+        parsed_data = LabSubmissionParser(submission_file).parse()
+        
+        reference = io.BytesIO()
+        DOCXGenerator(parsed_data).generate().save(reference)
+        streamed = io.BytesIO()
+        StreamingDOCXGenerator(parsed_data).generate().save(streamed)
+        
+        if _canonical_document_xml(reference.getvalue()) == _canonical_document_xml(streamed.getvalue()):
+            print(f"✓ {submission_file.name}")
+        else:
+            print(f"✗ {submission_file.name}: document.xml differs between backends")
+            mismatches.append(submission_file.name)
+    
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Generate a DOCX submission template with the streaming OOXML writer'
+    )
+    parser.add_argument(
+        'markdown_file',
+        nargs='?',
+        help='Path to a *_Submission_Format.md file'
+    )
+    parser.add_argument(
+        'output_dir',
+        nargs='?',
+        default=None,
+        help='Output directory (default: data/courses/<course_name>/assets/templates)'
+    )
+    parser.add_argument(
+        'course_name',
+        nargs='?',
+        default='seo-master-2026',
+        help='Course identifier (default: seo-master-2026)'
+    )
+    parser.add_argument(
+        '--parity',
+        nargs='?',
+        const=str(DEFAULT_LABS_DIR),
+        metavar='LABS_DIR',
+        help='Instead, compare both backends on every format in LABS_DIR '
+             '(default: the seo-master-2026 labs of this repository)'
+    )
+    
+    args = parser.parse_args()
+    if args.parity is None and args.markdown_file is None:
+        parser.error('give a markdown file, or --parity')
+    
+    try:
+        if args.parity is not None:
+            mismatches = check_parity(args.parity)
+            print(f"\n{len(mismatches)} formats differ between backends")
+            sys.exit(1 if mismatches else 0)
+        
+        generate_docx_template(args.markdown_file, args.output_dir, args.course_name, backend='stream')
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
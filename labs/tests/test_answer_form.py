@@ -0,0 +1,24 @@
+"""The answer form's inputs must be exactly the properties of its JSON Schema"""
+
+import re
+
+import pytest
+
+from answer_form_writer import HTMLFormGenerator
+from generate_all_templates import find_submission_files
+from parse_lab_submission import LabSubmissionParser
+from stream_docx_writer import DEFAULT_LABS_DIR
+
+
+INPUT_RE = re.compile(r'<(?:input|textarea)\b[^>]*\bname="([^"]*)"')
+
+
+@pytest.mark.parametrize('submission_file', find_submission_files(DEFAULT_LABS_DIR), ids=lambda path: path.stem)
+def test_schema_describes_form_payload(submission_file):
+    generator = HTMLFormGenerator(LabSubmissionParser(submission_file).parse())
+    names = INPUT_RE.findall(generator.generate())
+    schema = generator.schema()
+    
+    assert len(names) == len(set(names))
+    assert set(names) == set(schema['properties'])
+    assert all(field['type'] == 'string' for field in schema['properties'].values())
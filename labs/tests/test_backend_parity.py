@@ -0,0 +1,30 @@
+"""Both DOCX backends must write the same document for every lab"""
+
+import io
+
+import pytest
+
+from generate_all_templates import find_submission_files
+from parse_lab_submission import DOCXGenerator, LabSubmissionParser
+from stream_docx_writer import DEFAULT_LABS_DIR, StreamingDOCXGenerator, _canonical_document_xml
+
+
+SUBMISSION_FILES = find_submission_files(DEFAULT_LABS_DIR)
+
+
+def _build(generator_class, parsed_data):
+    out = io.BytesIO()
+    generator_class(parsed_data).generate().save(out)
+    return out.getvalue()
+
+
+def test_formats_found():
+    assert len(SUBMISSION_FILES) == 40
+
+
+@pytest.mark.parametrize('submission_file', SUBMISSION_FILES, ids=lambda path: path.stem)
+def test_document_xml_matches(submission_file):
+    parsed_data = LabSubmissionParser(submission_file).parse()
+    reference = _build(DOCXGenerator, parsed_data)
+    streamed = _build(StreamingDOCXGenerator, parsed_data)
+    assert _canonical_document_xml(streamed) == _canonical_document_xml(reference)
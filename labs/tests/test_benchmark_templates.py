@@ -0,0 +1,26 @@
+"""Synthetic benchmark formats must really be scaled"""
+
+import io
+
+import pytest
+
+from benchmark_templates import scale_format
+from generate_all_templates import find_submission_files
+from parse_lab_submission import LabSubmissionParser
+from stream_docx_writer import DEFAULT_LABS_DIR
+
+
+def section_count(text):
+    return len(LabSubmissionParser(io.StringIO(text)).parse().sections)
+
+
+@pytest.mark.parametrize('submission_file', find_submission_files(DEFAULT_LABS_DIR), ids=lambda path: path.stem)
+def test_scale_format_repeats_every_section(submission_file):
+    text = submission_file.read_text(encoding='utf-8')
+    
+    assert section_count(scale_format(text, 10)) >= 9 * section_count(text)
+
+
+def test_scale_format_refuses_unscalable_format():
+    with pytest.raises(ValueError):
+        scale_format('# Lab Submission\n\nNo sections here.\n', 10)
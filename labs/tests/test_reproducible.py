@@ -0,0 +1,23 @@
+"""Templates must be byte-identical across builds, with fixed zip timestamps"""
+
+import pytest
+
+from generate_all_templates import _check_reproducible, find_submission_files
+from stream_docx_writer import DEFAULT_LABS_DIR
+
+
+SUBMISSION_FILES = find_submission_files(DEFAULT_LABS_DIR)
+
+
+@pytest.mark.parametrize('backend', ['python-docx', 'stream'])
+@pytest.mark.parametrize('submission_file', SUBMISSION_FILES, ids=lambda path: path.stem)
+def test_builds_are_identical(backend, submission_file):
+    _, problems = _check_reproducible(backend, submission_file)
+    assert problems == []
+
+
+@pytest.mark.parametrize('backend', ['python-docx', 'stream'])
+def test_source_date_epoch(backend, monkeypatch):
+    monkeypatch.setenv('SOURCE_DATE_EPOCH', '1767225600')
+    _, problems = _check_reproducible(backend, SUBMISSION_FILES[0])
+    assert problems == []
@@ -0,0 +1,45 @@
+"""Answer cells of markdown tables must be highlighted, even when empty"""
+
+import io
+import re
+import zipfile
+
+import pytest
+
+from parse_lab_submission import DOCXGenerator, LabSubmissionParser
+from stream_docx_writer import StreamingDOCXGenerator
+
+
+FORMAT = """# Lab Submission — Day 1, Lab 1
+
+**Lab Title:** Tables
+
+---
+
+## Section 1: Observations
+
+| Query | Result |
+|-------|--------|
+| Query 1 | |
+
+---
+"""
+
+CELL_RE = re.compile(r'<w:tc>.*?</w:tc>', re.S)
+
+
+@pytest.mark.parametrize('generator_class', [DOCXGenerator, StreamingDOCXGenerator], ids=['python-docx', 'stream'])
+def test_empty_answer_cell_is_highlighted(generator_class):
+    parsed_data = LabSubmissionParser(io.StringIO(FORMAT)).parse()
+    assert [section.type for section in parsed_data.sections] == ['question']
+    
+    out = io.BytesIO()
+    generator_class(parsed_data).generate().save(out)
+    document_xml = zipfile.ZipFile(out).read('word/document.xml').decode('utf-8')
+    query_header, result_header, filled, empty = CELL_RE.findall(document_xml)
+    
+    assert 'w:fill="FFFF00"' not in query_header + result_header
+    for cell in (filled, empty):
+        assert '<w:shd w:val="clear" w:color="auto" w:fill="FFFF00"/>' in cell
+        assert '<w:pPr><w:rPr><w:highlight w:val="yellow"/></w:rPr></w:pPr>' in cell
+    assert '<w:r>' not in empty